@@ -1,11 +1,22 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, current_app, url_for
 from flask_cors import CORS
-from models import db, Equipo, Partido, Prediccion
-from ml_models import predictor
+from models import db, Partido, Prediccion, get_pool_stats
+from ml_models import predictor, ModelReloadError
+from model_reloader import model_reloader
+from feature_index import feature_index
+from rolling_features import rolling_features
+from prediction_matrix import prediction_matrix
+from prediction_cache import prediction_cache
+from write_behind import prediction_writer
+from stats_counters import stats_counters
+from pagination import InvalidCursor, keyset_page
+from team_registry import team_registry
+from prediction_pipeline import predict_fixtures
+from season_simulator import run_simulation
+from tracing import tracer, lazy
+from metrics import metrics
 from config import config
 import os
-import psycopg2
-import numpy as np
 
 def create_app(config_name='default'):
     app = Flask(__name__)
@@ -15,6 +26,92 @@ def create_app(config_name='default'):
     db.init_app(app)
     CORS(app)
     
+    # Trazas de depuración del camino de predicción
+    tracer.configure(level=app.config['TRACE_LEVEL'], sample_rate=app.config['TRACE_SAMPLE_RATE'])
+    app.before_request(tracer.begin)
+    
+    # Métricas de latencia por etapa (/metrics y cabecera Server-Timing)
+    metrics.configure(enabled=app.config['METRICS_ENABLED'])
+    app.before_request(metrics.begin_request)
+    app.after_request(lambda response: metrics.end_request(response, request.endpoint))
+    
+    # Índice en memoria de corners_tabla y ganador_resultado_tabla
+    feature_index.configure(
+        enabled=app.config['FEATURE_INDEX_ENABLED'],
+        refresh_seconds=app.config['FEATURE_INDEX_REFRESH_SECONDS']
+    )
+    
+    # Ventanas móviles de córners por equipo (se inicializan en el primer uso)
+    rolling_features.configure(
+        enabled=app.config['ROLLING_FEATURES_ENABLED'],
+        persist=app.config['ROLLING_FEATURES_PERSIST'],
+        refresh_seconds=app.config['ROLLING_FEATURES_REFRESH_SECONDS']
+    )
+    
+    # Carga anticipada de modelos; en modo 'lazy' cada modelo se carga en su primer uso
+    predictor.configure(
+        mmap_dir=app.config['MODEL_MMAP_DIR'] or None,
+        compiled=app.config['COMPILED_INFERENCE'],
+        compiled_max_rows=app.config['COMPILED_MAX_ROWS'],
+        execution=app.config['MODEL_EXECUTION'],
+        execution_workers=app.config['MODEL_EXECUTION_WORKERS'],
+        model_timeout=app.config['MODEL_TIMEOUT_MS'] / 1000 or None,
+        verify_checksums=app.config['MODEL_VERIFY_CHECKSUMS'],
+        compact=app.config['MODEL_COMPACT'],
+        compact_tolerance=app.config['MODEL_COMPACT_TOLERANCE']
+    )
+    if app.config['MODEL_LOADING'] == 'eager':
+        predictor.load_models(parallel=True, max_workers=app.config['MODEL_LOADING_WORKERS'])
+    
+    # Recarga en caliente de los modelos (endpoint y vigilancia opcional de los archivos)
+    model_reloader.configure(
+        app,
+        watch_seconds=app.config['MODEL_RELOAD_WATCH_SECONDS'],
+        warmup=app.config['MODEL_RELOAD_WARMUP'],
+        max_workers=app.config['MODEL_LOADING_WORKERS']
+    )
+    app.before_request(model_reloader.ensure_watching)
+    
+    # Matriz precalculada de predicciones (opcional)
+    prediction_matrix.configure(
+        enabled=app.config['PREDICTION_MATRIX_ENABLED'],
+        compute=predict_fixtures,
+        refresh_seconds=app.config['PREDICTION_MATRIX_REFRESH_SECONDS']
+    )
+    if prediction_matrix.enabled:
+        with app.app_context():
+            try:
+                prediction_matrix.build()
+            except Exception as e:
+                print(f"Error precalculando matriz de predicciones: {e}")
+    
+    # Caché de respuestas de /api/predict
+    prediction_cache.configure(
+        enabled=app.config['PREDICTION_CACHE_ENABLED'],
+        max_size=app.config['PREDICTION_CACHE_SIZE'],
+        ttl_seconds=app.config['PREDICTION_CACHE_TTL_SECONDS'],
+        record_hits=app.config['PREDICTION_CACHE_RECORD_HITS']
+    )
+    
+    # Escritura diferida de predicciones (opcional)
+    prediction_writer.configure(
+        app,
+        enabled=app.config['PREDICTION_WRITE_BEHIND'],
+        batch_size=app.config['PREDICTION_WRITE_BATCH_SIZE'],
+        flush_ms=app.config['PREDICTION_WRITE_FLUSH_MS'],
+        max_queue=app.config['PREDICTION_WRITE_QUEUE_SIZE'],
+        put_timeout_ms=app.config['PREDICTION_WRITE_PUT_TIMEOUT_MS']
+    )
+    
+    # Estadísticas de /api/stats: consulta agregada o contadores en memoria
+    stats_counters.configure(
+        enabled=app.config['STATS_COUNTERS_ENABLED'],
+        refresh_seconds=app.config['STATS_COUNTERS_REFRESH_SECONDS']
+    )
+    
+    # Registro de equipos en memoria (búsquedas y /api/equipos)
+    team_registry.configure(refresh_seconds=app.config['TEAM_REGISTRY_REFRESH_SECONDS'])
+    
     # Configurar carpeta de archivos estáticos
     app.static_folder = 'app/static'
     app.template_folder = 'app/templates'
@@ -29,10 +126,16 @@ def create_app(config_name='default'):
     
     @app.route('/api/equipos')
     def get_equipos():
-        """Obtener lista de equipos"""
+        """Obtener lista de equipos (desde el registro en memoria, con ETag)"""
         try:
-            equipos = Equipo.query.all()
-            return jsonify([equipo.to_dict() for equipo in equipos])
+            etag = team_registry.etag()
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                response = jsonify(team_registry.payload())
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = f"public, max-age={app.config['EQUIPOS_MAX_AGE']}"
+            return response
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -53,76 +156,168 @@ def create_app(config_name='default'):
             if not all([home_name, away_name, home_code is not None, away_code is not None]):
                 return jsonify({'error': 'Faltan datos requeridos'}), 400
             
+            if not valid_team_code(home_code) or not valid_team_code(away_code):
+                return jsonify({'error': INVALID_CODE_ERROR}), 400
+            
             # Obtener equipos de la base de datos
-            home_team = Equipo.query.filter_by(nombre=home_name).first()
-            away_team = Equipo.query.filter_by(nombre=away_name).first()
+            home_team = team_registry.by_name(home_name)
+            away_team = team_registry.by_name(away_name)
             
             if not home_team or not away_team:
                 return jsonify({'error': 'Equipos no encontrados'}), 404
             
-            # Obtener datos de corners_tabla para el modelo específico
-            corners_data = get_corners_data(home_team.id, away_team.id)
+            prediction_result, cache_status = resolve_prediction(home_team, away_team, home_code, away_code)
             
-            # Obtener datos de ganador_resultado_tabla para el modelo de marcador
-            ganador_data = get_ganador_resultado_data(home_team.id, away_team.id)
+            # Guardar predicción en la base de datos (los aciertos de caché según PREDICTION_CACHE_RECORD_HITS)
+            if cache_status != 'HIT' or prediction_cache.record_hits:
+                save_predicciones([build_prediccion_row(home_team, away_team, prediction_result)])
             
-            # Calcular corners totales usando el modelo pre-entrenado
-            corners_total = calculate_corners_total(corners_data, home_code, away_code)
+            response = jsonify(prediction_result)
+            if cache_status:
+                response.headers['X-Cache'] = cache_status
+            return response
             
-            # Calcular marcador usando el modelo pre-entrenado
-            score_prediction = calculate_score_prediction(ganador_data, home_code, away_code)
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/predict/batch', methods=['POST'])
+    def predict_batch():
+        """Predice varios partidos (una jornada o temporada) en una sola llamada"""
+        try:
+            data = request.get_json()
             
-            # Realizar predicción básica (probabilidades de resultado)
-            prediction_result = predictor.predict_match(home_code, away_code)
+            if not data or not isinstance(data.get('fixtures'), list) or not data['fixtures']:
+                return jsonify({'error': 'Se requiere una lista de partidos en "fixtures"'}), 400
             
-            # Reemplazar el marcador mock con el real
-            prediction_result['score'] = score_prediction
+            fixtures = data['fixtures']
+            max_size = app.config['PREDICT_BATCH_MAX_SIZE']
+            if len(fixtures) > max_size:
+                return jsonify({'error': f'Máximo {max_size} partidos por llamada'}), 400
             
-            # Agregar corners_total al resultado
-            prediction_result['corners_total'] = corners_total
+            for fixture in fixtures:
+                if not isinstance(fixture, dict) or not all([
+                    fixture.get('home_name'), fixture.get('away_name'),
+                    fixture.get('home_code') is not None, fixture.get('away_code') is not None
+                ]):
+                    return jsonify({'error': 'Faltan datos requeridos'}), 400
+                if not valid_team_code(fixture['home_code']) or not valid_team_code(fixture['away_code']):
+                    return jsonify({'error': INVALID_CODE_ERROR}), 400
             
-            # DEBUG: Imprimir información para verificar que usa los modelos reales
-            print(f"🔍 DEBUG - Equipos: {home_name} ({home_code}) vs {away_name} ({away_code})")
-            print(f"🔍 DEBUG - Datos de corners_tabla obtenidos: {len(corners_data)} campos")
-            print(f"🔍 DEBUG - Datos de ganador_resultado_tabla obtenidos: {len(ganador_data)} campos")
-            print(f"🔍 DEBUG - Corners totales calculados por tu modelo: {corners_total}")
-            print(f"🔍 DEBUG - Marcador calculado por tu modelo: {score_prediction['home']}-{score_prediction['away']}")
-            print(f"🔍 DEBUG - Modelo de corners usado: {type(predictor.corners_model).__name__}")
-            print(f"🔍 DEBUG - Modelo de marcador usado: {type(predictor.score_model).__name__}")
-            print(f"🔍 DEBUG - Escalador usado: {type(predictor.corners_scaler).__name__}")
-            print("=" * 50)
+            # Obtener todos los equipos desde el registro en memoria
+            names = {fixture['home_name'] for fixture in fixtures} | {fixture['away_name'] for fixture in fixtures}
+            teams = {name: team for name in names if (team := team_registry.by_name(name)) is not None}
             
-            # Guardar predicción en la base de datos
-            prediccion = Prediccion(
-                equipo_local_id=home_team.id,
-                equipo_visita_id=away_team.id,
-                prob_local_win=prediction_result['home_win'],
-                prob_draw=prediction_result['draw'],
-                prob_visita_win=prediction_result['away_win'],
-                goles_pred_local=score_prediction['home'],
-                goles_pred_visita=score_prediction['away'],
-                corners_pred_local=prediction_result['corners']['home'],
-                corners_pred_visita=prediction_result['corners']['away'],
-                tarjetas_pred_local=prediction_result['yellow_cards']['home'] + prediction_result['red_cards']['home'],
-                tarjetas_pred_visita=prediction_result['yellow_cards']['away'] + prediction_result['red_cards']['away'],
-                modelo_usado='XGBoost + MultiOutputRegressor'
-            )
+            missing = sorted(names - set(teams))
+            if missing:
+                return jsonify({'error': 'Equipos no encontrados', 'equipos': missing}), 404
             
-            db.session.add(prediccion)
-            db.session.commit()
+            home_teams = [teams[fixture['home_name']] for fixture in fixtures]
+            away_teams = [teams[fixture['away_name']] for fixture in fixtures]
+            home_codes = [fixture['home_code'] for fixture in fixtures]
+            away_codes = [fixture['away_code'] for fixture in fixtures]
+            
+            prediction_results = predict_fixtures(home_teams, away_teams, home_codes, away_codes)
             
-            return jsonify(prediction_result)
+            rows = []
+            for fixture, home_team, away_team, prediction_result in zip(
+                fixtures, home_teams, away_teams, prediction_results
+            ):
+                prediction_result['home_name'] = fixture['home_name']
+                prediction_result['away_name'] = fixture['away_name']
+                rows.append(build_prediccion_row(home_team, away_team, prediction_result))
+            
+            # Guardar todas las predicciones con un solo insert
+            save_predicciones(rows)
+            
+            return jsonify({'predictions': prediction_results})
             
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/season/simulate', methods=['POST'])
+    def simulate_season():
+        """Probabilidades de título, descenso y posición final simulando el resto de la temporada"""
+        try:
+            data = request.get_json(silent=True) or {}
+
+            year = data.get('temporada')
+            if not isinstance(year, int):
+                return jsonify({'error': 'Se requiere la temporada (año) en "temporada"'}), 400
+
+            n_sims = data.get('simulaciones', app.config['SEASON_SIMULATIONS'])
+            max_sims = app.config['SEASON_SIMULATIONS_MAX']
+            if not isinstance(n_sims, int) or not 1 <= n_sims <= max_sims:
+                return jsonify({'error': f'"simulaciones" debe estar entre 1 y {max_sims}'}), 400
+
+            seed = data.get('semilla', 0)
+            if not isinstance(seed, int) or seed < 0:
+                return jsonify({'error': '"semilla" debe ser un entero no negativo'}), 400
+
+            # Partidos pendientes opcionales: [{"home_name": ..., "away_name": ...}, ...]
+            fixtures = None
+            if data.get('fixtures') is not None:
+                if not isinstance(data['fixtures'], list) or not all(
+                    isinstance(fixture, dict) and fixture.get('home_name') and fixture.get('away_name')
+                    for fixture in data['fixtures']
+                ):
+                    return jsonify({'error': 'Cada partido de "fixtures" requiere home_name y away_name'}), 400
+
+                names = {fixture['home_name'] for fixture in data['fixtures']} | {fixture['away_name'] for fixture in data['fixtures']}
+                missing = sorted(name for name in names if team_registry.by_name(name) is None)
+                if missing:
+                    return jsonify({'error': 'Equipos no encontrados', 'equipos': missing}), 404
+                fixtures = [
+                    (team_registry.by_name(fixture['home_name']), team_registry.by_name(fixture['away_name']))
+                    for fixture in data['fixtures']
+                ]
+
+            return jsonify(run_simulation(
+                year, n_sims,
+                seed=seed,
+                workers=app.config['SEASON_SIMULATION_WORKERS'],
+                relegation_spots=app.config['SEASON_RELEGATION_SPOTS'],
+                fixtures=fixtures
+            ))
+
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/predict/matrix')
+    def get_prediction_matrix():
+        """Obtener estado de la matriz precalculada de predicciones"""
+        return jsonify(prediction_matrix.stats())
+    
+    @app.route('/api/models')
+    def get_models():
+        """Obtener estado de carga de los modelos"""
+        return jsonify(predictor.load_report())
+    
+    @app.route('/api/models/reload', methods=['GET', 'POST'])
+    def reload_models():
+        """Recargar los modelos desde app/models/ sin reiniciar (POST) u obtener el estado de la recarga (GET)"""
+        if request.method == 'GET':
+            return jsonify(model_reloader.stats())
+        
+        token = app.config['MODEL_RELOAD_TOKEN']
+        if token and request.headers.get('X-Reload-Token') != token:
+            return jsonify({'error': 'Token de recarga inválido'}), 403
+        try:
+            return jsonify(model_reloader.reload('endpoint'))
+        except ModelReloadError as e:
+            return jsonify({'error': str(e), 'generation': predictor.model_set().generation}), 409
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/api/partidos', methods=['GET'])
     def get_partidos():
-        """Obtener lista de partidos"""
+        """Obtener lista de partidos (más recientes primero, paginada con ?cursor= y ?limit=)"""
         try:
-            partidos = Partido.query.order_by(Partido.fecha.desc()).limit(50).all()
-            return jsonify([partido.to_dict() for partido in partidos])
+            partidos, next_cursor = keyset_page(Partido, Partido.fecha, request.args.get('cursor'), page_size())
+            return paginated_response([partido.to_dict() for partido in partidos], next_cursor)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -145,6 +340,17 @@ def create_app(config_name='default'):
             partido = Partido(**data)
             db.session.add(partido)
             db.session.commit()
+            stats_counters.record_partido(partido.resultado)
+            
+            # Actualizar solo las ventanas móviles de los dos equipos del partido
+            if rolling_features.enabled:
+                rolling_features.update(partido)
+                if rolling_features.persist:
+                    feature_index.corners.refresh()
+            
+            # Los resultados nuevos cambian los datos históricos de las predicciones
+            prediction_matrix.invalidate()
+            prediction_cache.invalidate()
             
             return jsonify(partido.to_dict()), 201
             
@@ -154,10 +360,14 @@ def create_app(config_name='default'):
     
     @app.route('/api/predicciones', methods=['GET'])
     def get_predicciones():
-        """Obtener lista de predicciones"""
+        """Obtener lista de predicciones (más recientes primero, paginada con ?cursor= y ?limit=)"""
         try:
-            predicciones = Prediccion.query.order_by(Prediccion.created_at.desc()).limit(50).all()
-            return jsonify([prediccion.to_dict() for prediccion in predicciones])
+            predicciones, next_cursor = keyset_page(
+                Prediccion, Prediccion.created_at, request.args.get('cursor'), page_size()
+            )
+            return paginated_response([prediccion.to_dict() for prediccion in predicciones], next_cursor)
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -165,32 +375,54 @@ def create_app(config_name='default'):
     def get_stats():
         """Obtener estadísticas generales"""
         try:
-            total_equipos = Equipo.query.count()
-            total_partidos = Partido.query.count()
-            total_predicciones = Prediccion.query.count()
-            
-            # Estadísticas de resultados
-            partidos_con_resultado = Partido.query.filter(Partido.resultado.isnot(None)).count()
-            if partidos_con_resultado > 0:
-                victorias_local = Partido.query.filter_by(resultado='L').count()
-                empates = Partido.query.filter_by(resultado='E').count()
-                victorias_visita = Partido.query.filter_by(resultado='V').count()
-            else:
-                victorias_local = empates = victorias_visita = 0
-            
-            return jsonify({
-                'total_equipos': total_equipos,
-                'total_partidos': total_partidos,
-                'total_predicciones': total_predicciones,
-                'partidos_con_resultado': partidos_con_resultado,
-                'victorias_local': victorias_local,
-                'empates': empates,
-                'victorias_visita': victorias_visita
-            })
+            # Una sola consulta agregada, o los contadores en memoria si están activos
+            return jsonify(stats_counters.snapshot())
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/db/pool')
+    def get_db_pool():
+        """Obtener estado del pool de conexiones"""
+        try:
+            return jsonify(get_pool_stats())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/features/index')
+    def get_feature_index():
+        """Obtener estado del índice de features en memoria"""
+        return jsonify(feature_index.stats())
+    
+    @app.route('/api/features/index', methods=['POST'])
+    def reload_feature_index():
+        """Recargar por completo el índice de features de este proceso (filas corregidas en el lugar)"""
+        try:
+            feature_index.reload()
+            return jsonify(feature_index.stats())
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/predict/cache')
+    def get_prediction_cache():
+        """Obtener contadores de la caché de predicciones"""
+        return jsonify(prediction_cache.stats())
+    
+    @app.route('/api/predict/writer')
+    def get_prediction_writer():
+        """Obtener estado de la escritura diferida de predicciones"""
+        return jsonify(prediction_writer.stats())
+    
+    @app.route('/metrics')
+    def get_metrics():
+        """Métricas en formato de texto de Prometheus"""
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+    
+    @app.route('/api/features/rolling')
+    def get_rolling_features():
+        """Obtener estado del motor de features móviles"""
+        return jsonify(rolling_features.stats())
+    
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({'error': 'Recurso no encontrado'}), 404
@@ -202,332 +434,113 @@ def create_app(config_name='default'):
     
     return app
 
-def get_corners_data(equipo_local_id, equipo_visitante_id):
-    """Obtiene el último registro de corners_tabla para los equipos especificados"""
-    try:
-        # Conectar a la base de datos PostgreSQL
-        conn = psycopg2.connect(
-            host="localhost",
-            database="UPS_BET",
-            user="user",
-            password="upsbet05",
-            port="5432"
-        )
-        
-        cursor = conn.cursor()
-        
-        # Buscar el último registro por fecha para estos equipos
-        query = """
-        SELECT * FROM corners_tabla 
-        WHERE equipo_local_id = %s AND equipo_visitante_id = %s
-        ORDER BY fecha DESC 
-        LIMIT 1
-        """
-        
-        cursor.execute(query, (equipo_local_id, equipo_visitante_id))
-        result = cursor.fetchone()
-        
-        if result:
-            # Obtener nombres de columnas
-            columns = [desc[0] for desc in cursor.description]
-            corners_data = dict(zip(columns, result))
-        else:
-            # Si no hay datos, buscar con equipos invertidos
-            query_inverted = """
-            SELECT * FROM corners_tabla 
-            WHERE equipo_local_id = %s AND equipo_visitante_id = %s
-            ORDER BY fecha DESC 
-            LIMIT 1
-            """
-            
-            cursor.execute(query_inverted, (equipo_visitante_id, equipo_local_id))
-            result = cursor.fetchone()
-            
-            if result:
-                columns = [desc[0] for desc in cursor.description]
-                corners_data = dict(zip(columns, result))
-            else:
-                # Si no hay datos históricos, usar valores por defecto
-                corners_data = {
-                    'corners_vs_rival_hist': 8.0,
-                    'last3_vs_media_liga': 1.0,
-                    'local_avg_last3': 5.0,
-                    'local_avg_last5': 5.0,
-                    'visitante_avg_last3': 4.0,
-                    'local_corner_category': 1,
-                    'diff_last3_vs_last5_local': 0.0,
-                    'visitante_avg_last5': 4.0,
-                    'visitante_corner_category': 1,
-                    'diff_last3_vs_last5_visitante': 0.0,
-                    'consistencia_corners_local': 0.8,
-                    'tiros_bloqueados_local': 2.0,
-                    'corners_por_ataque_peligroso': 0.1,
-                    'diff_corners_equipo': 1.0,
-                    'diff_corners_local': 0.5,
-                    'diff_corners_visitante': 0.5
-                }
-        
-        cursor.close()
-        conn.close()
-        
-        return corners_data
-        
-    except Exception as e:
-        print(f"Error obteniendo datos de corners_tabla: {e}")
-        # Retornar valores por defecto en caso de error
-        return {
-            'corners_vs_rival_hist': 8.0,
-            'last3_vs_media_liga': 1.0,
-            'local_avg_last3': 5.0,
-            'local_avg_last5': 5.0,
-            'visitante_avg_last3': 4.0,
-            'local_corner_category': 1,
-            'diff_last3_vs_last5_local': 0.0,
-            'visitante_avg_last5': 4.0,
-            'visitante_corner_category': 1,
-            'diff_last3_vs_last5_visitante': 0.0,
-            'consistencia_corners_local': 0.8,
-            'tiros_bloqueados_local': 2.0,
-            'corners_por_ataque_peligroso': 0.1,
-            'diff_corners_equipo': 1.0,
-            'diff_corners_local': 0.5,
-            'diff_corners_visitante': 0.5
-        }
+def page_size():
+    """Filas por página pedidas con ?limit= (acotadas a PAGE_SIZE_MAX)"""
+    limit = request.args.get('limit', type=int) or current_app.config['PAGE_SIZE']
+    return max(1, min(limit, current_app.config['PAGE_SIZE_MAX']))
 
-def calculate_corners_total(corners_data, home_code, away_code):
-    """Calcula los corners totales usando el modelo pre-entrenado"""
-    try:
-        # Generar features para el escalador (16 features)
-        features_for_scaler = np.array([
-            corners_data['corners_vs_rival_hist'],
-            corners_data['last3_vs_media_liga'],
-            corners_data['local_avg_last3'],
-            corners_data['local_avg_last5'],
-            corners_data['visitante_avg_last3'],
-            corners_data['local_corner_category'],
-            corners_data['diff_last3_vs_last5_local'],
-            corners_data['visitante_avg_last5'],
-            corners_data['visitante_corner_category'],
-            corners_data['diff_last3_vs_last5_visitante'],
-            corners_data['consistencia_corners_local'],
-            corners_data['tiros_bloqueados_local'],
-            corners_data['corners_por_ataque_peligroso'],
-            corners_data['diff_corners_equipo'],
-            corners_data['diff_corners_local'],
-            corners_data['diff_corners_visitante']
-        ]).reshape(1, -1)
-        
-        print(f"🔍 DEBUG - Features para escalador: {features_for_scaler.shape}")
-        print(f"🔍 DEBUG - Primeras 5 features: {features_for_scaler[0][:5]}")
-        
-        # Escalar features
-        features_scaled = predictor.corners_scaler.transform(features_for_scaler)
-        
-        # Generar features para el modelo (18 features: IDs + 16 escaladas)
-        features_for_model = np.concatenate([
-            np.array([[home_code, away_code]]),
-            features_scaled
-        ], axis=1)
-        
-        print(f"🔍 DEBUG - Features para modelo: {features_for_model.shape}")
-        print(f"🔍 DEBUG - IDs de equipos: [{home_code}, {away_code}]")
-        
-        # Predicción con el modelo
-        prediction = predictor.corners_model.predict(features_for_model)[0]
-        
-        print(f"🔍 DEBUG - Predicción raw del modelo: {prediction}")
-        
-        # Asegurar que sea un número entero positivo
-        corners_total = max(1, int(round(prediction)))
-        
-        print(f"🔍 DEBUG - Corners totales finales: {corners_total}")
-        
-        return corners_total
-        
-    except Exception as e:
-        print(f"Error calculando corners totales: {e}")
-        # Fallback: suma de corners históricos o valor por defecto
-        return max(1, int(corners_data.get('corners_vs_rival_hist', 8)))
+def paginated_response(items, next_cursor):
+    """Lista JSON con el cursor de la página siguiente en X-Next-Cursor y Link"""
+    response = jsonify(items)
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
 
-def get_ganador_resultado_data(equipo_local_id, equipo_visitante_id):
-    """Obtiene el último registro de ganador_resultado_tabla para los equipos especificados"""
-    try:
-        # Conectar a la base de datos PostgreSQL
-        conn = psycopg2.connect(
-            host="localhost",
-            database="UPS_BET",
-            user="user",
-            password="upsbet05",
-            port="5432"
-        )
-        
-        cursor = conn.cursor()
-        
-        # Buscar el último registro por año para estos equipos
-        query = """
-        SELECT * FROM ganador_resultado_tabla 
-        WHERE equipo_local_id = %s AND equipo_visitante_id = %s
-        ORDER BY anio DESC 
-        LIMIT 1
-        """
-        
-        cursor.execute(query, (equipo_local_id, equipo_visitante_id))
-        result = cursor.fetchone()
-        
-        if result:
-            # Obtener nombres de columnas
-            columns = [desc[0] for desc in cursor.description]
-            ganador_data = dict(zip(columns, result))
-            print(f"🔍 DEBUG - Columnas disponibles en ganador_resultado_tabla: {list(ganador_data.keys())[:10]}...")
-        else:
-            # Si no hay datos, buscar con equipos invertidos
-            query_inverted = """
-            SELECT * FROM ganador_resultado_tabla 
-            WHERE equipo_local_id = %s AND equipo_visitante_id = %s
-            ORDER BY anio DESC 
-            LIMIT 1
-            """
-            
-            cursor.execute(query_inverted, (equipo_visitante_id, equipo_local_id))
-            result = cursor.fetchone()
-            
-            if result:
-                columns = [desc[0] for desc in cursor.description]
-                ganador_data = dict(zip(columns, result))
-                print(f"🔍 DEBUG - Columnas disponibles en ganador_resultado_tabla (invertido): {list(ganador_data.keys())[:10]}...")
-            else:
-                # Si no hay datos históricos, usar valores por defecto
-                ganador_data = {
-                    'goles_local_avg_last3': 1.5,
-                    'goles_local_avg_last5': 1.4,
-                    'goles_visitante_avg_last3': 1.2,
-                    'goles_visitante_avg_last5': 1.3,
-                    'goles_vs_rival_hist': 1.8,
-                    'goles_por_ataque_peligroso_local': 0.15,
-                    'goles_por_ataque_peligroso_visitante': 0.12,
-                    'eficiencia_ataque_local': 0.25,
-                    'eficiencia_ataque_visitante': 0.22,
-                    'defensa_local_avg_last3': 0.8,
-                    'defensa_local_avg_last5': 0.9,
-                    'defensa_visitante_avg_last3': 1.1,
-                    'defensa_visitante_avg_last5': 1.0,
-                    'form_local': 0.6,
-                    'form_visitante': 0.5,
-                    'momentum_local': 0.7,
-                    'momentum_visitante': 0.6
-                }
-        
-        cursor.close()
-        conn.close()
-        
-        return ganador_data
-        
-    except Exception as e:
-        print(f"Error obteniendo datos de ganador_resultado_tabla: {e}")
-        # Retornar valores por defecto en caso de error
-        return {
-            'goles_local_avg_last3': 1.5,
-            'goles_local_avg_last5': 1.4,
-            'goles_visitante_avg_last3': 1.2,
-            'goles_visitante_avg_last5': 1.3,
-            'goles_vs_rival_hist': 1.8,
-            'goles_por_ataque_peligroso_local': 0.15,
-            'goles_por_ataque_peligroso_visitante': 0.12,
-            'eficiencia_ataque_local': 0.25,
-            'eficiencia_ataque_visitante': 0.22,
-            'defensa_local_avg_last3': 0.8,
-            'defensa_local_avg_last5': 0.9,
-            'defensa_visitante_avg_last3': 1.1,
-            'defensa_visitante_avg_last5': 1.0,
-            'form_local': 0.6,
-            'form_visitante': 0.5,
-            'momentum_local': 0.7,
-            'momentum_visitante': 0.6
-        }
+INVALID_CODE_ERROR = 'home_code y away_code deben ser números enteros'
 
-def calculate_score_prediction(ganador_data, home_code, away_code):
-    """Calcula el marcador usando el modelo pre-entrenado"""
-    try:
-        print(f"🔍 DEBUG - Claves disponibles en ganador_data: {list(ganador_data.keys())}")
-        
-        # Verificar si las columnas necesarias existen
-        required_columns = [
-            'goles_local_avg_last3', 'goles_local_avg_last5', 'goles_visitante_avg_last3',
-            'goles_visitante_avg_last5', 'goles_vs_rival_hist', 'goles_por_ataque_peligroso_local',
-            'goles_por_ataque_peligroso_visitante', 'eficiencia_ataque_local', 'eficiencia_ataque_visitante',
-            'defensa_local_avg_last3', 'defensa_local_avg_last5', 'defensa_visitante_avg_last3',
-            'defensa_visitante_avg_last5', 'form_local', 'form_visitante', 'momentum_local', 'momentum_visitante'
-        ]
-        
-        missing_columns = [col for col in required_columns if col not in ganador_data]
-        if missing_columns:
-            print(f"🔍 DEBUG - Columnas faltantes: {missing_columns}")
-            print(f"🔍 DEBUG - Usando valores por defecto para columnas faltantes")
-        
-        # Generar features para el modelo de marcador con valores por defecto para columnas faltantes
-        features_for_model = np.array([
-            ganador_data.get('goles_local_avg_last3', 1.5),
-            ganador_data.get('goles_local_avg_last5', 1.4),
-            ganador_data.get('goles_visitante_avg_last3', 1.2),
-            ganador_data.get('goles_visitante_avg_last5', 1.3),
-            ganador_data.get('goles_vs_rival_hist', 1.8),
-            ganador_data.get('goles_por_ataque_peligroso_local', 0.15),
-            ganador_data.get('goles_por_ataque_peligroso_visitante', 0.12),
-            ganador_data.get('eficiencia_ataque_local', 0.25),
-            ganador_data.get('eficiencia_ataque_visitante', 0.22),
-            ganador_data.get('defensa_local_avg_last3', 0.8),
-            ganador_data.get('defensa_local_avg_last5', 0.9),
-            ganador_data.get('defensa_visitante_avg_last3', 1.1),
-            ganador_data.get('defensa_visitante_avg_last5', 1.0),
-            ganador_data.get('form_local', 0.6),
-            ganador_data.get('form_visitante', 0.5),
-            ganador_data.get('momentum_local', 0.7),
-            ganador_data.get('momentum_visitante', 0.6),
-            home_code,
-            away_code
-        ]).reshape(1, -1)
-        
-        print(f"🔍 DEBUG - Features para modelo de marcador: {features_for_model.shape}")
-        print(f"🔍 DEBUG - Primeras 5 features: {features_for_model[0][:5]}")
-        print(f"🔍 DEBUG - IDs de equipos: [{home_code}, {away_code}]")
-        
-        # Verificar que el modelo esté cargado correctamente
-        if predictor.score_model is None:
-            print("🔍 DEBUG - ERROR: predictor.score_model es None")
-            raise Exception("Modelo de marcador no está cargado")
-        
-        print(f"🔍 DEBUG - Tipo de predictor.score_model: {type(predictor.score_model)}")
-        print(f"🔍 DEBUG - predictor.score_model: {predictor.score_model}")
-        
-        # Predicción con el modelo de marcador
-        prediction = predictor.score_model.predict(features_for_model)
-        
-        # Si es MultiOutputRegressor, tomar el primer resultado
-        if hasattr(prediction, 'shape') and len(prediction.shape) > 1:
-            prediction = prediction[0]
-        else:
-            prediction = prediction
-        
-        print(f"🔍 DEBUG - Predicción raw del modelo de marcador: {prediction}")
-        
-        # El modelo devuelve [goles_local, goles_visitante]
-        goles_local = max(0, int(round(prediction[0])))
-        goles_visitante = max(0, int(round(prediction[1])))
-        
-        print(f"🔍 DEBUG - Marcador final: {goles_local}-{goles_visitante}")
-        
-        return {
-            'home': goles_local,
-            'away': goles_visitante
-        }
-        
-    except Exception as e:
-        print(f"Error calculando marcador: {e}")
-        # Fallback: valores por defecto
-        return {
-            'home': max(0, int(ganador_data.get('goles_local_avg_last3', 1.5))),
-            'away': max(0, int(ganador_data.get('goles_visitante_avg_last3', 1.2)))
-        }
+def valid_team_code(code):
+    """Los códigos de equipo van a las features de los modelos y a la clave de la caché: solo enteros"""
+    return isinstance(code, int) and not isinstance(code, bool)
+
+def resolve_prediction(home_team, away_team, home_code, away_code):
+    """
+    Predicción de un partido desde la caché, la matriz precalculada o el pipeline
+    (compartida por /api/predict en Flask y en el modo ASGI)
+
+    Returns:
+        tuple: (resultado, 'HIT' / 'MISS' según la caché o None si está desactivada)
+    """
+    cache_key = None
+    if prediction_cache.enabled:
+        cache_key = prediction_cache.key(home_code, away_code)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached, 'HIT'
+    
+    prediction_result = None
+    if prediction_matrix.enabled:
+        # Modo precalculado: lectura directa de la matriz densa
+        prediction_result = prediction_matrix.get(home_code, away_code)
+    
+    if prediction_result is None:
+        # Pipeline de predicción: cada modelo se evalúa una sola vez
+        prediction_result = predict_fixtures([home_team], [away_team], [home_code], [away_code])[0]
+        corners_total = prediction_result['corners_total']
+        score_prediction = prediction_result['score']
+    
+        # Trazas para verificar que usa los modelos reales (TRACE_LEVEL=info o debug)
+        tracer.info("Equipos: {} ({}) vs {} ({})", home_team.nombre, home_code, away_team.nombre, away_code)
+        tracer.info("Corners totales calculados por tu modelo: {}", corners_total)
+        tracer.info("Marcador calculado por tu modelo: {}-{}", score_prediction['home'], score_prediction['away'])
+        tracer.info("Modelo de corners usado: {}", lazy(lambda: type(predictor.corners_model).__name__))
+        tracer.info("Modelo de marcador usado: {}", lazy(lambda: type(predictor.score_model).__name__))
+        tracer.info("Escalador usado: {}", lazy(lambda: type(predictor.corners_scaler).__name__))
+        tracer.rule()
+    
+    if cache_key is not None:
+        prediction_cache.put(cache_key, prediction_result)
+        return prediction_result, 'MISS'
+    return prediction_result, None
+
+def build_prediccion_row(home_team, away_team, prediction_result):
+    """Arma las columnas de un registro de Prediccion a partir del resultado de la predicción"""
+    return {
+        'equipo_local_id': home_team.id,
+        'equipo_visita_id': away_team.id,
+        'prob_local_win': prediction_result['home_win'],
+        'prob_draw': prediction_result['draw'],
+        'prob_visita_win': prediction_result['away_win'],
+        'goles_pred_local': prediction_result['score']['home'],
+        'goles_pred_visita': prediction_result['score']['away'],
+        'corners_pred_local': prediction_result['corners']['home'],
+        'corners_pred_visita': prediction_result['corners']['away'],
+        'tarjetas_pred_local': prediction_result['yellow_cards']['home'] + prediction_result['red_cards']['home'],
+        'tarjetas_pred_visita': prediction_result['yellow_cards']['away'] + prediction_result['red_cards']['away'],
+        'modelo_usado': 'XGBoost + MultiOutputRegressor'
+    }
+
+def save_predicciones(rows):
+    """Guarda registros de Prediccion: en la cola de escritura diferida o con un insert masivo"""
+    with metrics.timed('prediccion_commit'):
+        if not prediction_writer.submit(rows):
+            db.session.execute(db.insert(Prediccion), rows)
+            db.session.commit()
+    stats_counters.record_predicciones(len(rows))
+
+def pool_metrics():
+    """Estado del pool de conexiones para /metrics"""
+    stats = get_pool_stats()
+    return {(state,): stats[state] for state in ('size', 'checkedin', 'checkedout', 'overflow') if state in stats}
+
+metrics.gauge('upsbet_db_pool_connections', 'Conexiones del pool de la base de datos por estado', ['state'], pool_metrics)
+metrics.gauge(
+    'upsbet_prediction_cache', 'Contadores de la caché de predicciones', ['stat'],
+    lambda: {(key,): value for key, value in prediction_cache.stats().items()
+             if key in ('size', 'hits', 'misses', 'evictions', 'expirations', 'invalidations')}
+)
+metrics.gauge(
+    'upsbet_model_reloads', 'Generación del conjunto de modelos y recargas', ['stat'],
+    lambda: {(key,): value for key, value in model_reloader.stats().items()
+             if key in ('generation', 'reloads', 'failures')}
+)
+metrics.gauge(
+    'upsbet_prediction_writer', 'Estado de la escritura diferida de predicciones', ['stat'],
+    lambda: {(key,): value for key, value in prediction_writer.stats().items()
+             if key in ('queued', 'written', 'batches', 'failed', 'sync_fallbacks')}
+)
 
 if __name__ == '__main__':
     app = create_app()
@@ -1,51 +1,10 @@
-// =======================
-//  Diccionario (intacto)
-// =======================
-const equipos_dict = {
-  'Barcelona SC': 0,
-  'El Nacional': 2,
-  'Emelec': 4,
-  'LDU de Quito': 5,
-  'Mushuc Runa SC': 6,
-  'Independiente del Valle': 7,
-  'CD Tecnico Universitario': 8,
-  'Delfin': 9,
-  'Deportivo Cuenca': 10,
-  'Aucas': 12,
-  'Universidad Catolica': 13,
-  'CSD Macara': 14,
-  'Orense SC': 15,
-  'Manta FC': 17,
-  'Libertad': 20,
-  'Vinotinto': 22
-};
-
 // =======================
 //  Configuración de rutas
 // =======================
 // Rutas corregidas para que coincidan con la estructura de archivos
 const ASSETS_BASE = "/static/";
 const API_ENDPOINT = "/api/predict"; // cambia si tu backend vive en otro lado
-
-// Nombres de archivo EXACTOS (según tu carpeta)
-const NAME_TO_FILE = {
-  "Barcelona SC": "img/Barcelona_Sporting_Club_Logo.png",
-  "El Nacional": "img/Nacional.png",
-  "Emelec": "img/EscudoCSEmelec.png",
-  "LDU de Quito": "img/Liga_Deportiva_Universitaria_de_Quito.png",
-  "Mushuc Runa SC": "img/MushucRuna.png",
-  "Independiente del Valle": "img/Independiente_del_Valle_Logo_2022.png",
-  "CD Tecnico Universitario": "img/Técnico_Universitario.png",
-  "Delfin": "img/Delfín_SC_logo.png",
-  "Deportivo Cuenca": "img/Depcuenca.png",
-  "Aucas": "img/SD_Aucas_logo.png",
-  "Universidad Catolica": "img/Ucatólica.png",
-  "CSD Macara": "img/Macara_6.png",
-  "Orense SC": "img/Orense_SC_logo.png",
-  "Manta FC": "img/Manta_F.C.png",
-  "Libertad": "img/Libertad_FC_Ecuador.png",
-  "Vinotinto": "img/Vinotinto.png"
-};
+const TEAMS_ENDPOINT = "/api/equipos"; // nombre, código y escudo de cada equipo
 
 // fondo (tu archivo se llama bg.jpg)
 const BG_FILE = "img/bg.jpg";
@@ -84,11 +43,31 @@ const notice  = $("#notice");
 bgDiv.style.backgroundImage = `url('${ASSETS_BASE}${BG_FILE}')`;
 
 // opciones por defecto
-const TEAM_NAMES = Object.keys(equipos_dict);
 const DEFAULT_HOME = "Emelec";
 const DEFAULT_AWAY = "Barcelona SC";
 
-// Rellena selects respetando el diccionario
+// Equipos del servidor: nombre -> { codigo, logo_url }
+let TEAMS = {};
+let TEAM_NAMES = [];
+
+// Carga los equipos una vez (el navegador la cachea y revalida con ETag)
+async function loadTeams(){
+  try {
+    const res = await fetch(TEAMS_ENDPOINT);
+    if(!res.ok) throw new Error(`HTTP ${res.status}`);
+    const equipos = await res.json();
+    equipos
+      .filter(equipo => equipo.codigo !== null && equipo.codigo !== undefined)
+      .forEach(equipo => { TEAMS[equipo.nombre] = { codigo: equipo.codigo, logo_url: equipo.logo_url }; });
+    TEAM_NAMES = Object.keys(TEAMS);
+    populateSelects();
+  } catch (err) {
+    console.error(err);
+    showNotice("No se pudo cargar la lista de equipos.");
+  }
+}
+
+// Rellena selects con los equipos del servidor
 function populateSelects(){
   TEAM_NAMES.forEach(name => {
     const o1 = document.createElement("option");
@@ -96,16 +75,15 @@ function populateSelects(){
     const o2 = document.createElement("option");
     o2.value = name; o2.textContent = name; awaySel.appendChild(o2);
   });
-  homeSel.value = DEFAULT_HOME;
-  awaySel.value = DEFAULT_AWAY;
+  homeSel.value = TEAMS[DEFAULT_HOME] ? DEFAULT_HOME : TEAM_NAMES[0];
+  awaySel.value = TEAMS[DEFAULT_AWAY] ? DEFAULT_AWAY : TEAM_NAMES[1];
   updateLogosAndLabels();
 }
-populateSelects();
+loadTeams();
 
-// devuelve la ruta exacta según tu carpeta
+// escudo del equipo según el servidor
 function teamLogo(name){
-  const file = NAME_TO_FILE[name];
-  return file ? ASSETS_BASE + file : "";
+  return TEAMS[name]?.logo_url || "";
 }
 
 function setLogo(img, teamName){
@@ -158,8 +136,8 @@ async function predict(){
     const payload = {
       home_name: homeSel.value,
       away_name: awaySel.value,
-      home_code: equipos_dict[homeSel.value],
-      away_code: equipos_dict[awaySel.value]
+      home_code: TEAMS[homeSel.value]?.codigo,
+      away_code: TEAMS[awaySel.value]?.codigo
     };
 
     let data;
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Punto de entrada ASGI: /api/predict y los endpoints de lectura sin bloquear el proceso
+
+En modo WSGI cada worker atiende una petición a la vez: espera la conexión a PostgreSQL y
+el commit de Prediccion. Aquí esas consultas van por un driver asíncrono (asyncpg) con su
+propio pool, y la inferencia (features, escalado y modelos, que es CPU) se ejecuta en un
+grupo acotado de hilos dentro del contexto de la app Flask. Mientras una petición espera a
+la base de datos o a un hilo de inferencia, el bucle de eventos sigue atendiendo otras, así
+un solo proceso mantiene muchas peticiones en curso. El resto de las rutas (página,
+escrituras de partidos, modelos, métricas) las atiende la app Flask montada debajo.
+
+Uso:
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from app import create_app, resolve_prediction, build_prediccion_row, valid_team_code, INVALID_CODE_ERROR
+from models import Partido, Prediccion, get_pool_stats
+from model_reloader import model_reloader
+from pagination import InvalidCursor, keyset_query, keyset_split
+from prediction_cache import prediction_cache
+from stats_counters import aggregate_query, stats_from_row, stats_counters
+from team_registry import team_registry
+from tracing import tracer
+from write_behind import prediction_writer
+from metrics import metrics
+
+# Driver asíncrono que corresponde a cada driver síncrono de DATABASE_URL
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite'
+}
+
+def async_database_url(url):
+    """URL de SQLAlchemy con el driver asíncrono equivalente"""
+    url = make_url(url)
+    if url.drivername not in ASYNC_DRIVERS:
+        if url.drivername in ASYNC_DRIVERS.values():
+            return url
+        raise ValueError(f"No hay driver asíncrono para {url.drivername}; configure ASGI_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[url.drivername])
+
+class ServerBusy(Exception):
+    """Demasiadas predicciones en curso o en espera"""
+
+class InferenceExecutor:
+    """
+    Hilos acotados para la parte síncrona de /api/predict (registro de equipos, caché,
+    matriz y pipeline). Cada llamada se ejecuta dentro del contexto de la app Flask y con
+    el contexto de la petición (trazas muestreadas). Con max_pending predicciones en curso
+    o en espera, las siguientes se rechazan con 503 en lugar de acumular latencia.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.workers = 4
+        self.max_pending = 64
+        self._executor = None
+
+        # Solo se modifican desde el bucle de eventos
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def configure(self, app, workers=4, max_pending=64):
+        """
+        Args:
+            app: Aplicación Flask (contexto de las consultas síncronas y de los modelos)
+            workers (int): Hilos de inferencia
+            max_pending (int): Predicciones en curso o en espera antes de responder 503
+        """
+        self.app = app
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='asgi-inference')
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def run(self, func, *args):
+        """Ejecuta func(*args) en un hilo de inferencia y espera el resultado sin bloquear"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ServerBusy(f"Servidor ocupado: {self.pending} predicciones en curso")
+
+        self.pending += 1
+        context = contextvars.copy_context()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, context.run, functools.partial(in_app_context, self.app, func, *args)
+            )
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'failed': self.failed
+        }
+
+class AsyncDatabase:
+    """Engine asíncrono con su propio pool (se crea dentro del bucle de eventos del worker)"""
+
+    def __init__(self):
+        self.url = None
+        self.pool_size = 20
+        self.max_overflow = 10
+        self.engine = None
+
+    def configure(self, url, pool_size=20, max_overflow=10):
+        """
+        Args:
+            url (str): URL con driver asíncrono (postgresql+asyncpg://...)
+            pool_size (int): Conexiones permanentes del pool
+            max_overflow (int): Conexiones adicionales en picos
+        """
+        self.url = url
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+
+    def start(self):
+        self.engine = create_async_engine(
+            self.url, pool_size=self.pool_size, max_overflow=self.max_overflow, pool_pre_ping=True
+        )
+
+    async def stop(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    def session(self):
+        return AsyncSession(self.engine)
+
+    def stats(self):
+        return get_pool_stats(self.engine) if self.engine is not None else {'pool_class': None}
+
+def in_app_context(flask_app, func, *args):
+    """Llama a func(*args) dentro del contexto de la app Flask (sesión y configuración)"""
+    with flask_app.app_context():
+        return func(*args)
+
+flask_app = create_app(os.environ.get('FLASK_CONFIG', 'production'))
+
+inference = InferenceExecutor()
+inference.configure(
+    flask_app,
+    workers=flask_app.config['ASGI_INFERENCE_WORKERS'],
+    max_pending=flask_app.config['ASGI_INFERENCE_QUEUE']
+)
+
+database = AsyncDatabase()
+database.configure(
+    flask_app.config['ASGI_DATABASE_URL'] or async_database_url(flask_app.config['SQLALCHEMY_DATABASE_URI']),
+    pool_size=flask_app.config['ASGI_DB_POOL_SIZE'],
+    max_overflow=flask_app.config['ASGI_DB_MAX_OVERFLOW']
+)
+
+def json_response(content, status_code=200, headers=None):
+    """Respuesta JSON con el mismo formato que jsonify de la app Flask"""
+    return Response(
+        flask_app.json.dumps(content, separators=(',', ':')) + '\n', status_code=status_code,
+        headers=headers, media_type='application/json'
+    )
+
+def endpoint(name):
+    """
+    Registra la latencia de la petición con el nombre del endpoint Flask equivalente,
+    agrega Server-Timing y convierte los errores en respuestas JSON (503 si la inferencia
+    está saturada, 500 en otro caso)
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            started = time.perf_counter()
+            tracer.begin()
+            # Las etapas medidas en los hilos de inferencia llegan al mismo dict
+            with metrics.collect_server_timing() as timings:
+                try:
+                    response = await handler(request)
+                except ServerBusy as e:
+                    response = json_response({'error': str(e)}, 503, {'Retry-After': '1'})
+                except Exception as e:
+                    response = json_response({'error': str(e)}, 500)
+
+            if metrics.enabled:
+                elapsed = time.perf_counter() - started
+                metrics.request_latency.observe(elapsed, name)
+                response.headers['Server-Timing'] = metrics.server_timing_header(timings, elapsed)
+            return response
+        return wrapper
+    return decorator
+
+def predict_one(home_name, away_name, home_code, away_code):
+    """Parte síncrona de /api/predict (en un hilo de inferencia)"""
+    home_team = team_registry.by_name(home_name)
+    away_team = team_registry.by_name(away_name)
+    if not home_team or not away_team:
+        return None
+    return (home_team, away_team) + resolve_prediction(home_team, away_team, home_code, away_code)
+
+async def save_predicciones(rows):
+    """
+    Guarda registros de Prediccion: en la cola de escritura diferida (PREDICTION_WRITE_BEHIND)
+    o con un insert masivo por el pool asíncrono
+    """
+    with metrics.timed('prediccion_commit'):
+        if prediction_writer.enabled:
+            # submit puede esperar lugar en la cola o escribir en el llamador si está llena
+            await run_in_threadpool(in_app_context, flask_app, prediction_writer.submit, rows)
+        else:
+            async with database.engine.begin() as conn:
+                await conn.execute(insert(Prediccion), rows)
+    stats_counters.record_predicciones(len(rows))
+
+@endpoint('predict_match')
+async def predict_match(request):
+    """Predice el resultado de un partido"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+
+    if not data:
+        return json_response({'error': 'No se recibieron datos'}, 400)
+
+    home_name = data.get('home_name')
+    away_name = data.get('away_name')
+    home_code = data.get('home_code')
+    away_code = data.get('away_code')
+
+    if not all([home_name, away_name, home_code is not None, away_code is not None]):
+        return json_response({'error': 'Faltan datos requeridos'}, 400)
+
+    if not valid_team_code(home_code) or not valid_team_code(away_code):
+        return json_response({'error': INVALID_CODE_ERROR}, 400)
+
+    prediction = await inference.run(predict_one, home_name, away_name, home_code, away_code)
+    if prediction is None:
+        return json_response({'error': 'Equipos no encontrados'}, 404)
+    home_team, away_team, prediction_result, cache_status = prediction
+
+    if cache_status != 'HIT' or prediction_cache.record_hits:
+        await save_predicciones([build_prediccion_row(home_team, away_team, prediction_result)])
+
+    return json_response(prediction_result, headers={'X-Cache': cache_status} if cache_status else None)
+
+@endpoint('get_equipos')
+async def get_equipos(request):
+    """Obtener lista de equipos (desde el registro en memoria, con ETag)"""
+    etag, payload = await run_in_threadpool(
+        in_app_context, flask_app, lambda: (team_registry.etag(), team_registry.payload())
+    )
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': f"public, max-age={flask_app.config['EQUIPOS_MAX_AGE']}"
+    }
+    if_none_match = request.headers.get('if-none-match', '')
+    tags = {tag.strip().removeprefix('W/').strip('"') for tag in if_none_match.split(',')}
+    if etag in tags or '*' in tags:
+        return Response(status_code=304, headers=headers)
+    return json_response(payload, headers=headers)
+
+def page_size(request):
+    """Filas por página pedidas con ?limit= (acotadas a PAGE_SIZE_MAX)"""
+    try:
+        limit = int(request.query_params.get('limit', 0))
+    except ValueError:
+        limit = 0
+    limit = limit or flask_app.config['PAGE_SIZE']
+    return max(1, min(limit, flask_app.config['PAGE_SIZE_MAX']))
+
+async def paginated_response(request, model, order_column):
+    """Página por cursor con X-Next-Cursor y Link (mismo formato que la app Flask)"""
+    limit = page_size(request)
+    try:
+        query = keyset_query(model, order_column, request.query_params.get('cursor'), limit)
+    except InvalidCursor as e:
+        return json_response({'error': str(e)}, 400)
+
+    async with database.session() as session:
+        rows = (await session.execute(query)).scalars().all()
+        rows, next_cursor = keyset_split(rows, order_column, limit)
+        items = [row.to_dict() for row in rows]
+
+    headers = None
+    if next_cursor:
+        url = request.url.include_query_params(cursor=next_cursor)
+        headers = {'X-Next-Cursor': next_cursor, 'Link': f'<{url.path}?{url.query}>; rel="next"'}
+    return json_response(items, headers=headers)
+
+@endpoint('get_partidos')
+async def get_partidos(request):
+    """Obtener lista de partidos (más recientes primero, paginada con ?cursor= y ?limit=)"""
+    return await paginated_response(request, Partido, Partido.fecha)
+
+@endpoint('get_predicciones')
+async def get_predicciones(request):
+    """Obtener lista de predicciones (más recientes primero, paginada con ?cursor= y ?limit=)"""
+    return await paginated_response(request, Prediccion, Prediccion.created_at)
+
+@endpoint('get_stats')
+async def get_stats(request):
+    """Obtener estadísticas generales (consulta agregada asíncrona o contadores en memoria)"""
+    if stats_counters.enabled:
+        return json_response(await run_in_threadpool(in_app_context, flask_app, stats_counters.snapshot))
+    async with database.engine.connect() as conn:
+        row = (await conn.execute(aggregate_query())).one()
+    return json_response(stats_from_row(row))
+
+@endpoint('get_asgi')
+async def get_asgi(request):
+    """Estado de los hilos de inferencia y del pool asíncrono"""
+    return json_response({'inference': inference.stats(), 'db_pool': database.stats()})
+
+@contextlib.asynccontextmanager
+async def lifespan(starlette_app):
+    database.start()
+    inference.start()
+    model_reloader.ensure_watching()
+    print(
+        f"✅ Modo ASGI: {inference.workers} hilos de inferencia, "
+        f"pool asíncrono de {database.pool_size}+{database.max_overflow} conexiones"
+    )
+    try:
+        yield
+    finally:
+        inference.shutdown()
+        # Las predicciones en cola de escritura diferida se guardan antes de cerrar
+        await run_in_threadpool(prediction_writer.drain)
+        await database.stop()
+
+app = Starlette(
+    routes=[
+        Route('/api/predict', predict_match, methods=['POST']),
+        Route('/api/equipos', get_equipos, methods=['GET']),
+        Route('/api/partidos', get_partidos, methods=['GET']),
+        Route('/api/predicciones', get_predicciones, methods=['GET']),
+        Route('/api/stats', get_stats, methods=['GET']),
+        Route('/api/asgi', get_asgi, methods=['GET']),
+        # Todo lo demás (incluido POST /api/partidos) lo atiende la app Flask
+        Mount('/', app=WSGIMiddleware(flask_app))
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible del camino de predicción
+
+Mide el arranque en frío (proceso nuevo: importar, crear la app con carga anticipada de
+modelos y primera predicción), la latencia de una fila de cada modelo, el rendimiento por
+lotes de varios tamaños y la latencia de extremo a extremo de /api/predict con el cliente
+de pruebas de Flask sobre una base SQLite local que reemplaza a PostgreSQL.
+
+Los resultados se guardan en JSON junto con la versión de los modelos, el commit y las
+versiones de las librerías; con --baseline se comparan contra una ejecución anterior y
+el proceso termina con código 1 si alguna métrica empeora más que --tolerance.
+
+Uso:
+    python benchmark.py --output benchmark_results.json
+    python benchmark.py --compiled --execution threaded --baseline benchmark_results.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Equipos de la interfaz (app/static/js/script.js): nombre -> código de los modelos
+TEAMS = {
+    'Barcelona SC': 0,
+    'El Nacional': 2,
+    'Emelec': 4,
+    'LDU de Quito': 5,
+    'Mushuc Runa SC': 6,
+    'Independiente del Valle': 7,
+    'CD Tecnico Universitario': 8,
+    'Delfin': 9,
+    'Deportivo Cuenca': 10,
+    'Aucas': 12,
+    'Universidad Catolica': 13,
+    'CSD Macara': 14,
+    'Orense SC': 15,
+    'Manta FC': 17,
+    'Libertad': 20,
+    'Vinotinto': 22
+}
+
+CORNERS_SQL = 'app/data/datos_tabla_corners.sql'
+CORNERS_CSV = 'app/data/dataset_corners_listo.csv'
+
+DEFAULT_BATCH_SIZES = (1, 8, 30, 120, 240)
+
+# Métricas comparadas con --baseline: sufijo -> True si un valor mayor es mejor
+# (se usa el primer sufijo que coincide)
+COMPARED_SUFFIXES = {
+    'rows_per_s': True,
+    'p50_ms': False,
+    '_s': False
+}
+
+def seed_database(path, seed=42):
+    """
+    Crea la base SQLite de pruebas: equipos, partidos sintéticos reproducibles (ida y
+    vuelta entre todos los equipos, así cada enfrentamiento tiene historia),
+    corners_tabla desde los datos de entrenamiento y ganador_resultado_tabla con una
+    fila sintética por enfrentamiento
+    """
+    from app import create_app
+    from models import db, Equipo, Partido
+    from feature_index import GANADOR_FEATURE_COLUMNS
+    from prediction_pipeline import DEFAULT_CORNERS_DATA, DEFAULT_GANADOR_DATA
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = random.Random(seed)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for nombre, codigo in TEAMS.items():
+            db.session.add(Equipo(nombre=nombre, codigo=codigo))
+        db.session.commit()
+
+        ids = [equipo.id for equipo in Equipo.query.order_by(Equipo.id).all()]
+        pairs = [(local_id, visita_id) for local_id in ids for visita_id in ids if local_id != visita_id]
+        rng.shuffle(pairs)
+        start = datetime(2024, 1, 1)
+        for i, (local_id, visita_id) in enumerate(pairs):
+            goles_local, goles_visita = rng.randint(0, 3), rng.randint(0, 3)
+            db.session.add(Partido(
+                equipo_local_id=local_id, equipo_visita_id=visita_id, fecha=start + timedelta(days=i),
+                goles_local=goles_local, goles_visita=goles_visita,
+                corners_local=rng.randint(2, 9), corners_visita=rng.randint(1, 8),
+                tarjetas_amarillas_local=rng.randint(0, 4), tarjetas_amarillas_visita=rng.randint(0, 4),
+                tarjetas_rojas_local=0, tarjetas_rojas_visita=rng.randint(0, 1),
+                resultado='L' if goles_local > goles_visita else ('V' if goles_visita > goles_local else 'E')
+            ))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+    # corners_tabla no es un modelo de SQLAlchemy: se crea con el DDL del volcado
+    with open(CORNERS_SQL) as f:
+        sql = f.read()
+    with open(CORNERS_CSV, newline='') as f:
+        rows = list(csv.reader(f))
+    con = sqlite3.connect(path)
+    con.execute(sql[:sql.index(';') + 1])
+    # Los enfrentamientos que no están en los datos de entrenamiento reciben una fila sintética
+    trained = {(int(row[0]), int(row[1])) for row in rows[1:]}
+    rows += [
+        [local_id, visita_id, '2024-01-01'] + [
+            round(value * rng.uniform(0.6, 1.4), 4) for value in DEFAULT_CORNERS_DATA.values()
+        ]
+        for local_id, visita_id in sorted(pairs) if (local_id, visita_id) not in trained
+    ]
+    con.executemany(f"INSERT INTO corners_tabla VALUES ({','.join('?' * len(rows[0]))})", rows[1:])
+
+    # ganador_resultado_tabla no tiene volcado ni datos de entrenamiento en el repositorio:
+    # una fila por enfrentamiento con valores alrededor de los de referencia del pipeline
+    con.execute(
+        "CREATE TABLE ganador_resultado_tabla (id INTEGER PRIMARY KEY, equipo_local_id INTEGER NOT NULL, "
+        "equipo_visitante_id INTEGER NOT NULL, anio INTEGER NOT NULL, "
+        + ', '.join(f"{column} REAL" for column in GANADOR_FEATURE_COLUMNS) + ")"
+    )
+    ganador_rows = [
+        [local_id, visita_id, 2024] + [
+            round(DEFAULT_GANADOR_DATA[column] * rng.uniform(0.6, 1.4), 4) for column in GANADOR_FEATURE_COLUMNS
+        ]
+        for local_id, visita_id in sorted(pairs)
+    ]
+    columns = ['equipo_local_id', 'equipo_visitante_id', 'anio'] + GANADOR_FEATURE_COLUMNS
+    con.executemany(
+        f"INSERT INTO ganador_resultado_tabla ({', '.join(columns)}) VALUES ({','.join('?' * len(columns))})",
+        ganador_rows
+    )
+    con.commit()
+    con.close()
+
+    print(
+        f"✅ Base de pruebas creada: {len(TEAMS)} equipos, {len(pairs)} partidos, {len(rows) - 1} filas de "
+        f"corners_tabla, {len(ganador_rows)} de ganador_resultado_tabla"
+    )
+
+# Caminos de fallback que se esperan cuando un modelo no está disponible (faltante o
+# rechazado al cargar): cualquier otro fallback durante la medición invalida los números
+MODEL_FALLBACKS = {
+    'score_model': ('score_model', 'default_result'),
+    'corners_model': ('corners_model',),
+    'corners_scaler': ('corners_model',),
+    'yellow_cards_model': ('yellow_cards_default',),
+    'red_cards_cls_local': ('red_cards_default',),
+    'red_cards_cls_visitante': ('red_cards_default',),
+    'red_cards_reg_local': ('red_cards_default',),
+    'red_cards_reg_visitante': ('red_cards_default',)
+}
+
+def fallbacks_since(before):
+    """Fallbacks registrados desde la copia before de metrics.fallbacks: camino -> cantidad"""
+    from metrics import metrics
+    after = metrics.fallbacks.snapshot()
+    return {
+        labels[0]: value - before.get(labels, 0)
+        for labels, value in sorted(after.items()) if value > before.get(labels, 0)
+    }
+
+def summarize(samples):
+    """Resumen de una lista de duraciones en segundos (milisegundos)"""
+    values = np.asarray(samples) * 1000
+    return {
+        'n': int(values.size),
+        'mean_ms': round(float(values.mean()), 4),
+        'p50_ms': round(float(np.percentile(values, 50)), 4),
+        'p95_ms': round(float(np.percentile(values, 95)), 4),
+        'min_ms': round(float(values.min()), 4)
+    }
+
+def measure(func, repeat, warmup=3):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def fixtures(n, seed=0):
+    """n partidos reproducibles entre equipos distintos (nombre y código de cada lado)"""
+    rng = random.Random(seed)
+    names = list(TEAMS)
+    result = []
+    for _ in range(n):
+        home, away = rng.sample(names, 2)
+        result.append((home, away, TEAMS[home], TEAMS[away]))
+    return result
+
+def cold_start():
+    """Se ejecuta en un proceso nuevo: crea la app con carga anticipada y hace la primera predicción"""
+    started = time.perf_counter()
+    from app import create_app
+    from ml_models import predictor
+    from metrics import metrics
+    imported = time.perf_counter()
+
+    app = create_app()
+    created = time.perf_counter()
+
+    home, away, home_code, away_code = fixtures(1)[0]
+    response = app.test_client().post('/api/predict', json={
+        'home_name': home, 'away_name': away, 'home_code': home_code, 'away_code': away_code
+    })
+    finished = time.perf_counter()
+
+    return {
+        'import_s': round(imported - started, 4),
+        'create_app_s': round(created - imported, 4),
+        'first_predict_s': round(finished - created, 4),
+        'total_s': round(finished - started, 4),
+        'status': response.status_code,
+        'model_load_ms': {name: info['load_ms'] for name, info in predictor.load_report().items()}
+    }
+
+def run_cold_start():
+    """Arranque en frío en un intérprete nuevo (sin módulos ni modelos en memoria)"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--cold-start-child'],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f"El proceso de arranque en frío falló: {output.stderr[-2000:]}")
+
+def model_estimators(predictor):
+    """Estimadores cargados (también los rechazados por el esquema) con la función de inferencia que usa la aplicación"""
+    estimators = {}
+    for name in predictor.load_report():
+        model = predictor.artifact(name)
+        if isinstance(model, dict):
+            model = model.get('model')
+        if model is None or not hasattr(model, 'n_features_in_'):
+            continue
+        if hasattr(model, 'predict_proba'):
+            estimators[name] = (model, model.predict_proba)
+        elif hasattr(model, 'predict'):
+            estimators[name] = (model, model.predict)
+        elif hasattr(model, 'transform'):
+            estimators[name] = (model, model.transform)
+    return estimators
+
+def bench_models(predictor, batch_sizes, repeat, seed=0):
+    """Latencia de una fila y rendimiento por lotes de cada modelo con features sintéticas"""
+    rng = np.random.default_rng(seed)
+    results = {}
+    for name, (model, infer) in model_estimators(predictor).items():
+        X = rng.normal(0, 1, (max(batch_sizes), model.n_features_in_))
+        single = X[:1]
+        entry = {
+            'type': type(model).__name__,
+            'n_features': int(model.n_features_in_),
+            'single_row': summarize(measure(lambda: infer(single), repeat)),
+            'batch': {}
+        }
+        for size in batch_sizes:
+            rows = X[:size]
+            samples = measure(lambda: infer(rows), max(3, repeat // 5))
+            entry['batch'][str(size)] = {
+                'p50_ms': summarize(samples)['p50_ms'],
+                'rows_per_s': round(size / float(np.median(samples)), 1)
+            }
+        results[name] = entry
+        print(f"⏱️ {name}: fila única p50 {entry['single_row']['p50_ms']:.3f} ms")
+    return results
+
+def bench_pipeline(app, batch_sizes, repeat):
+    """Rendimiento del pipeline completo (features, modelos y armado) por tamaño de lote"""
+    from models import Equipo
+    from prediction_pipeline import predict_fixtures
+
+    results = {}
+    with app.app_context():
+        teams = {equipo.nombre: equipo for equipo in Equipo.query.all()}
+        for size in batch_sizes:
+            batch = fixtures(size, seed=size)
+            home_teams = [teams[home] for home, _, _, _ in batch]
+            away_teams = [teams[away] for _, away, _, _ in batch]
+            home_codes = [home_code for _, _, home_code, _ in batch]
+            away_codes = [away_code for _, _, _, away_code in batch]
+            samples = measure(
+                lambda: predict_fixtures(home_teams, away_teams, home_codes, away_codes),
+                max(3, repeat // 5)
+            )
+            results[str(size)] = {
+                'p50_ms': summarize(samples)['p50_ms'],
+                'rows_per_s': round(size / float(np.median(samples)), 1)
+            }
+            print(f"⏱️ Pipeline lote {size}: {results[str(size)]['rows_per_s']} partidos/s")
+    return results
+
+def bench_end_to_end(app, repeat):
+    """Latencia de /api/predict (validación, consultas, pipeline, guardado y JSON)"""
+    client = app.test_client()
+    requests_ = [
+        {'home_name': home, 'away_name': away, 'home_code': home_code, 'away_code': away_code}
+        for home, away, home_code, away_code in fixtures(repeat, seed=1)
+    ]
+    for payload in requests_[:3]:
+        client.post('/api/predict', json=payload)
+
+    samples = []
+    errors = 0
+    for payload in requests_:
+        started = time.perf_counter()
+        response = client.post('/api/predict', json=payload)
+        samples.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            errors += 1
+
+    result = summarize(samples)
+    result['errors'] = errors
+    print(f"⏱️ /api/predict: p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms")
+    return result
+
+def environment():
+    """Versiones y commit para identificar la ejecución"""
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    versions = {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn.__version__}
+    try:
+        import xgboost
+        versions['xgboost'] = xgboost.__version__
+    except ImportError:
+        pass
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit or None,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions
+    }
+
+def flatten(data, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1} (solo valores numéricos)"""
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+def compare(results, baseline, tolerance):
+    """
+    Compara las métricas de tiempo y rendimiento con una ejecución anterior
+
+    Returns:
+        list: Métricas que empeoraron más que la tolerancia
+    """
+    current = flatten(results['results'])
+    previous = flatten(baseline['results'])
+    regressions = []
+    for key, value in sorted(current.items()):
+        old = previous.get(key)
+        higher_is_better = next((better for suffix, better in COMPARED_SUFFIXES.items() if key.endswith(suffix)), None)
+        if higher_is_better is None or not old:
+            continue
+        change = (value - old) / old
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append({'metric': key, 'baseline': old, 'current': value, 'change': round(change, 4)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del camino de predicción')
+    parser.add_argument('--output', default='benchmark_results.json', help='Archivo JSON de resultados')
+    parser.add_argument('--database', help='Ruta de la base SQLite de pruebas (por defecto, temporal)')
+    parser.add_argument('--repeat', type=int, default=50, help='Repeticiones por medición de latencia')
+    parser.add_argument('--batch-sizes', default=','.join(map(str, DEFAULT_BATCH_SIZES)), help='Tamaños de lote separados por coma')
+    parser.add_argument('--compiled', action='store_true', help='Usar ensambles compilados (COMPILED_INFERENCE=1)')
+    parser.add_argument('--execution', choices=['sequential', 'threaded'], default='sequential', help='MODEL_EXECUTION')
+    parser.add_argument('--skip-cold-start', action='store_true', help='No medir el arranque en frío')
+    parser.add_argument('--baseline', help='JSON de una ejecución anterior para detectar regresiones')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Empeoramiento relativo permitido frente a --baseline')
+    parser.add_argument('--cold-start-child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+
+    if args.cold_start_child:
+        print(json.dumps(cold_start()))
+        return 0
+
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix='upsbet-bench-'), 'benchmark.db')
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size.strip()]
+
+    # La configuración se lee de variables de entorno al importar config.py; el proceso de
+    # arranque en frío las hereda. La caché de predicciones se desactiva para medir el
+    # pipeline en cada petición.
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.abspath(database)}",
+        'MODEL_LOADING': 'eager',
+        'TRACE_LEVEL': 'off',
+        'PREDICTION_CACHE_ENABLED': '0',
+        'PREDICTION_MATRIX_ENABLED': '0',
+        'PREDICTION_WRITE_BEHIND': '0',
+        'COMPILED_INFERENCE': '1' if args.compiled else '0',
+        'MODEL_EXECUTION': args.execution
+    })
+
+    seed_database(database)
+
+    from app import create_app
+    from ml_models import predictor
+    from metrics import metrics
+
+    settings = {
+        'compiled': args.compiled,
+        'execution': args.execution,
+        'repeat': args.repeat,
+        'batch_sizes': batch_sizes
+    }
+    results = {}
+
+    if not args.skip_cold_start:
+        print("🔄 Midiendo arranque en frío...")
+        results['cold_start'] = run_cold_start()
+        print(f"⏱️ Arranque en frío: {results['cold_start']['total_s']:.2f}s")
+
+    app = create_app()
+    unavailable = sorted(name for name, entry in predictor.load_report().items() if entry['status'] != 'ok')
+    expected = {path for name in unavailable for path in MODEL_FALLBACKS.get(name, ())}
+    fallbacks = {}
+
+    print("🔄 Midiendo modelos...")
+    results['models'] = bench_models(predictor, batch_sizes, args.repeat)
+    before = metrics.fallbacks.snapshot()
+    print("🔄 Midiendo pipeline por lotes...")
+    results['pipeline'] = bench_pipeline(app, batch_sizes, args.repeat)
+    fallbacks['pipeline'] = fallbacks_since(before)
+    before = metrics.fallbacks.snapshot()
+    print("🔄 Midiendo /api/predict...")
+    results['end_to_end'] = bench_end_to_end(app, args.repeat)
+    fallbacks['end_to_end'] = fallbacks_since(before)
+
+    report = {
+        'environment': environment(),
+        'model_version': predictor.model_version(),
+        'settings': settings,
+        'unavailable_models': unavailable,
+        'fallbacks': fallbacks,
+        'results': results
+    }
+
+    status = 0
+    if unavailable:
+        print(f"⚠️ Modelos no disponibles (sus fallbacks no cuentan como error): {', '.join(unavailable)}")
+    for stage, paths in fallbacks.items():
+        unexpected = {path: count for path, count in paths.items() if path not in expected}
+        if unexpected:
+            print(f"❌ La etapa {stage} usó fallbacks: {unexpected}; los números no son válidos")
+            status = 1
+    if results['end_to_end']['errors']:
+        print(f"❌ /api/predict respondió con error {results['end_to_end']['errors']} veces")
+        status = 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['baseline'] = {
+            'file': args.baseline,
+            'model_version': baseline.get('model_version'),
+            'commit': baseline.get('environment', {}).get('commit'),
+            'regressions': compare(report, baseline, args.tolerance)
+        }
+        for regression in report['baseline']['regressions']:
+            print(f"⚠️ Regresión en {regression['metric']}: {regression['baseline']} -> {regression['current']} ({regression['change']:+.0%})")
+        if report['baseline']['regressions']:
+            status = 1
+        else:
+            print(f"✅ Sin regresiones mayores a {args.tolerance:.0%} frente a {args.baseline}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Resultados guardados en {args.output}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,8 @@
 Clases personalizadas necesarias para cargar los modelos entrenados
 """
 
+import os
+import pickle
 import numpy as np
 from sklearn.base import BaseEstimator, RegressorMixin, ClassifierMixin
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
@@ -92,3 +94,62 @@ def safe_load_model(filepath, custom_classes=None):
     except Exception as e:
         print(f"Error cargando {filepath}: {e}")
         return None
+
+# Alineación (bytes) de cada array dentro del archivo de datos compartido
+MMAP_ALIGNMENT = 64
+
+class _ArrayPackingPickler(pickle.Pickler):
+    """Pickler que saca los arrays de NumPy del pickle y los escribe en un único buffer de datos"""
+    
+    def __init__(self, file, data_file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.data_file = data_file
+        self.offset = 0
+    
+    def persistent_id(self, obj):
+        if type(obj) not in (np.ndarray, np.memmap) or obj.dtype.hasobject or obj.size == 0:
+            return None
+        
+        order = 'F' if obj.flags.f_contiguous and not obj.flags.c_contiguous else 'C'
+        padding = -self.offset % MMAP_ALIGNMENT
+        self.data_file.write(b'\0' * padding)
+        self.offset += padding
+        
+        pid = ('ndarray', self.offset, obj.dtype, obj.shape, order)
+        data = obj.tobytes(order=order)
+        self.data_file.write(data)
+        self.offset += len(data)
+        return pid
+
+class _ArrayMappingUnpickler(pickle.Unpickler):
+    """Unpickler que reconstruye los arrays como vistas de solo lectura del archivo de datos mapeado"""
+    
+    def __init__(self, file, buffer):
+        super().__init__(file)
+        self.buffer = buffer
+    
+    def persistent_load(self, pid):
+        kind, offset, dtype, shape, order = pid
+        if kind != 'ndarray':
+            raise pickle.UnpicklingError(f"Objeto persistente desconocido: {kind}")
+        return np.ndarray(shape, dtype=dtype, buffer=self.buffer, offset=offset, order=order)
+
+def dump_mmap_bundle(model, skeleton_path):
+    """
+    Guarda un modelo en dos archivos: el esqueleto (pickle sin los arrays) y un único
+    archivo de datos con todos los arrays de NumPy. Así el modelo completo se mapea en
+    memoria con un solo descriptor de archivo.
+    """
+    data_path = f"{skeleton_path}.data"
+    with open(data_path, 'wb') as data_file, open(skeleton_path, 'wb') as skeleton_file:
+        _ArrayPackingPickler(skeleton_file, data_file).dump(model)
+
+def load_mmap_bundle(skeleton_path):
+    """Carga un modelo guardado con dump_mmap_bundle mapeando sus arrays en memoria (solo lectura)"""
+    data_path = f"{skeleton_path}.data"
+    if os.path.getsize(data_path):
+        buffer = np.memmap(data_path, dtype=np.uint8, mode='r')
+    else:
+        buffer = b''
+    with open(skeleton_path, 'rb') as skeleton_file:
+        return _ArrayMappingUnpickler(skeleton_file, buffer).load()
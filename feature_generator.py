@@ -6,6 +6,11 @@ Generador de features para los modelos de predicción
 import numpy as np
 import pandas as pd
 from models import db, Partido, Equipo
+from rolling_features import rolling_features
+from team_registry import team_registry
+
+# Features de córners por defecto (partidos sin datos históricos)
+DEFAULT_CORNERS_FEATURES = np.array([5.0, 4.5, 5.2, 4.8, 4.3, 2.0, 0.4, 4.1, 1.8, 0.2, 0.7, 2.1, 0.3, 0.9, 0.5, 0.3])
 
 class FeatureGenerator:
     """Genera features para los diferentes modelos"""
@@ -21,11 +26,45 @@ class FeatureGenerator:
             'diff_corners_visitante'
         ]
     
+    def team_ids_by_code(self):
+        """Retorna el mapa código -> id de equipo (desde el registro de equipos)"""
+        try:
+            return team_registry.ids_by_code()
+        except Exception as e:
+            print(f"Error obteniendo ids de equipos: {e}")
+            return {}
+    
+    def _rolling_rows(self, home_codes, away_codes, features):
+        """
+        Rellena en features las filas que se pueden calcular con el motor de features
+        móviles y retorna la máscara de esas filas
+        """
+        mask = np.zeros(len(home_codes), dtype=bool)
+        if not rolling_features.ready():
+            return mask
+        
+        team_ids = self.team_ids_by_code()
+        for i, (home_code, away_code) in enumerate(zip(home_codes, away_codes)):
+            home_id = team_ids.get(home_code)
+            away_id = team_ids.get(away_code)
+            if home_id is None or away_id is None:
+                continue
+            vector = rolling_features.vector(home_id, away_id)
+            if vector is not None:
+                features[i] = vector
+                mask[i] = True
+        return mask
+    
     def generate_corners_features(self, home_code, away_code, historical_data=None):
         """
         Genera las 16 features necesarias para el modelo de córners
         """
         try:
+            # Features reales desde las ventanas móviles de ambos equipos
+            rolling = np.tile(DEFAULT_CORNERS_FEATURES, (1, 1))
+            if self._rolling_rows([home_code], [away_code], rolling)[0]:
+                return rolling
+            
             # Si no hay datos históricos, generar features por defecto
             if historical_data is None:
                 # Features por defecto basadas en códigos de equipos
@@ -86,11 +125,9 @@ class FeatureGenerator:
         """
         try:
             # Obtener IDs de equipos
-            home_team = Equipo.query.filter_by(codigo=home_code).first()
-            away_team = Equipo.query.filter_by(codigo=away_code).first()
-            
-            home_id = home_team.id if home_team else 1
-            away_id = away_team.id if away_team else 2
+            team_ids = self.team_ids_by_code()
+            home_id = team_ids.get(home_code, 1)
+            away_id = team_ids.get(away_code, 2)
             
             # Generar features básicas
             corners_features = self.generate_corners_features(home_code, away_code, historical_data)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Índice en memoria de las tablas de features (corners_tabla y ganador_resultado_tabla)
+"""
+
+import threading
+import time
+import numpy as np
+from sqlalchemy import text
+from models import db
+
+# Orden de las features que consumen los modelos
+CORNERS_FEATURE_COLUMNS = [
+    'corners_vs_rival_hist', 'last3_vs_media_liga', 'local_avg_last3',
+    'local_avg_last5', 'visitante_avg_last3', 'local_corner_category',
+    'diff_last3_vs_last5_local', 'visitante_avg_last5',
+    'visitante_corner_category', 'diff_last3_vs_last5_visitante',
+    'consistencia_corners_local', 'tiros_bloqueados_local',
+    'corners_por_ataque_peligroso', 'diff_corners_equipo', 'diff_corners_local',
+    'diff_corners_visitante'
+]
+
+GANADOR_FEATURE_COLUMNS = [
+    'goles_local_avg_last3', 'goles_local_avg_last5', 'goles_visitante_avg_last3',
+    'goles_visitante_avg_last5', 'goles_vs_rival_hist', 'goles_por_ataque_peligroso_local',
+    'goles_por_ataque_peligroso_visitante', 'eficiencia_ataque_local', 'eficiencia_ataque_visitante',
+    'defensa_local_avg_last3', 'defensa_local_avg_last5', 'defensa_visitante_avg_last3',
+    'defensa_visitante_avg_last5', 'form_local', 'form_visitante', 'momentum_local', 'momentum_visitante'
+]
+
+class FeatureTableIndex:
+    """
+    Mantiene la última fila de features de cada par (equipo_local_id, equipo_visitante_id)
+    como un vector contiguo de NumPy. Las filas de todos los pares viven en una sola
+    matriz; cada lookup devuelve una vista de su fila.
+    """
+
+    def __init__(self, table, order_column, feature_columns):
+        self.table = table
+        self.order_column = order_column
+        self.feature_columns = feature_columns
+
+        # Estado publicado: se reemplaza completo en cada carga para que las
+        # lecturas no necesiten lock
+        self._state = None
+        self._lock = threading.Lock()
+        self._last_attempt = None
+
+        self.revision = 0
+        self.last_error = None
+
+    def _read_rows(self, since=None):
+        """Lee filas de la tabla (todas o desde la marca de agua) en orden ascendente"""
+        query = f"SELECT * FROM {self.table}"
+        params = {}
+        if since is not None:
+            query += f" WHERE {self.order_column} >= :since"
+            params['since'] = since
+        query += f" ORDER BY {self.order_column} ASC"
+
+        with db.engine.connect() as conn:
+            result = conn.execute(text(query), params)
+            columns = list(result.keys())
+            return columns, result.fetchall()
+
+    def _build_state(self, columns, rows, previous=None):
+        """Construye el nuevo estado a partir del anterior y de las filas leídas"""
+        present = [col for col in self.feature_columns if col in columns]
+        positions = [columns.index(col) for col in present]
+        local_pos = columns.index('equipo_local_id')
+        visitante_pos = columns.index('equipo_visitante_id')
+        order_pos = columns.index(self.order_column)
+
+        if previous is not None:
+            latest = {key: (order, previous['matrix'][i]) for key, (order, i) in previous['keys'].items()}
+            watermark = previous['watermark']
+        else:
+            latest = {}
+            watermark = None
+
+        changed = 0
+        for row in rows:
+            order = row[order_pos]
+            if order is None:
+                continue
+            key = (row[local_pos], row[visitante_pos])
+            current = latest.get(key)
+            if current is None or order >= current[0]:
+                vector = np.array([np.nan if row[p] is None else row[p] for p in positions], dtype=np.float64)
+                if current is None or current[0] != order or not np.array_equal(current[1], vector, equal_nan=True):
+                    changed += 1
+                latest[key] = (order, vector)
+            if watermark is None or order > watermark:
+                watermark = order
+
+        matrix = np.empty((len(latest), len(present)), dtype=np.float64)
+        keys = {}
+        for i, (key, (order, vector)) in enumerate(latest.items()):
+            matrix[i] = vector
+            keys[key] = (order, i)
+
+        return {
+            'columns': present,
+            'matrix': matrix,
+            'keys': keys,
+            'watermark': watermark
+        }, changed
+
+    def load(self):
+        """Carga completa de la tabla"""
+        with self._lock:
+            self._last_attempt = time.monotonic()
+            try:
+                columns, rows = self._read_rows()
+                state, _ = self._build_state(columns, rows)
+                self._state = state
+                self.revision += 1
+                self.last_error = None
+                print(f"✅ Índice de {self.table} cargado: {len(state['keys'])} enfrentamientos")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error cargando índice de {self.table}: {e}")
+
+    def refresh(self):
+        """Recarga incremental: solo lee filas desde la última marca de agua"""
+        if self._state is None:
+            self.load()
+            return
+
+        with self._lock:
+            self._last_attempt = time.monotonic()
+            try:
+                previous = self._state
+                columns, rows = self._read_rows(since=previous['watermark'])
+                state, changed = self._build_state(columns, rows, previous)
+                if changed:
+                    self._state = state
+                    self.revision += 1
+                    print(f"🔄 Índice de {self.table} actualizado: {changed} filas nuevas")
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error actualizando índice de {self.table}: {e}")
+
+    def ensure_fresh(self, refresh_seconds):
+        """Carga el índice en el primer uso y lo refresca cada refresh_seconds"""
+        if self._last_attempt is None:
+            self.load()
+        elif refresh_seconds and time.monotonic() - self._last_attempt >= refresh_seconds:
+            self.refresh()
+        return self._state is not None
+
+    def get_vector(self, equipo_local_id, equipo_visitante_id):
+        """
+        Retorna (vector, columnas, invertido) para el par, buscando primero el
+        enfrentamiento directo y luego el invertido. vector es None si no hay datos.
+        """
+        state = self._state
+        if state is None:
+            return None, [], False
+
+        entry = state['keys'].get((equipo_local_id, equipo_visitante_id))
+        if entry is not None:
+            return state['matrix'][entry[1]], state['columns'], False
+
+        entry = state['keys'].get((equipo_visitante_id, equipo_local_id))
+        if entry is not None:
+            return state['matrix'][entry[1]], state['columns'], True
+
+        return None, state['columns'], False
+
+    def get(self, equipo_local_id, equipo_visitante_id):
+        """Igual que get_vector pero retorna la fila como diccionario columna -> valor"""
+        vector, columns, invertido = self.get_vector(equipo_local_id, equipo_visitante_id)
+        if vector is None:
+            return None, False
+        return dict(zip(columns, vector.tolist())), invertido
+
+    def stats(self):
+        """Información del índice para diagnóstico"""
+        state = self._state
+        return {
+            'table': self.table,
+            'loaded': state is not None,
+            'pairs': len(state['keys']) if state else 0,
+            'columns': len(state['columns']) if state else 0,
+            'watermark': str(state['watermark']) if state and state['watermark'] is not None else None,
+            'revision': self.revision,
+            'last_error': self.last_error
+        }
+
+class FeatureIndex:
+    """Agrupa los índices de las tablas de features que usa /api/predict"""
+
+    def __init__(self):
+        self.enabled = True
+        self.refresh_seconds = 60
+        self.corners = FeatureTableIndex('corners_tabla', 'fecha', CORNERS_FEATURE_COLUMNS)
+        self.ganador = FeatureTableIndex('ganador_resultado_tabla', 'anio', GANADOR_FEATURE_COLUMNS)
+
+    def configure(self, enabled=True, refresh_seconds=60):
+        """Aplica la configuración de la aplicación"""
+        self.enabled = enabled
+        self.refresh_seconds = refresh_seconds
+
+    def ready(self, table_index):
+        """Indica si se puede usar el índice (lo carga o refresca si corresponde)"""
+        return self.enabled and table_index.ensure_fresh(self.refresh_seconds)
+
+    def refresh(self):
+        """Fuerza una recarga incremental de ambos índices"""
+        self.corners.refresh()
+        self.ganador.refresh()
+
+    def reload(self):
+        """
+        Recarga completa de ambos índices. La recarga incremental solo lee filas desde la
+        marca de agua, así que las filas anteriores corregidas en el lugar (por ejemplo con
+        load_data.py) solo se ven con una recarga completa o al reiniciar la app.
+        """
+        self.corners.load()
+        self.ganador.load()
+
+    @property
+    def revision(self):
+        """Revisión combinada de las tablas de features"""
+        return (self.corners.revision, self.ganador.revision)
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'refresh_seconds': self.refresh_seconds,
+            'corners_tabla': self.corners.stats(),
+            'ganador_resultado_tabla': self.ganador.stats()
+        }
+
+# Instancia global del índice de features
+feature_index = FeatureIndex()
@@ -0,0 +1,48 @@
+"""
+Configuración de gunicorn para servir UPSBet compartiendo los modelos entre workers
+
+    gunicorn -c gunicorn.conf.py
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+pidfile = os.environ.get('GUNICORN_PIDFILE', 'gunicorn.pid')
+
+# Cargar la app (y los modelos) una sola vez en el maestro antes de crear los workers.
+# Con MODEL_MMAP_DIR los arrays de los árboles vienen de archivos mapeados en memoria,
+# así que los workers comparten esas páginas en lugar de duplicarlas.
+preload_app = True
+
+def post_fork(server, worker):
+    """Descarta las conexiones del pool heredadas del maestro: cada worker abre las suyas"""
+    from models import db
+    
+    # Con -k uvicorn.workers.UvicornWorker asgi:app la app Flask es la que monta asgi.py
+    if getattr(server.app, 'app_uri', wsgi_app).startswith('asgi:'):
+        from asgi import flask_app as app
+    else:
+        from wsgi import app
+    
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def post_worker_init(worker):
+    """
+    Recarga los modelos si los archivos cambiaron después de la precarga del maestro:
+    kill -HUP al maestro crea workers nuevos que cargan los modelos actuales mientras los
+    anteriores terminan sus peticiones
+    """
+    from model_reloader import model_reloader
+    
+    model_reloader.reload_if_changed('worker nuevo')
+
+def worker_exit(server, worker):
+    """Guarda las predicciones pendientes de la escritura diferida antes de salir"""
+    from write_behind import prediction_writer
+    
+    prediction_writer.drain()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Carga masiva de CSV en corners_tabla, ganador_resultado_tabla y partidos
+
+En PostgreSQL (psycopg2) el archivo se transmite con COPY a una tabla temporal y se
+pasa a la tabla destino con un solo INSERT ... ON CONFLICT por la clave natural; en
+otros motores (o con --method executemany) se usan inserts por lotes con la misma
+cláusula ON CONFLICT. Volver a cargar el mismo archivo no duplica filas: las filas con
+la misma clave se actualizan y, si se repite una clave en el archivo, gana la última.
+
+Una app en marcha incorpora sola las filas nuevas de corners_tabla y ganador_resultado_tabla
+(su índice en memoria lee desde la última fecha/año cargado), pero no las filas existentes
+que la carga actualizó: hay que reiniciarla (kill -HUP al maestro de gunicorn) o pedir
+POST /api/features/index en cada proceso.
+
+Uso:
+    python load_data.py corners app/data/dataset_corners_listo.csv
+    python load_data.py partidos temporadas_2020_2024.csv --batch-size 10000
+    python load_data.py corners app/data/dataset_corners_listo.csv --dedupe
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text
+from config import Config
+
+# Conjuntos de datos: tabla destino, clave natural y DDL para crear la tabla si no existe
+DATASETS = {
+    'corners': {
+        'table': 'corners_tabla',
+        'key': ('equipo_local_id', 'equipo_visitante_id', 'fecha'),
+        'ddl_file': 'app/data/datos_tabla_corners.sql'
+    },
+    'ganador': {
+        'table': 'ganador_resultado_tabla',
+        'key': ('equipo_local_id', 'equipo_visitante_id', 'anio'),
+        'ddl_file': None
+    },
+    'partidos': {
+        'table': 'partidos',
+        'key': ('equipo_local_id', 'equipo_visita_id', 'fecha'),
+        'ddl_file': None
+    }
+}
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Tablas que la app mantiene en el índice de features en memoria (feature_index.py)
+FEATURE_DATASETS = ('corners', 'ganador')
+
+class LoadError(Exception):
+    """Error de carga que se informa sin traza completa"""
+
+def unique_index_name(spec):
+    return f"ux_{spec['table']}_{'_'.join(spec['key'])}"
+
+def ensure_table(engine, spec):
+    """Crea la tabla con el DDL del volcado SQL si todavía no existe"""
+    if inspect(engine).has_table(spec['table']):
+        return
+    if not spec['ddl_file']:
+        raise LoadError(f"La tabla {spec['table']} no existe")
+    with open(spec['ddl_file'], encoding='utf-8') as f:
+        sql = f.read()
+    with engine.begin() as conn:
+        conn.execute(text(sql[:sql.index(';') + 1]))
+    print(f"✅ Tabla {spec['table']} creada desde {spec['ddl_file']}")
+
+def dedupe_existing(engine, spec):
+    """
+    Elimina filas repetidas por la clave natural dejando la última insertada.
+
+    Solo considera filas con todas las columnas de la clave no nulas: el índice único trata
+    los NULL como distintos, así que esas filas no chocan y se conservan. En PostgreSQL usa
+    MAX(ctid), que requiere PostgreSQL 14 o superior.
+    """
+    table, key = spec['table'], ', '.join(spec['key'])
+    row_id = {'postgresql': 'ctid', 'sqlite': 'rowid'}.get(engine.dialect.name)
+    if row_id is None:
+        raise LoadError(f"--dedupe no está soportado en {engine.dialect.name}")
+    with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql' and (engine.dialect.server_version_info or (0,)) < (14,):
+            raise LoadError("--dedupe requiere PostgreSQL 14 o superior (MAX(ctid))")
+        not_null = ' AND '.join(f"{column} IS NOT NULL" for column in spec['key'])
+        deleted = conn.execute(text(
+            f"DELETE FROM {table} WHERE {not_null} AND {row_id} NOT IN "
+            f"(SELECT MAX({row_id}) FROM {table} WHERE {not_null} GROUP BY {key})"
+        )).rowcount
+    print(f"🔄 {deleted} filas repetidas eliminadas de {table}")
+
+def ensure_unique_key(engine, spec, dedupe=False):
+    """Índice único sobre la clave natural (requerido por ON CONFLICT)"""
+    if dedupe:
+        dedupe_existing(engine, spec)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {unique_index_name(spec)} "
+                f"ON {spec['table']} ({', '.join(spec['key'])})"
+            ))
+    except Exception as e:
+        raise LoadError(
+            f"No se pudo crear el índice único de {spec['table']} ({', '.join(spec['key'])}); "
+            f"si la tabla ya tiene filas repetidas, vuelva a ejecutar con --dedupe: {e}"
+        )
+
+def plan_columns(engine, spec, header):
+    """
+    Columnas destino y conversión de cada fila del CSV. Una columna 'equipo_local' (o
+    'equipo_visita', 'equipo_visitante') con el nombre del equipo se traduce a su id.
+
+    Returns:
+        tuple: (columnas destino, función fila -> valores)
+    """
+    table_columns = {column['name'] for column in inspect(engine).get_columns(spec['table'])}
+
+    team_ids = None
+    sources = []
+    columns = []
+    for i, name in enumerate(header):
+        name = name.strip()
+        if name in table_columns:
+            columns.append(name)
+            sources.append((i, None))
+        elif f"{name}_id" in table_columns:
+            if team_ids is None:
+                with engine.connect() as conn:
+                    team_ids = dict(conn.execute(text("SELECT nombre, id FROM equipos")).all())
+            columns.append(f"{name}_id")
+            sources.append((i, team_ids))
+        else:
+            raise LoadError(f"La columna '{name}' no existe en {spec['table']}")
+
+    missing = [column for column in spec['key'] if column not in columns]
+    if missing:
+        raise LoadError(f"Faltan columnas de la clave en el CSV: {', '.join(missing)}")
+    if len(set(columns)) != len(columns):
+        raise LoadError("El CSV tiene columnas repetidas")
+
+    def convert(row):
+        values = []
+        for i, names in sources:
+            value = row[i] if i < len(row) else ''
+            if value == '':
+                values.append(None)
+            elif names is None:
+                values.append(value)
+            elif value in names:
+                values.append(names[value])
+            else:
+                raise LoadError(f"Equipo desconocido: {value}")
+        return values
+
+    return columns, convert
+
+def batches(reader, convert, batch_size):
+    batch = []
+    for row in reader:
+        if not row:
+            continue
+        batch.append(convert(row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def upsert_clause(spec, columns):
+    updates = [column for column in columns if column not in spec['key']]
+    if not updates:
+        return f"ON CONFLICT ({', '.join(spec['key'])}) DO NOTHING"
+    assignments = ', '.join(f"{column} = EXCLUDED.{column}" for column in updates)
+    return f"ON CONFLICT ({', '.join(spec['key'])}) DO UPDATE SET {assignments}"
+
+def needs_created_at(engine, spec, columns):
+    """Indica si se debe completar created_at (la tabla la tiene y el CSV no)"""
+    table_columns = {column['name'] for column in inspect(engine).get_columns(spec['table'])}
+    return 'created_at' in table_columns and 'created_at' not in columns
+
+def load_copy(engine, spec, columns, rows, add_created_at):
+    """COPY a una tabla temporal y un solo INSERT ... SELECT ... ON CONFLICT"""
+    table, key = spec['table'], ', '.join(spec['key'])
+    column_list = ', '.join(columns)
+    target_columns = column_list + (', created_at' if add_created_at else '')
+    select_columns = column_list + (', CURRENT_TIMESTAMP' if add_created_at else '')
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        # Tabla temporal con solo las columnas del archivo (sin restricciones ni secuencias)
+        # y el orden de lectura para quedarse con la última fila de cada clave
+        cursor.execute(
+            f"CREATE TEMP TABLE staging ON COMMIT DROP AS SELECT {column_list} FROM {table} WITH NO DATA; "
+            f"ALTER TABLE staging ADD COLUMN _orden BIGSERIAL"
+        )
+        copied = 0
+        for batch in rows:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY staging ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+            copied += len(batch)
+
+        # DISTINCT ON: una fila por clave (la última del archivo) para que ON CONFLICT no
+        # tenga que actualizar la misma fila dos veces en la misma sentencia
+        cursor.execute(
+            f"INSERT INTO {table} ({target_columns}) "
+            f"SELECT {select_columns} FROM ("
+            f"SELECT DISTINCT ON ({key}) * FROM staging ORDER BY {key}, _orden DESC"
+            f") AS ultimas "
+            f"{upsert_clause(spec, columns)}"
+        )
+        written = cursor.rowcount
+        raw.commit()
+        return copied, written
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+def load_executemany(engine, spec, columns, rows, add_created_at):
+    """Inserts por lotes (executemany) con ON CONFLICT, un commit por lote"""
+    target_columns = list(columns) + (['created_at'] if add_created_at else [])
+    params = [f"p{i}" for i in range(len(target_columns))]
+    statement = text(
+        f"INSERT INTO {spec['table']} ({', '.join(target_columns)}) "
+        f"VALUES ({', '.join(':' + param for param in params)}) "
+        f"{upsert_clause(spec, columns)}"
+    )
+
+    copied = 0
+    created_at = datetime.utcnow()
+    for batch in rows:
+        payload = []
+        for values in batch:
+            if add_created_at:
+                values = values + [created_at]
+            payload.append(dict(zip(params, values)))
+        with engine.begin() as conn:
+            conn.execute(statement, payload)
+        copied += len(batch)
+    return copied, copied
+
+def load_csv(engine, dataset, path, batch_size=DEFAULT_BATCH_SIZE, method='auto', dedupe=False):
+    """
+    Carga un CSV con encabezado en la tabla del conjunto de datos
+
+    Args:
+        engine: Engine de SQLAlchemy
+        dataset (str): 'corners', 'ganador' o 'partidos'
+        path (str): Archivo CSV
+        batch_size (int): Filas por lote (COPY o executemany)
+        method (str): 'auto' (COPY en PostgreSQL con psycopg2), 'copy' o 'executemany'
+        dedupe (bool): Elimina filas repetidas por la clave antes de crear el índice único
+
+    Returns:
+        dict: Filas leídas, filas escritas, método y segundos
+    """
+    spec = DATASETS[dataset]
+    if method == 'auto':
+        use_copy = engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+    else:
+        use_copy = method == 'copy'
+
+    started = time.perf_counter()
+    ensure_table(engine, spec)
+    ensure_unique_key(engine, spec, dedupe)
+
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            raise LoadError(f"{path} está vacío")
+        columns, convert = plan_columns(engine, spec, header)
+        add_created_at = needs_created_at(engine, spec, columns)
+        rows = batches(reader, convert, batch_size)
+        loader = load_copy if use_copy else load_executemany
+        read, written = loader(engine, spec, columns, rows, add_created_at)
+
+    return {
+        'table': spec['table'],
+        'rows': read,
+        'written': written,
+        'method': 'copy' if use_copy else 'executemany',
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga masiva de CSV en las tablas de datos')
+    parser.add_argument('dataset', choices=sorted(DATASETS), help='Conjunto de datos')
+    parser.add_argument('files', nargs='+', help='Archivos CSV con encabezado')
+    parser.add_argument('--database-url', default=Config.SQLALCHEMY_DATABASE_URI, help='URL de la base de datos (por defecto DATABASE_URL)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Filas por lote')
+    parser.add_argument('--method', choices=['auto', 'copy', 'executemany'], default='auto', help='Método de carga')
+    parser.add_argument('--dedupe', action='store_true', help='Eliminar filas repetidas por la clave natural antes de cargar')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    try:
+        for path in args.files:
+            result = load_csv(engine, args.dataset, path, args.batch_size, args.method, args.dedupe)
+            print(
+                f"✅ {path}: {result['rows']} filas leídas, {result['written']} insertadas o actualizadas "
+                f"en {result['table']} ({result['method']}) en {result['seconds']:.2f}s"
+            )
+        if args.dataset in FEATURE_DATASETS:
+            print(
+                "⚠️ Las filas existentes actualizadas no llegan al índice en memoria de una app en marcha: "
+                "reiníciela (kill -HUP con gunicorn) o use POST /api/features/index"
+            )
+    except (LoadError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        engine.dispose()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
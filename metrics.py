@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Métricas de latencia por etapa, llamadas a modelos y caminos por defecto (formato Prometheus)
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context
+
+# Duraciones de Server-Timing de la petición en curso fuera de una petición Flask (modo
+# ASGI): el dict se comparte con los hilos que heredan el contexto (contextvars.copy_context)
+_server_timing = contextvars.ContextVar('server_timing', default=None)
+
+# Límites de los buckets de latencia en segundos
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Counter:
+    """Contador acumulado por combinación de etiquetas"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        """Copia de los valores actuales: etiquetas -> valor"""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in sorted(items):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+class Histogram:
+    """Histograma acumulado (buckets, suma y cantidad) por combinación de etiquetas"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, (list(state[0]), state[1], state[2])) for labels, state in self._values.items()]
+        for labels, (counts, total, count) in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', repr(bound)))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', '+Inf'))} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+class Gauge:
+    """Valores instantáneos obtenidos al momento de exportar (callback -> {etiquetas: valor})"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        try:
+            values = self.callback() if self.callback else {}
+        except Exception as e:
+            print(f"Error obteniendo métrica {self.name}: {e}")
+            return
+        for labels, value in sorted(values.items()):
+            if value is None:
+                continue
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {float(value)}"
+
+class MetricsRegistry:
+    """Métricas de la aplicación y su exportación en formato de texto de Prometheus"""
+
+    def __init__(self):
+        self.enabled = True
+        self._metrics = []
+
+        self.request_latency = self.register(Histogram(
+            'upsbet_request_seconds', 'Latencia de las peticiones por endpoint', ['endpoint']
+        ))
+        self.stage_latency = self.register(Histogram(
+            'upsbet_stage_seconds', 'Latencia de cada etapa del pipeline de predicción', ['stage']
+        ))
+        self.model_calls = self.register(Counter(
+            'upsbet_model_calls_total', 'Llamadas a cada modelo (una por lote de partidos)', ['model']
+        ))
+        self.model_rows = self.register(Counter(
+            'upsbet_model_rows_total', 'Partidos evaluados por cada modelo', ['model']
+        ))
+        self.fallbacks = self.register(Counter(
+            'upsbet_fallbacks_total', 'Respuestas servidas con valores por defecto o caminos alternativos', ['path']
+        ))
+
+    def configure(self, enabled=True):
+        self.enabled = enabled
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, labelnames=(), callback=None):
+        """Registra una métrica calculada al exportar"""
+        return self.register(Gauge(name, help_text, labelnames, callback))
+
+    def fallback(self, path, amount=1):
+        """Cuenta una respuesta servida por un camino por defecto"""
+        if self.enabled and amount:
+            self.fallbacks.inc(path, amount=amount)
+
+    def model_call(self, model, rows):
+        """Cuenta una llamada a un modelo con rows partidos"""
+        if self.enabled:
+            self.model_calls.inc(model)
+            self.model_rows.inc(model, amount=rows)
+
+    @contextmanager
+    def timed(self, stage, timings=None):
+        """
+        Mide una etapa: la agrega al histograma y a timings (dict etapa -> segundos)
+        o, si no se indica, a la cabecera Server-Timing de la petición actual
+        """
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stage_latency.observe(elapsed, stage)
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+            else:
+                self.add_server_timing(stage, elapsed)
+
+    def add_server_timing(self, stage, seconds):
+        """Agrega una duración a la cabecera Server-Timing de la petición actual"""
+        if not self.enabled:
+            return
+        timings = _server_timing.get()
+        if timings is None:
+            if not has_request_context():
+                return
+            timings = g.setdefault('server_timing', {})
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def collect_server_timing(self):
+        """
+        Junta en un dict (etapa -> segundos) las duraciones de Server-Timing registradas
+        dentro del bloque, también desde hilos que copian el contexto (modo ASGI)
+        """
+        timings = {}
+        token = _server_timing.set(timings)
+        try:
+            yield timings
+        finally:
+            _server_timing.reset(token)
+
+    @staticmethod
+    def server_timing_header(timings, total):
+        """Valor de la cabecera Server-Timing: cada etapa y el total de la petición"""
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ', '.join(parts)
+
+    def begin_request(self):
+        if self.enabled:
+            g.request_started = time.perf_counter()
+
+    def end_request(self, response, endpoint):
+        """Registra la latencia total y agrega la cabecera Server-Timing"""
+        if not self.enabled or 'request_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        self.request_latency.observe(elapsed, endpoint or 'unknown')
+
+        response.headers['Server-Timing'] = self.server_timing_header(g.get('server_timing', {}), elapsed)
+        return response
+
+    def render(self):
+        """Texto de exportación para Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+# Instancia global de métricas
+metrics = MetricsRegistry()
@@ -2,154 +2,674 @@ import joblib
 import numpy as np
 import pandas as pd
 import os
-from models import db, Partido, Equipo
+import hashlib
+import threading
+import time
+import contextvars
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app, has_app_context
+from models import db, Partido
 from datetime import datetime
-from feature_generator import FeatureGenerator
-from custom_models import safe_load_model
+from sqlalchemy import tuple_
+from feature_index import CORNERS_FEATURE_COLUMNS, GANADOR_FEATURE_COLUMNS
+from model_registry import MANIFEST_FILE, load_manifest, check_file, check_schema
+from team_registry import team_registry
+from metrics import metrics
+
+# Directorio y archivos de los modelos entrenados
+MODELS_DIR = 'app/models'
+MODEL_FILES = {
+    'corners_model': 'prediccion_corners_totales.pkl',
+    'corners_scaler': 'escalador_corners.pkl',
+    'red_cards_cls_local': 'modelo_rojas_cls_local.pkl',
+    'red_cards_cls_visitante': 'modelo_rojas_cls_visitante.pkl',
+    'red_cards_reg_local': 'modelo_rojas_reg_local.pkl',
+    'red_cards_reg_visitante': 'modelo_rojas_reg_visitante.pkl',
+    'red_thresholds': 'umbrales_rojas.pkl',
+    'yellow_cards_model': 'modelo_amarillas.pkl',
+    'score_model': 'modelo_marcador.pkl'
+}
+
+# Descripción de cada artefacto para los mensajes de carga
+MODEL_DESCRIPTIONS = {
+    'corners_model': 'Modelo de córners',
+    'corners_scaler': 'Escalador de córners',
+    'red_cards_cls_local': 'Modelo de tarjetas rojas clasificación local',
+    'red_cards_cls_visitante': 'Modelo de tarjetas rojas clasificación visitante',
+    'red_cards_reg_local': 'Modelo de tarjetas rojas regresión local',
+    'red_cards_reg_visitante': 'Modelo de tarjetas rojas regresión visitante',
+    'red_thresholds': 'Archivo de umbrales de tarjetas rojas',
+    'yellow_cards_model': 'Modelo de tarjetas amarillas',
+    'score_model': 'Modelo de marcador'
+}
+
+# Artefactos que no son estimadores y se cargan directamente con joblib
+PLAIN_JOBLIB_ARTIFACTS = {'corners_scaler', 'red_thresholds'}
+
+# Artefactos opcionales: si faltan se usa el fallback histórico sin considerarlo un error
+OPTIONAL_ARTIFACTS = {'yellow_cards_model'}
+
+# Features (en orden) que arma la aplicación para cada modelo; al cargarlo se valida que
+# el artefacto espere exactamente estas columnas
+MODEL_INPUT_FEATURES = {
+    'corners_scaler': CORNERS_FEATURE_COLUMNS,
+    'corners_model': ['equipo_local_id', 'equipo_visitante_id'] + CORNERS_FEATURE_COLUMNS,
+    'red_cards_cls_local': ['tarjetas_rojas_local', 'tarjetas_amarillas_local', 'goles_local', 'goles_visita'],
+    'red_cards_reg_local': ['tarjetas_rojas_local', 'tarjetas_amarillas_local', 'goles_local', 'goles_visita'],
+    'red_cards_cls_visitante': ['tarjetas_rojas_visita', 'tarjetas_amarillas_visita', 'goles_visita', 'goles_local'],
+    'red_cards_reg_visitante': ['tarjetas_rojas_visita', 'tarjetas_amarillas_visita', 'goles_visita', 'goles_local'],
+    'yellow_cards_model': ['tarjetas_amarillas_local', 'tarjetas_amarillas_visita', 'goles_local', 'goles_visita'],
+    'score_model': GANADOR_FEATURE_COLUMNS + ['home_code', 'away_code']
+}
+
+# Ensambles de árboles que se pueden compilar para inferencia rápida (tree_compiler.py)
+COMPILABLE_MODELS = {
+    'corners_model', 'red_cards_cls_local', 'red_cards_cls_visitante',
+    'red_cards_reg_local', 'red_cards_reg_visitante', 'yellow_cards_model', 'score_model'
+}
+
+def artifacts_fingerprint():
+    """Huella de la fecha de modificación y tamaño de cada archivo de modelo y del manifiesto"""
+    parts = []
+    for name, filename in sorted({**MODEL_FILES, 'manifest': MANIFEST_FILE}.items()):
+        try:
+            stat = os.stat(os.path.join(MODELS_DIR, filename))
+            parts.append(f"{name}:{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            parts.append(f"{name}:missing")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:12]
+
+class ModelReloadError(Exception):
+    """El conjunto nuevo de modelos no se publicó (sigue vigente el anterior)"""
+
+class ModelSet:
+    """
+    Artefactos que se publican juntos. Cada predicción fija el conjunto vigente al empezar
+    (MLPredictor.pinned) y una recarga arma un conjunto nuevo aparte y lo publica con una
+    sola asignación, así una petición nunca combina el escalador de un conjunto con el
+    modelo de otro.
+    """
+    
+    def __init__(self, generation=1):
+        self.generation = generation
+        self.version = artifacts_fingerprint()
+        self.created_at = time.time()
+        
+        # Artefactos ya cargados (nombre -> objeto, None si no existe o falló la carga)
+        self.models = {}
+        self.locks = {name: threading.Lock() for name in MODEL_FILES}
+        
+        # Tiempo de carga (segundos) y estado de cada artefacto
+        self.load_times = {}
+        self.load_status = {}
+        
+        # Objetos ya cargados por suma SHA-256 (y forma: original, compilado, compacto):
+        # los archivos idénticos comparten un solo objeto en memoria
+        self.shared = weakref.WeakValueDictionary()
+        
+        self._manifest = None
+        self._manifest_loaded = False
+    
+    def share(self, key, model):
+        """Registra un objeto para reutilizarlo con otro artefacto idéntico"""
+        if key[0] is None:
+            return model
+        try:
+            return self.shared.setdefault(key, model)
+        except TypeError:
+            # dict y otros tipos sin referencias débiles no se comparten
+            return model
+    
+    def manifest(self):
+        """Manifiesto de los artefactos (None si no existe; se lee una sola vez por conjunto)"""
+        if not self._manifest_loaded:
+            self._manifest = load_manifest(MODELS_DIR)
+            self._manifest_loaded = True
+            if self._manifest is None:
+                print(f"⚠️ Sin manifiesto de modelos en {MODELS_DIR}: se cargan sin verificar (python model_registry.py build)")
+        return self._manifest
+
+# Conjunto fijado por la predicción en curso (lo heredan los hilos de los sub-modelos)
+_pinned_set = contextvars.ContextVar('model_set', default=None)
+
+class LazyModel:
+    """Atributo de MLPredictor que deserializa su artefacto en el primer acceso"""
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        model_set = instance.model_set()
+        if self.name not in model_set.models:
+            instance.load_model(self.name, model_set)
+        return model_set.models.get(self.name)
+    
+    def __set__(self, instance, value):
+        instance.model_set().models[self.name] = value
 
 class MLPredictor:
+    # Modelos de córners
+    corners_model = LazyModel()
+    corners_scaler = LazyModel()
+    
+    # Modelos de tarjetas rojas
+    red_cards_cls_local = LazyModel()
+    red_cards_cls_visitante = LazyModel()
+    red_cards_reg_local = LazyModel()
+    red_cards_reg_visitante = LazyModel()
+    red_thresholds = LazyModel()
+    
+    # Modelo de tarjetas amarillas
+    yellow_cards_model = LazyModel()
+    
+    # Modelo de marcador
+    score_model = LazyModel()
+    
     def __init__(self):
-        # Modelos de córners
-        self.corners_model = None
-        self.corners_scaler = None
+        # Conjunto de artefactos vigente (se reemplaza entero en cada recarga)
+        self._current = ModelSet()
+        self._reload_lock = threading.Lock()
         
-        # Modelos de tarjetas rojas
-        self.red_cards_cls_local = None
-        self.red_cards_cls_visitante = None
-        self.red_cards_reg_local = None
-        self.red_cards_reg_visitante = None
-        self.red_thresholds = None
+        # Verificación de la suma de cada archivo contra app/models/manifest.json
+        self.verify_checksums = True
         
-        # Modelo de tarjetas amarillas
-        self.yellow_cards_model = None
+        # Ensambles compactos (float32 y enteros angostos) en lugar de los originales
+        self.compact = False
+        self.compact_tolerance = 1e-4
         
-        # Modelo de marcador
-        self.score_model = None
+        # Directorio de copias sin comprimir para cargar con mmap (None = desactivado)
+        self.mmap_dir = None
         
-        self.feature_generator = FeatureGenerator()
-        self.load_models()
+        # Inferencia con ensambles compilados y máximo de filas por llamada para usarlos
+        self.compiled = False
+        self.compiled_max_rows = 16
+        
+        # Ejecución de los sub-modelos: 'sequential' o 'threaded' (pool compartido)
+        self.execution = 'sequential'
+        self.execution_workers = 4
+        self.model_timeout = None
+        self._executor = None
+        self._executor_slots = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self.submodel_timeouts = Counter()
+        self.submodel_errors = Counter()
+        self.submodel_saturated = Counter()
     
-    def load_models(self):
-        """Carga los modelos entrenados desde archivos"""
-        try:
-            # Cargar modelo de córners
-            if os.path.exists('app/models/prediccion_corners_totales.pkl'):
-                self.corners_model = safe_load_model('app/models/prediccion_corners_totales.pkl')
-                print("✅ Modelo de córners cargado correctamente")
-            
-            if os.path.exists('app/models/escalador_corners.pkl'):
-                self.corners_scaler = joblib.load('app/models/escalador_corners.pkl')
-                print("✅ Escalador de córners cargado correctamente")
+    def configure(self, mmap_dir=None, compiled=False, compiled_max_rows=16,
+                  execution='sequential', execution_workers=4, model_timeout=None,
+                  verify_checksums=True, compact=False, compact_tolerance=1e-4):
+        """
+        Args:
+            mmap_dir (str): Directorio donde guardar copias empaquetadas de los modelos para
+                cargarlas con mmap. Los arrays de los árboles quedan en páginas de solo
+                lectura que comparten todos los workers.
+            compiled (bool): Compila los ensambles de árboles al cargarlos
+            compiled_max_rows (int): Lotes de hasta este tamaño usan la versión compilada;
+                los mayores, el modelo original (0 = siempre la compilada)
+            execution (str): 'threaded' evalúa los sub-modelos independientes en paralelo
+            execution_workers (int): Hilos del pool compartido de sub-modelos
+            model_timeout (float): Segundos máximos por sub-modelo antes de usar su valor
+                por defecto (None = sin límite)
+            verify_checksums (bool): Compara la suma SHA-256 de cada archivo con el manifiesto
+            compact (bool): Reemplaza los ensambles de árboles por su versión compilada
+                compacta (float32 y enteros angostos) sin conservar el original
+            compact_tolerance (float): Diferencia máxima de predicción aceptada para usar
+                la versión compacta
+        """
+        self.mmap_dir = mmap_dir
+        self.verify_checksums = verify_checksums
+        self.compact = compact
+        self.compact_tolerance = compact_tolerance
+        self.compiled = compiled
+        self.compiled_max_rows = compiled_max_rows
+        self.execution = execution
+        self.execution_workers = execution_workers
+        self.model_timeout = model_timeout
+    
+    def submodel_executor(self):
+        """Pool de hilos compartido para los sub-modelos (uno por proceso)"""
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.execution_workers, thread_name_prefix='submodel'
+                    )
+                    # Un lugar por hilo: se libera cuando la tarea termina de verdad, aunque
+                    # su petición ya haya usado el valor por defecto por timeout
+                    self._executor_slots = threading.BoundedSemaphore(self.execution_workers)
+                    self._executor_pid = os.getpid()
+        return self._executor
+    
+    def run_submodels(self, tasks):
+        """
+        Evalúa sub-modelos independientes y retorna sus resultados por nombre
+        
+        En modo 'threaded' model_timeout solo limita la espera: un hilo no se puede
+        interrumpir, así que el sub-modelo demorado sigue calculando y ocupa su hilo del
+        pool hasta terminar (su resultado se descarta). Para que esos hilos no acumulen
+        esperas en las peticiones siguientes, cada tarea toma un lugar del pool antes de
+        enviarse; si no hay lugar libre se usa el valor por defecto de inmediato.
+        
+        Args:
+            tasks (dict): nombre -> (función sin argumentos, función que retorna el valor por defecto)
             
-            # Cargar modelos de tarjetas rojas
-            if os.path.exists('app/models/modelo_rojas_cls_local.pkl'):
-                self.red_cards_cls_local = safe_load_model('app/models/modelo_rojas_cls_local.pkl')
-                print("✅ Modelo de tarjetas rojas clasificación local cargado")
+        Returns:
+            dict: nombre -> resultado (el valor por defecto si el sub-modelo falla, supera
+                model_timeout o el pool está ocupado, en modo 'threaded')
+        """
+        if self.execution != 'threaded' or len(tasks) < 2:
+            return {name: func() for name, (func, _) in tasks.items()}
+        
+        # Los hilos del pool necesitan el contexto de la app para consultar la base de datos
+        app = current_app._get_current_object() if has_app_context() else None
+        executor = self.submodel_executor()
+        slots = self._executor_slots
+        
+        def in_context(func):
+            try:
+                if app is None:
+                    return func()
+                with app.app_context():
+                    return func()
+            finally:
+                slots.release()
+        
+        # Cada tarea corre en una copia del contexto: hereda el conjunto de modelos fijado
+        results = {}
+        futures = {}
+        for name, (func, default) in tasks.items():
+            if not slots.acquire(blocking=False):
+                self.submodel_saturated[name] += 1
+                metrics.fallback(f'submodel_saturated_{name}')
+                print(f"⚠️ Pool de sub-modelos ocupado, se usa el valor por defecto de {name}")
+                results[name] = default()
+                continue
+            futures[name] = executor.submit(contextvars.copy_context().run, in_context, func)
+        deadline = time.monotonic() + self.model_timeout if self.model_timeout else None
+        
+        for name, future in futures.items():
+            timeout = max(0, deadline - time.monotonic()) if deadline is not None else None
+            try:
+                results[name] = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                self.submodel_timeouts[name] += 1
+                metrics.fallback(f'submodel_timeout_{name}')
+                print(f"⏱️ Sub-modelo {name} superó {self.model_timeout * 1000:.0f} ms, se usa el valor por defecto")
+                results[name] = tasks[name][1]()
+            except Exception as e:
+                self.submodel_errors[name] += 1
+                metrics.fallback(f'submodel_error_{name}')
+                print(f"Error en sub-modelo {name}: {e}")
+                results[name] = tasks[name][1]()
+        return {name: results[name] for name in tasks}
+    
+    def compact_loaded(self, name, model):
+        """Retorna la versión compacta del modelo o el original si no se puede compactar"""
+        from tree_compiler import compact_model
+        
+        try:
+            compact, difference = compact_model(model, self.compact_tolerance)
+        except (TypeError, NotImplementedError, ValueError) as e:
+            print(f"🔍 {MODEL_DESCRIPTIONS[name]} no se compacta: {e}")
+            return model
+        print(f"🔍 {MODEL_DESCRIPTIONS[name]} compactado (diferencia máxima {difference:.1e})")
+        return compact
+    
+    def compile_loaded(self, name, model):
+        """Retorna la versión compilada del modelo o el original si no se puede compilar"""
+        from tree_compiler import compile_model, HybridModel
+        
+        try:
+            compiled = compile_model(model)
+        except (TypeError, NotImplementedError) as e:
+            print(f"🔍 {MODEL_DESCRIPTIONS[name]} no se compila: {e}")
+            return model
+        
+        if self.compiled_max_rows:
+            return HybridModel(model, compiled, max_rows=self.compiled_max_rows)
+        return compiled
+    
+    def mmap_cache_path(self, name, path, sha256=None):
+        """
+        Retorna la copia empaquetada del artefacto para cargar con mmap, creándola a partir
+        del archivo original. Con manifiesto la copia se identifica por la suma del original;
+        sin él, se regenera si el original es más nuevo.
+        """
+        from custom_models import safe_load_model, dump_mmap_bundle
+        
+        if sha256:
+            # Los archivos idénticos comparten la copia (y sus páginas en memoria)
+            cache_path = os.path.join(self.mmap_dir, f"{sha256[:16]}.pkl")
+            if os.path.exists(cache_path) and os.path.exists(f"{cache_path}.data"):
+                return cache_path
+        else:
+            cache_path = os.path.join(self.mmap_dir, f"{name}.pkl")
+            if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+                return cache_path
+        
+        model = safe_load_model(path)
+        if model is None:
+            return None
+        
+        # Se escribe en un archivo temporal y se renombra para que otro proceso nunca vea una copia a medias
+        os.makedirs(self.mmap_dir, exist_ok=True)
+        tmp_path = os.path.join(self.mmap_dir, f"{name}.{os.getpid()}.tmp")
+        dump_mmap_bundle(model, tmp_path)
+        os.replace(f"{tmp_path}.data", f"{cache_path}.data")
+        os.replace(tmp_path, cache_path)
+        return cache_path
+    
+    def model_set(self):
+        """Conjunto fijado por la predicción en curso o, fuera de una, el vigente"""
+        return _pinned_set.get() or self._current
+    
+    @contextmanager
+    def pinned(self):
+        """Fija el conjunto de modelos durante una predicción (aunque se publique otro a la mitad)"""
+        token = _pinned_set.set(self.model_set())
+        try:
+            yield
+        finally:
+            _pinned_set.reset(token)
+    
+    def manifest(self):
+        return self.model_set().manifest()
+    
+    def manifest_entry(self, name, model_set=None):
+        manifest = (model_set or self.model_set()).manifest()
+        return manifest['artifacts'].get(name) if manifest else None
+    
+    def load_model(self, name, model_set=None):
+        """
+        Carga un artefacto (una sola vez aunque lo pidan varios hilos) y registra su tiempo
+        de carga. Con manifiesto se verifica la suma del archivo antes de deserializarlo y el
+        esquema de entrada después: un artefacto que no coincide queda como no disponible
+        (se usa su fallback) en vez de fallar en cada petición.
+        """
+        model_set = model_set or self.model_set()
+        with model_set.locks[name]:
+            if name in model_set.models:
+                return model_set.models[name]
             
-            if os.path.exists('app/models/modelo_rojas_cls_visitante.pkl'):
-                self.red_cards_cls_visitante = safe_load_model('app/models/modelo_rojas_cls_visitante.pkl')
-                print("✅ Modelo de tarjetas rojas clasificación visitante cargado")
+            path = os.path.join(MODELS_DIR, MODEL_FILES[name])
+            description = MODEL_DESCRIPTIONS[name]
+            entry = self.manifest_entry(name, model_set)
+            model = None
+            status, problem = 'ok', None
+            started = time.perf_counter()
             
-            if os.path.exists('app/models/modelo_rojas_reg_local.pkl'):
-                self.red_cards_reg_local = safe_load_model('app/models/modelo_rojas_reg_local.pkl')
-                print("✅ Modelo de tarjetas rojas regresión local cargado")
+            if not os.path.exists(path):
+                status = 'missing'
+                if name in OPTIONAL_ARTIFACTS or (entry and not entry.get('required', True)):
+                    print(f"⚠️ {description}: {MODEL_FILES[name]} no existe, se usa el fallback histórico")
+                else:
+                    print(f"❌ {description}: {MODEL_FILES[name]} no existe")
+            elif model_set.manifest() is not None and entry is None:
+                status, problem = 'unregistered', 'no está en el manifiesto'
+            else:
+                problem = check_file(entry, path, self.verify_checksums) if entry else None
+                if problem:
+                    status = 'checksum_mismatch'
+                else:
+                    sha256 = entry['sha256'] if entry else None
+                    model = model_set.shared.get((sha256, 'original'))
+                    if model is None:
+                        model = self.deserialize(name, path, entry)
+                        model = model_set.share((sha256, 'original'), model) if model is not None else None
+                    
+                    if model is None:
+                        status, problem = 'error', 'no se pudo deserializar'
+                    elif name in MODEL_INPUT_FEATURES:
+                        problem = check_schema(model, entry, MODEL_INPUT_FEATURES[name])
+                        if problem:
+                            status = 'rejected'
+                            model = None
+                    
+                    if model is not None and name in COMPILABLE_MODELS and (self.compact or self.compiled):
+                        form = 'compact' if self.compact else 'compiled'
+                        converted = model_set.shared.get((sha256, form))
+                        if converted is None:
+                            converted = self.compact_loaded(name, model) if self.compact else self.compile_loaded(name, model)
+                            converted = model_set.share((sha256, form), converted)
+                        model = converted
             
-            if os.path.exists('app/models/modelo_rojas_reg_visitante.pkl'):
-                self.red_cards_reg_visitante = safe_load_model('app/models/modelo_rojas_reg_visitante.pkl')
-                print("✅ Modelo de tarjetas rojas regresión visitante cargado")
+            if problem and status != 'error':
+                print(f"❌ {description} no se usa: {problem}")
             
-            if os.path.exists('app/models/umbrales_rojas.pkl'):
-                self.red_thresholds = joblib.load('app/models/umbrales_rojas.pkl')
-                print("✅ Umbrales de tarjetas rojas cargados")
+            elapsed = time.perf_counter() - started
+            model_set.load_times[name] = elapsed
+            model_set.load_status[name] = (status, problem)
+            model_set.models[name] = model
             
-            # Cargar modelo de tarjetas amarillas
-            if os.path.exists('app/models/modelo_amarillas.pkl'):
-                self.yellow_cards_model = safe_load_model('app/models/modelo_amarillas.pkl')
-                print("✅ Modelo de tarjetas amarillas cargado correctamente")
+            if model is not None:
+                print(f"✅ {description} cargado correctamente ({elapsed * 1000:.0f} ms)")
             
-            # Cargar modelo de marcador
-            if os.path.exists('app/models/modelo_marcador.pkl'):
-                self.score_model = safe_load_model('app/models/modelo_marcador.pkl')
-                print("✅ Modelo de marcador cargado correctamente")
-                
+            return model
+    
+    def deserialize(self, name, path, entry=None):
+        """Lee un artefacto del disco en el formato de carga del manifiesto (None si falla)"""
+        try:
+            plain = entry['format'] == 'joblib' if entry else name in PLAIN_JOBLIB_ARTIFACTS
+            if plain:
+                return joblib.load(path)
+            if self.mmap_dir:
+                from custom_models import load_mmap_bundle
+                cache_path = self.mmap_cache_path(name, path, entry['sha256'] if entry else None)
+                return load_mmap_bundle(cache_path) if cache_path else None
+            from custom_models import safe_load_model
+            return safe_load_model(path)
+        except Exception as e:
+            print(f"Error cargando {MODEL_DESCRIPTIONS[name].lower()}: {e}")
+            return None
+    
+    def artifact(self, name):
+        """
+        Objeto deserializado aunque el esquema lo haya rechazado (para inspección y benchmarks).
+        Los rechazados no se conservan en memoria: se vuelven a leer del disco.
+        """
+        model = self.load_model(name)
+        if model is not None or self.model_set().load_status.get(name, ('',))[0] != 'rejected':
+            return model
+        return self.deserialize(name, os.path.join(MODELS_DIR, MODEL_FILES[name]), self.manifest_entry(name))
+    
+    def load_models(self, parallel=True, max_workers=4, model_set=None):
+        """
+        Carga todos los modelos entrenados de forma anticipada
+        
+        Args:
+            parallel (bool): Deserializa los artefactos en un pool de hilos
+            max_workers (int): Tamaño del pool de hilos
+            model_set (ModelSet): Conjunto donde cargarlos (por defecto el vigente)
+        """
+        model_set = model_set or self.model_set()
+        started = time.perf_counter()
+        names = [name for name in MODEL_FILES if name not in model_set.models]
+        
+        try:
+            if parallel and len(names) > 1:
+                with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='model-loader') as executor:
+                    list(executor.map(lambda name: self.load_model(name, model_set), names))
+            else:
+                for name in names:
+                    self.load_model(name, model_set)
         except Exception as e:
             print(f"Error cargando modelos: {e}")
+        
+        print(f"⏱️ Modelos cargados en {time.perf_counter() - started:.2f}s")
     
-    def get_historical_data(self, home_code, away_code):
+    def reload(self, warmup=None, parallel=True, max_workers=4):
         """
-        Busca datos históricos entre dos equipos usando equipo_local_id y equipo_visitante_id
+        Carga los artefactos actuales del disco en un conjunto nuevo, lo prueba y lo publica.
+        Mientras tanto las peticiones siguen usando el conjunto vigente; las que ya empezaron
+        terminan con el conjunto que fijaron.
         
         Args:
-            home_code (int): Código del equipo local
-            away_code (int): Código del equipo visita
+            warmup (callable): Predicción de prueba que se ejecuta con el conjunto nuevo
+                fijado antes de publicarlo (si falla, no se publica)
+            parallel (bool): Deserializa los artefactos en un pool de hilos
+            max_workers (int): Tamaño del pool de hilos
             
         Returns:
-            dict: Datos históricos del enfrentamiento
-        """
-        try:
-            # Obtener IDs de equipos por código
-            home_team = Equipo.query.filter_by(codigo=home_code).first()
-            away_team = Equipo.query.filter_by(codigo=away_code).first()
+            ModelSet: Conjunto publicado
             
-            if not home_team or not away_team:
-                print(f"No se encontraron equipos con códigos {home_code} y {away_code}")
-                return None
+        Raises:
+            ModelReloadError: Si el conjunto nuevo pierde un modelo que el vigente tenía
+                disponible o falla la predicción de prueba
+        """
+        with self._reload_lock:
+            current = self._current
+            staged = ModelSet(current.generation + 1)
+            self.load_models(parallel, max_workers, model_set=staged)
             
-            # Buscar el último partido entre estos equipos (local vs visita)
-            last_match = Partido.query.filter_by(
-                equipo_local_id=home_team.id,
-                equipo_visita_id=away_team.id
-            ).order_by(Partido.fecha.desc()).first()
+            lost = [
+                name for name, model in current.models.items()
+                if model is not None and staged.models.get(name) is None
+            ]
+            if lost:
+                raise ModelReloadError(f"Modelos no disponibles en el conjunto nuevo: {', '.join(lost)}")
             
-            if last_match:
-                return {
-                    'home_code': home_code,
-                    'away_code': away_code,
-                    'home_id': home_team.id,
-                    'away_id': away_team.id,
-                    'goles_local': last_match.goles_local,
-                    'goles_visita': last_match.goles_visita,
-                    'corners_local': last_match.corners_local,
-                    'corners_visita': last_match.corners_visita,
-                    'tarjetas_amarillas_local': last_match.tarjetas_amarillas_local,
-                    'tarjetas_amarillas_visita': last_match.tarjetas_amarillas_visita,
-                    'tarjetas_rojas_local': last_match.tarjetas_rojas_local,
-                    'tarjetas_rojas_visita': last_match.tarjetas_rojas_visita,
-                    'resultado': last_match.resultado,
-                    'fecha': last_match.fecha
-                }
+            if warmup is not None:
+                token = _pinned_set.set(staged)
+                try:
+                    warmup()
+                except Exception as e:
+                    raise ModelReloadError(f"La predicción de prueba falló: {e}") from e
+                finally:
+                    _pinned_set.reset(token)
             
-            # Si no hay datos, buscar con equipos invertidos
-            last_match_inverted = Partido.query.filter_by(
-                equipo_local_id=away_team.id,
-                equipo_visita_id=home_team.id
-            ).order_by(Partido.fecha.desc()).first()
+            # Una sola asignación: las peticiones nuevas ven el conjunto completo o el anterior
+            self._current = staged
+            return staged
+    
+    def load_report(self):
+        """Estado de carga, tiempo (ms) y memoria de cada artefacto del conjunto vigente"""
+        from tree_compiler import forests, model_nbytes
+        
+        model_set = self.model_set()
+        report = {}
+        for name, filename in MODEL_FILES.items():
+            entry = self.manifest_entry(name, model_set) or {}
+            status, problem = model_set.load_status.get(name, ('not_loaded', None))
+            model = model_set.models.get(name)
+            compiled = type(model).__module__ == 'tree_compiler'
+            report[name] = {
+                'file': filename,
+                'version': entry.get('version'),
+                'sha256': entry.get('sha256'),
+                'n_features': entry.get('n_features'),
+                'required': entry.get('required', name not in OPTIONAL_ARTIFACTS),
+                'status': status,
+                'problem': problem,
+                'loaded': name in model_set.models,
+                'available': model_set.models.get(name) is not None,
+                'mmap': bool(self.mmap_dir) and entry.get('format', 'joblib' if name in PLAIN_JOBLIB_ARTIFACTS else 'mmap') == 'mmap',
+                'compiled': compiled,
+                'compact': compiled and all(forest.compact for forest in forests(model)),
+                'memory_bytes': model_nbytes(model) if model is not None else None,
+                'shared_with': next(
+                    (other for other in MODEL_FILES if other != name and other in model_set.models
+                     and model is not None and model_set.models[other] is model),
+                    None
+                ),
+                'load_ms': round(model_set.load_times[name] * 1000, 1) if name in model_set.load_times else None
+            }
+        return report
+    
+    def model_version(self):
+        """Versión del conjunto de modelos: huella de los archivos cuando se creó el conjunto"""
+        return self.model_set().version
+    
+    def build_historical_data(self, home_code, away_code, home_team, away_team, match, invertido=False):
+        """Arma el diccionario de datos históricos a partir de un partido (invirtiendo local/visita si corresponde)"""
+        if not invertido:
+            return {
+                'home_code': home_code,
+                'away_code': away_code,
+                'home_id': home_team.id,
+                'away_id': away_team.id,
+                'goles_local': match.goles_local,
+                'goles_visita': match.goles_visita,
+                'corners_local': match.corners_local,
+                'corners_visita': match.corners_visita,
+                'tarjetas_amarillas_local': match.tarjetas_amarillas_local,
+                'tarjetas_amarillas_visita': match.tarjetas_amarillas_visita,
+                'tarjetas_rojas_local': match.tarjetas_rojas_local,
+                'tarjetas_rojas_visita': match.tarjetas_rojas_visita,
+                'resultado': match.resultado,
+                'fecha': match.fecha
+            }
+        
+        return {
+            'home_code': home_code,
+            'away_code': away_code,
+            'home_id': home_team.id,
+            'away_id': away_team.id,
+            'goles_local': match.goles_visita,  # Invertir
+            'goles_visita': match.goles_local,  # Invertir
+            'corners_local': match.corners_visita,  # Invertir
+            'corners_visita': match.corners_local,  # Invertir
+            'tarjetas_amarillas_local': match.tarjetas_amarillas_visita,  # Invertir
+            'tarjetas_amarillas_visita': match.tarjetas_amarillas_local,  # Invertir
+            'tarjetas_rojas_local': match.tarjetas_rojas_visita,  # Invertir
+            'tarjetas_rojas_visita': match.tarjetas_rojas_local,  # Invertir
+            'resultado': self.invert_result(match.resultado),
+            'fecha': match.fecha
+        }
+    
+    def get_historical_data_batch(self, pairs):
+        """
+        Busca datos históricos para varios enfrentamientos con una sola consulta de equipos
+        y una sola consulta de partidos
+        
+        Args:
+            pairs (list): Lista de tuplas (home_code, away_code)
             
-            if last_match_inverted:
-                return {
-                    'home_code': home_code,
-                    'away_code': away_code,
-                    'home_id': home_team.id,
-                    'away_id': away_team.id,
-                    'goles_local': last_match_inverted.goles_visita,  # Invertir
-                    'goles_visita': last_match_inverted.goles_local,  # Invertir
-                    'corners_local': last_match_inverted.corners_visita,  # Invertir
-                    'corners_visita': last_match_inverted.corners_local,  # Invertir
-                    'tarjetas_amarillas_local': last_match_inverted.tarjetas_amarillas_visita,  # Invertir
-                    'tarjetas_amarillas_visita': last_match_inverted.tarjetas_amarillas_local,  # Invertir
-                    'tarjetas_rojas_local': last_match_inverted.tarjetas_rojas_visita,  # Invertir
-                    'tarjetas_rojas_visita': last_match_inverted.tarjetas_rojas_local,  # Invertir
-                    'resultado': self.invert_result(last_match_inverted.resultado),
-                    'fecha': last_match_inverted.fecha
-                }
+        Returns:
+            list: Datos históricos (o None) en el mismo orden que pairs
+        """
+        codes = {code for pair in pairs for code in pair}
+        teams = {code: team for code in codes if (team := team_registry.by_code(code)) is not None}
+        
+        keys = set()
+        for home_code, away_code in pairs:
+            if home_code in teams and away_code in teams:
+                keys.add((teams[home_code].id, teams[away_code].id))
+                keys.add((teams[away_code].id, teams[home_code].id))
+        
+        latest = {}
+        if keys:
+            partidos = Partido.query.filter(
+                tuple_(Partido.equipo_local_id, Partido.equipo_visita_id).in_(list(keys))
+            ).order_by(Partido.fecha.desc()).all()
+            for partido in partidos:
+                latest.setdefault((partido.equipo_local_id, partido.equipo_visita_id), partido)
+        
+        results = []
+        for home_code, away_code in pairs:
+            home_team = teams.get(home_code)
+            away_team = teams.get(away_code)
+            if not home_team or not away_team:
+                results.append(None)
+                continue
             
-            # Si no hay datos históricos, retornar None
-            print(f"No se encontraron datos históricos entre equipos {home_code} y {away_code}")
-            return None
+            match = latest.get((home_team.id, away_team.id))
+            if match:
+                results.append(self.build_historical_data(home_code, away_code, home_team, away_team, match))
+                continue
             
-        except Exception as e:
-            print(f"Error obteniendo datos históricos: {e}")
-            return None
+            match = latest.get((away_team.id, home_team.id))
+            if match:
+                results.append(self.build_historical_data(home_code, away_code, home_team, away_team, match, invertido=True))
+            else:
+                results.append(None)
+        
+        return results
     
     def invert_result(self, result):
         """Invierte el resultado del partido"""
@@ -162,7 +682,8 @@ class MLPredictor:
     
     def predict_match(self, home_code, away_code):
         """
-        Predice el resultado de un partido usando los modelos pre-entrenados
+        Predice el resultado de un partido por códigos de equipo con el pipeline de
+        prediction_pipeline.py (el mismo camino que /api/predict)
         
         Args:
             home_code (int): Código del equipo local
@@ -171,279 +692,180 @@ class MLPredictor:
         Returns:
             dict: Predicciones del partido
         """
+        # prediction_pipeline importa este módulo
+        from prediction_pipeline import predict_fixtures
+        
         try:
-            # Obtener datos históricos
-            historical_data = self.get_historical_data(home_code, away_code)
+            home_team = team_registry.by_code(home_code)
+            away_team = team_registry.by_code(away_code)
             
-            if historical_data:
-                # Usar datos históricos para predicciones
-                return self.predict_with_historical_data(historical_data)
-            else:
-                # Usar predicciones por defecto si no hay datos históricos
+            if not home_team or not away_team:
+                # Sin equipos no hay features: predicciones por defecto según los códigos
+                print(f"No se encontraron equipos con códigos {home_code} y {away_code}")
                 return self.predict_without_historical_data(home_code, away_code)
-                
+            
+            return predict_fixtures([home_team], [away_team], [home_code], [away_code])[0]
+            
         except Exception as e:
             print(f"Error en predicción: {e}")
             return self.get_default_prediction()
     
-    def predict_with_historical_data(self, historical_data):
-        """Predice usando datos históricos y modelos pre-entrenados"""
-        # Predicción de córners usando el modelo específico
-        corners_prediction = self.predict_corners(historical_data)
-        
-        # Predicción de tarjetas amarillas
-        yellow_cards_prediction = self.predict_yellow_cards(historical_data)
-        
-        # Predicción de tarjetas rojas
-        red_cards_prediction = self.predict_red_cards(historical_data)
-        
-        # Predicción de resultado
-        result_prediction = self.predict_result(historical_data)
-        
-        return {
-            'home_win': result_prediction['home_win'],
-            'draw': result_prediction['draw'],
-            'away_win': result_prediction['away_win'],
-            'score': {
-                'home': result_prediction['score_home'],
-                'away': result_prediction['score_away']
-            },
-            'corners': {
-                'home': corners_prediction['home'],
-                'away': corners_prediction['away']
-            },
-            'yellow_cards': {
-                'home': yellow_cards_prediction['home'],
-                'away': yellow_cards_prediction['away']
-            },
-            'red_cards': {
-                'home': red_cards_prediction['home'],
-                'away': red_cards_prediction['away']
-            }
-        }
-    
-    def predict_corners(self, historical_data):
-        """Predice córners usando el modelo específico"""
+    def corners_from_history(self, historical_data):
+        """Fallback de córners basado en datos históricos"""
         try:
-            if self.corners_model and self.corners_scaler:
-                # Generar features correctas para el escalador (16 features)
-                features = self.feature_generator.generate_corners_features(
-                    historical_data.get('home_code', 0),
-                    historical_data.get('away_code', 1),
-                    historical_data
-                )
-                
-                # Escalar features
-                features_scaled = self.corners_scaler.transform(features)
-                
-                # Generar features para el modelo XGBoost (18 features)
-                model_features = self.feature_generator.generate_corners_model_features(
-                    historical_data.get('home_code', 0),
-                    historical_data.get('away_code', 1),
-                    historical_data
-                )
-                
-                # Predicción
-                prediction = self.corners_model.predict(model_features)[0]
-                
-                # Distribuir la predicción entre local y visita
-                corners_home = max(2, int(prediction * 0.6))
-                corners_away = max(2, int(prediction * 0.4))
-                
-                return {'home': corners_home, 'away': corners_away}
-            else:
-                # Fallback basado en datos históricos
-                corners_home = max(3, historical_data['corners_local'] + np.random.randint(-1, 2))
-                corners_away = max(2, historical_data['corners_visita'] + np.random.randint(-1, 2))
-                
-                return {'home': corners_home, 'away': corners_away}
+            corners_home = max(3, historical_data['corners_local'] + np.random.randint(-1, 2))
+            corners_away = max(2, historical_data['corners_visita'] + np.random.randint(-1, 2))
+            
+            return {'home': corners_home, 'away': corners_away}
         except Exception as e:
             print(f"Error prediciendo córners: {e}")
             return {'home': 5, 'away': 4}
     
-    def predict_yellow_cards(self, historical_data):
-        """Predice tarjetas amarillas usando el modelo entrenado"""
+    def predict_yellow_cards_batch(self, historical_list):
+        """Predice tarjetas amarillas de varios partidos con una sola llamada al modelo"""
         try:
             if self.yellow_cards_model:
                 # Crear features para el modelo de tarjetas amarillas
-                features = np.array([[
-                    historical_data['tarjetas_amarillas_local'],
-                    historical_data['tarjetas_amarillas_visita'],
-                    historical_data['goles_local'],
-                    historical_data['goles_visita']
-                ]])
+                features = np.array([
+                    [
+                        historical_data['tarjetas_amarillas_local'],
+                        historical_data['tarjetas_amarillas_visita'],
+                        historical_data['goles_local'],
+                        historical_data['goles_visita']
+                    ]
+                    for historical_data in historical_list
+                ])
                 
                 # Predicción
-                prediction = self.yellow_cards_model.predict(features)[0]
+                predictions = self.yellow_cards_model.predict(features)
+                metrics.model_call('yellow_cards_model', len(features))
                 
                 # Distribuir la predicción entre local y visita
-                cards_home = max(1, int(prediction * 0.5))
-                cards_away = max(1, int(prediction * 0.5))
-                
-                return {'home': cards_home, 'away': cards_away}
+                return [
+                    {'home': max(1, int(prediction * 0.5)), 'away': max(1, int(prediction * 0.5))}
+                    for prediction in predictions
+                ]
             else:
-                # Fallback basado en datos históricos con variación
-                cards_home = max(1, historical_data['tarjetas_amarillas_local'] + np.random.randint(-1, 2))
-                cards_away = max(1, historical_data['tarjetas_amarillas_visita'] + np.random.randint(-1, 2))
-                
-                return {'home': cards_home, 'away': cards_away}
+                return [self.yellow_cards_from_history(historical_data) for historical_data in historical_list]
+        except Exception as e:
+            print(f"Error prediciendo tarjetas amarillas: {e}")
+            metrics.fallback('yellow_cards_default', len(historical_list))
+            return [{'home': 2, 'away': 2} for _ in historical_list]
+    
+    def yellow_cards_from_history(self, historical_data):
+        """Fallback de tarjetas amarillas basado en datos históricos con variación"""
+        try:
+            cards_home = max(1, historical_data['tarjetas_amarillas_local'] + np.random.randint(-1, 2))
+            cards_away = max(1, historical_data['tarjetas_amarillas_visita'] + np.random.randint(-1, 2))
+            
+            return {'home': cards_home, 'away': cards_away}
         except Exception as e:
             print(f"Error prediciendo tarjetas amarillas: {e}")
             return {'home': 2, 'away': 2}
     
-    def predict_red_cards(self, historical_data):
-        """Predice tarjetas rojas usando los modelos específicos"""
+    def predict_red_cards_batch(self, historical_list):
+        """Predice tarjetas rojas de varios partidos con una llamada por clasificador/regresor"""
         try:
-            red_cards_home = 0
-            red_cards_away = 0
+            red_cards_home = np.zeros(len(historical_list), dtype=int)
+            red_cards_away = np.zeros(len(historical_list), dtype=int)
             
             # Predicción para equipo local
             if self.red_cards_cls_local and self.red_cards_reg_local:
                 # Features para tarjetas rojas
-                features = np.array([[
-                    historical_data['tarjetas_rojas_local'],
-                    historical_data['tarjetas_amarillas_local'],
-                    historical_data['goles_local'],
-                    historical_data['goles_visita']
-                ]])
+                features = np.array([
+                    [
+                        historical_data['tarjetas_rojas_local'],
+                        historical_data['tarjetas_amarillas_local'],
+                        historical_data['goles_local'],
+                        historical_data['goles_visita']
+                    ]
+                    for historical_data in historical_list
+                ])
                 
                 # Clasificación (si habrá tarjeta roja)
-                cls_pred = self.red_cards_cls_local.predict_proba(features)[0]
-                will_have_red = cls_pred[1] > 0.5  # Probabilidad de tarjeta roja
+                metrics.model_call('red_cards_cls_local', len(features))
+                cls_pred = self.red_cards_cls_local.predict_proba(features)
+                will_have_red = cls_pred[:, 1] > 0.5  # Probabilidad de tarjeta roja
                 
-                if will_have_red:
-                    # Regresión (cuántas tarjetas rojas)
-                    reg_pred = self.red_cards_reg_local.predict(features)[0]
-                    red_cards_home = max(0, int(reg_pred))
+                if will_have_red.any():
+                    # Regresión (cuántas tarjetas rojas), solo para los partidos con roja
+                    metrics.model_call('red_cards_reg_local', int(will_have_red.sum()))
+                    reg_pred = self.red_cards_reg_local.predict(features[will_have_red])
+                    red_cards_home[will_have_red] = [max(0, int(value)) for value in reg_pred]
             
             # Predicción para equipo visitante
             if self.red_cards_cls_visitante and self.red_cards_reg_visitante:
-                features = np.array([[
-                    historical_data['tarjetas_rojas_visita'],
-                    historical_data['tarjetas_amarillas_visita'],
-                    historical_data['goles_visita'],
-                    historical_data['goles_local']
-                ]])
+                features = np.array([
+                    [
+                        historical_data['tarjetas_rojas_visita'],
+                        historical_data['tarjetas_amarillas_visita'],
+                        historical_data['goles_visita'],
+                        historical_data['goles_local']
+                    ]
+                    for historical_data in historical_list
+                ])
                 
-                cls_pred = self.red_cards_cls_visitante.predict_proba(features)[0]
-                will_have_red = cls_pred[1] > 0.5
+                metrics.model_call('red_cards_cls_visitante', len(features))
+                cls_pred = self.red_cards_cls_visitante.predict_proba(features)
+                will_have_red = cls_pred[:, 1] > 0.5
                 
-                if will_have_red:
-                    reg_pred = self.red_cards_reg_visitante.predict(features)[0]
-                    red_cards_away = max(0, int(reg_pred))
+                if will_have_red.any():
+                    metrics.model_call('red_cards_reg_visitante', int(will_have_red.sum()))
+                    reg_pred = self.red_cards_reg_visitante.predict(features[will_have_red])
+                    red_cards_away[will_have_red] = [max(0, int(value)) for value in reg_pred]
             
-            return {'home': red_cards_home, 'away': red_cards_away}
+            return [
+                {'home': int(home), 'away': int(away)}
+                for home, away in zip(red_cards_home, red_cards_away)
+            ]
             
         except Exception as e:
             print(f"Error prediciendo tarjetas rojas: {e}")
-            return {'home': 0, 'away': 0}
+            metrics.fallback('red_cards_default', len(historical_list))
+            return [{'home': 0, 'away': 0} for _ in historical_list]
     
-    def predict_result(self, historical_data):
-        """Predice resultado del partido usando el modelo entrenado"""
-        try:
-            if self.score_model:
-                # Generar features para el modelo de marcador (477 features)
-                features = self.feature_generator.generate_score_model_features(
-                    historical_data.get('home_code', 0),
-                    historical_data.get('away_code', 1),
-                    historical_data
-                )
-                
-                # Predicción de goles
-                score_prediction = self.score_model.predict(features)[0]
-                
-                # Calcular probabilidades basadas en la predicción
-                if isinstance(score_prediction, (list, np.ndarray)) and len(score_prediction) >= 2:
-                    score_home = int(score_prediction[0])
-                    score_away = int(score_prediction[1])
-                else:
-                    # Si el modelo devuelve un solo valor, distribuirlo
-                    total_goals = int(score_prediction)
-                    score_home = max(0, total_goals // 2)
-                    score_away = max(0, total_goals - score_home)
-                
-                # Calcular probabilidades basadas en goles predichos
-                total_goals = score_home + score_away
-                
-                if total_goals == 0:
-                    home_win = 0.3
-                    draw = 0.4
-                    away_win = 0.3
-                else:
-                    home_goals_ratio = score_home / total_goals
-                    away_goals_ratio = score_away / total_goals
-                    
-                    home_win = min(0.6, max(0.2, home_goals_ratio + 0.1))
-                    away_win = min(0.6, max(0.2, away_goals_ratio + 0.1))
-                    draw = max(0.1, 1 - home_win - away_win)
-                    
-                    # Normalizar
-                    total = home_win + draw + away_win
-                    home_win /= total
-                    draw /= total
-                    away_win /= total
-                
-                return {
-                    'home_win': float(home_win),
-                    'draw': float(draw),
-                    'away_win': float(away_win),
-                    'score_home': score_home,
-                    'score_away': score_away
-                }
-            else:
-                # Fallback usando datos históricos
-                total_goals = historical_data['goles_local'] + historical_data['goles_visita']
-                
-                if total_goals == 0:
-                    home_win = 0.3
-                    draw = 0.4
-                    away_win = 0.3
-                else:
-                    home_goals_ratio = historical_data['goles_local'] / total_goals
-                    away_goals_ratio = historical_data['goles_visita'] / total_goals
-                    
-                    home_win = min(0.6, max(0.2, home_goals_ratio + 0.1))
-                    away_win = min(0.6, max(0.2, away_goals_ratio + 0.1))
-                    draw = max(0.1, 1 - home_win - away_win)
-                    
-                    total = home_win + draw + away_win
-                    home_win /= total
-                    draw /= total
-                    away_win /= total
-                
-                score_home = max(0, historical_data['goles_local'] + np.random.randint(-1, 2))
-                score_away = max(0, historical_data['goles_visita'] + np.random.randint(-1, 2))
-                
-                return {
-                    'home_win': float(home_win),
-                    'draw': float(draw),
-                    'away_win': float(away_win),
-                    'score_home': int(score_home),
-                    'score_away': int(score_away)
-                }
-            
-        except Exception as e:
-            print(f"Error prediciendo resultado: {e}")
-            return {
-                'home_win': 0.33,
-                'draw': 0.33,
-                'away_win': 0.34,
-                'score_home': 1,
-                'score_away': 1
-            }
+    def result_probabilities(self, goles_local, goles_visita):
+        """Calcula probabilidades (local, empate, visita) a partir de los goles"""
+        total_goals = goles_local + goles_visita
+        
+        if total_goals == 0:
+            return 0.3, 0.4, 0.3
+        
+        home_goals_ratio = goles_local / total_goals
+        away_goals_ratio = goles_visita / total_goals
+        
+        home_win = min(0.6, max(0.2, home_goals_ratio + 0.1))
+        away_win = min(0.6, max(0.2, away_goals_ratio + 0.1))
+        draw = max(0.1, 1 - home_win - away_win)
+        
+        # Normalizar
+        total = home_win + draw + away_win
+        return home_win / total, draw / total, away_win / total
     
-    def predict_without_historical_data(self, home_code, away_code):
-        """Predice sin datos históricos usando valores por defecto"""
-        # Predicciones por defecto basadas en códigos de equipos
+    def get_default_result(self):
+        """Resultado por defecto en caso de error"""
+        metrics.fallback('default_result')
+        return {
+            'home_win': 0.33,
+            'draw': 0.33,
+            'away_win': 0.34,
+            'score_home': 1,
+            'score_away': 1
+        }
+    
+    def code_probabilities(self, home_code, away_code):
+        """Probabilidades (local, empate, visita) por defecto basadas en códigos de equipos"""
         home_win = 0.4 + (home_code % 10) * 0.01
         away_win = 0.3 + (away_code % 10) * 0.01
         draw = 1 - home_win - away_win
         
         # Normalizar
         total = home_win + draw + away_win
-        home_win /= total
-        draw /= total
-        away_win /= total
+        return home_win / total, draw / total, away_win / total
+    
+    def predict_without_historical_data(self, home_code, away_code):
+        """Predice sin datos históricos usando valores por defecto"""
+        home_win, draw, away_win = self.code_probabilities(home_code, away_code)
         
         return {
             'home_win': float(home_win),
@@ -469,6 +891,7 @@ class MLPredictor:
     
     def get_default_prediction(self):
         """Retorna predicción por defecto en caso de error"""
+        metrics.fallback('default_prediction')
         return {
             'home_win': 0.33,
             'draw': 0.33,
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Registro versionado de los artefactos de modelos (app/models/manifest.json)
+
+El manifiesto guarda, por artefacto, el archivo, su versión, la suma SHA-256, el formato
+de carga y el esquema de entrada (número y orden de las features). MLPredictor lo usa al
+cargar cada modelo para rechazar archivos alterados o incompatibles con las features que
+arma la aplicación, en lugar de fallar en cada petición.
+
+Uso:
+    python model_registry.py build            # (re)genera el manifiesto
+    python model_registry.py verify           # comprueba archivos y esquemas
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_FORMAT = 1
+
+# Los nombres de las features se listan en el manifiesto hasta este número; el orden de
+# los esquemas más anchos se registra solo con su huella (feature_order)
+MAX_LISTED_FEATURES = 64
+
+def feature_order(names):
+    """Huella del orden de las features"""
+    return hashlib.sha1('\n'.join(names).encode()).hexdigest()[:16] if names is not None else None
+
+def manifest_path(models_dir):
+    return os.path.join(models_dir, MANIFEST_FILE)
+
+def file_sha256(path):
+    """Suma SHA-256 del archivo leída por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def unwrap(artifact):
+    """Estimador dentro del artefacto (los paquetes dict guardan el modelo en 'model')"""
+    if isinstance(artifact, dict) and 'model' in artifact:
+        return artifact['model']
+    return artifact
+
+def describe(artifact):
+    """
+    Esquema de entrada de un artefacto cargado
+
+    Returns:
+        dict: Clase, número de features y nombres en orden (None si el artefacto no los guarda)
+    """
+    model = unwrap(artifact)
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None and isinstance(artifact, dict):
+        names = artifact.get('feature_columns')
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features is None and names is not None:
+        n_features = len(names)
+
+    return {
+        'estimator': f"{type(model).__module__}.{type(model).__name__}",
+        'bundle': type(artifact).__name__ if model is not artifact else None,
+        'n_features': int(n_features) if n_features is not None else None,
+        'feature_order': feature_order([str(name) for name in names]) if names is not None else None,
+        'feature_names': [str(name) for name in names] if names is not None else None
+    }
+
+def load_manifest(models_dir):
+    """Manifiesto del directorio de modelos (None si no existe o no se puede leer)"""
+    path = manifest_path(models_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != MANIFEST_FORMAT:
+            raise ValueError(f"formato {manifest.get('format')} no soportado")
+        return manifest
+    except Exception as e:
+        print(f"⚠️ No se pudo leer {path}: {e}")
+        return None
+
+def build_manifest(models_dir, model_files, plain_artifacts=(), optional=(), version=None):
+    """
+    Genera el manifiesto a partir de los archivos presentes. La versión de cada artefacto
+    se incrementa cuando su suma cambia respecto del manifiesto anterior.
+
+    Args:
+        models_dir (str): Directorio de los modelos
+        model_files (dict): nombre -> archivo
+        plain_artifacts: Artefactos que se cargan siempre con joblib
+        optional: Artefactos cuya ausencia no es un error (se usa su fallback)
+        version (str): Versión del conjunto (por defecto la fecha)
+
+    Returns:
+        dict: Manifiesto (sin escribir)
+    """
+    import joblib
+
+    previous = load_manifest(models_dir) or {'artifacts': {}}
+    artifacts = {}
+    for name, filename in model_files.items():
+        path = os.path.join(models_dir, filename)
+        entry = {
+            'file': filename,
+            'required': name not in optional,
+            # 'mmap': se puede empaquetar para mapear sus arrays (MODEL_MMAP_DIR);
+            # 'joblib': se deserializa siempre directamente
+            'format': 'joblib' if name in plain_artifacts else 'mmap'
+        }
+        if not os.path.exists(path):
+            entry.update(status='missing', version=None, sha256=None, size=None)
+            artifacts[name] = entry
+            print(f"⚠️ {filename} no existe: se registra como faltante")
+            continue
+
+        sha256 = file_sha256(path)
+        old = previous['artifacts'].get(name, {})
+        if old.get('sha256') == sha256:
+            artifact_version = old.get('version') or 1
+        else:
+            artifact_version = (old.get('version') or 0) + 1
+
+        entry.update(status='ok', version=artifact_version, sha256=sha256, size=os.path.getsize(path))
+        entry.update(describe(joblib.load(path)))
+        if entry['feature_names'] is not None and len(entry['feature_names']) > MAX_LISTED_FEATURES:
+            entry['feature_names'] = None
+        artifacts[name] = entry
+        features = f" ({entry['n_features']} features)" if entry['n_features'] is not None else ''
+        print(f"✅ {name}: v{artifact_version} {sha256[:12]}{features}")
+
+    return {
+        'format': MANIFEST_FORMAT,
+        'version': version or datetime.utcnow().strftime('%Y.%m.%d'),
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'artifacts': artifacts
+    }
+
+def write_manifest(models_dir, manifest):
+    """Escribe el manifiesto (archivo temporal + rename)"""
+    path = manifest_path(models_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    os.replace(tmp_path, path)
+    return path
+
+def check_file(entry, path, verify_checksum=True):
+    """
+    Compara el archivo con su entrada del manifiesto
+
+    Returns:
+        str: Problema encontrado (None si coincide)
+    """
+    size = os.path.getsize(path)
+    if entry.get('size') is not None and size != entry['size']:
+        return f"tamaño {size} distinto del registrado ({entry['size']})"
+    if verify_checksum and entry.get('sha256') and file_sha256(path) != entry['sha256']:
+        return "la suma SHA-256 no coincide con el manifiesto"
+    return None
+
+def check_schema(artifact, entry, expected_features):
+    """
+    Valida que el artefacto cargado acepte las features que arma la aplicación
+
+    Args:
+        artifact: Objeto deserializado
+        entry (dict): Entrada del manifiesto (None si no hay manifiesto)
+        expected_features (list): Nombres de las features en el orden en que la aplicación
+            las arma (None = sin esquema declarado)
+
+    Returns:
+        str: Problema encontrado (None si el artefacto es compatible)
+    """
+    model = unwrap(artifact)
+    if model is not artifact:
+        return f"es un paquete {type(artifact).__name__}, no un estimador con predict"
+    if not any(hasattr(model, method) for method in ('predict', 'predict_proba', 'transform')):
+        return f"{type(model).__name__} no tiene predict ni transform"
+
+    schema = describe(artifact)
+    if entry and entry.get('n_features') is not None and schema['n_features'] != entry['n_features']:
+        return f"espera {schema['n_features']} features y el manifiesto registra {entry['n_features']}"
+    if entry and entry.get('feature_order') and schema['feature_order'] and schema['feature_order'] != entry['feature_order']:
+        return "el orden de las features no coincide con el manifiesto"
+
+    if expected_features is None or schema['n_features'] is None:
+        return None
+    if schema['n_features'] != len(expected_features):
+        return f"espera {schema['n_features']} features y la aplicación arma {len(expected_features)}"
+    if schema['feature_names'] and schema['feature_names'] != list(expected_features):
+        mismatch = next(
+            i for i, (trained, built) in enumerate(zip(schema['feature_names'], expected_features))
+            if trained != built
+        )
+        return (
+            f"feature {mismatch}: el modelo espera '{schema['feature_names'][mismatch]}' "
+            f"y la aplicación arma '{expected_features[mismatch]}'"
+        )
+    return None
+
+def main():
+    from ml_models import (
+        MODELS_DIR, MODEL_FILES, MODEL_INPUT_FEATURES, OPTIONAL_ARTIFACTS, PLAIN_JOBLIB_ARTIFACTS
+    )
+    import joblib
+
+    parser = argparse.ArgumentParser(description='Manifiesto de los artefactos de modelos')
+    parser.add_argument('command', choices=['build', 'verify'], help='Generar o verificar el manifiesto')
+    parser.add_argument('--models-dir', default=MODELS_DIR, help='Directorio de los modelos')
+    parser.add_argument('--version', help='Versión del conjunto de modelos (por defecto la fecha)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        manifest = build_manifest(
+            args.models_dir, MODEL_FILES, PLAIN_JOBLIB_ARTIFACTS, OPTIONAL_ARTIFACTS, args.version
+        )
+        print(f"✅ Manifiesto escrito en {write_manifest(args.models_dir, manifest)}")
+        return 0
+
+    manifest = load_manifest(args.models_dir)
+    if manifest is None:
+        print(f"❌ No hay manifiesto en {args.models_dir}; genérelo con: python model_registry.py build")
+        return 1
+
+    failures = 0
+    for name, filename in MODEL_FILES.items():
+        entry = manifest['artifacts'].get(name)
+        path = os.path.join(args.models_dir, filename)
+        if entry is None:
+            problem = "no está en el manifiesto"
+        elif not os.path.exists(path):
+            problem = None if not entry.get('required', True) else "el archivo no existe"
+            if problem is None:
+                print(f"⚠️ {name}: {filename} no existe (opcional, se usa el fallback)")
+                continue
+        else:
+            problem = check_file(entry, path)
+            if problem is None and name in MODEL_INPUT_FEATURES:
+                problem = check_schema(joblib.load(path), entry, MODEL_INPUT_FEATURES[name])
+        if problem:
+            failures += 1
+            print(f"❌ {name}: {problem}")
+        else:
+            print(f"✅ {name}: v{entry['version']} {entry['sha256'][:12]}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Recarga en caliente de los modelos sin reiniciar los workers
+"""
+
+import os
+import threading
+import time
+from ml_models import predictor, artifacts_fingerprint, ModelReloadError
+from prediction_pipeline import predict_fixtures
+from team_registry import team_registry
+
+class ModelReloader:
+    """
+    Carga el conjunto de artefactos de app/models/ en segundo plano, lo prueba con una
+    predicción y lo publica de una vez (MLPredictor.reload). Se dispara con
+    POST /api/models/reload, al arrancar un worker con archivos más nuevos que los
+    precargados (kill -HUP al maestro de gunicorn) o, con watch_seconds, cuando cambian
+    los archivos de modelos o el manifiesto.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.watch_seconds = 0
+        self.warmup = True
+        self.max_workers = 4
+        self._lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+        self._watched = None
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload_at = None
+        self.last_reload_seconds = None
+
+    def configure(self, app, watch_seconds=0, warmup=True, max_workers=4):
+        """
+        Args:
+            app: Aplicación Flask (la predicción de prueba necesita su contexto)
+            watch_seconds (int): Segundos entre revisiones de los archivos (0 = sin vigilancia)
+            warmup (bool): Ejecuta una predicción de prueba antes de publicar
+            max_workers (int): Hilos para deserializar los artefactos
+        """
+        self.app = app
+        self.watch_seconds = watch_seconds
+        self.warmup = warmup
+        self.max_workers = max_workers
+        self._watched = artifacts_fingerprint()
+
+    def warm_up(self):
+        """Predicción de prueba con los dos primeros equipos que tienen código"""
+        teams = [team for team in team_registry.all() if team.codigo is not None][:2]
+        if len(teams) < 2:
+            return
+        home, away = teams
+        result = predict_fixtures([home], [away], [home.codigo], [away.codigo])[0]
+        missing = [key for key in ('home_win', 'draw', 'away_win', 'score', 'corners') if key not in result]
+        if missing:
+            raise ValueError(f"La predicción de prueba no tiene {', '.join(missing)}")
+
+    def reload(self, reason='manual'):
+        """
+        Recarga los modelos (una recarga a la vez por proceso)
+
+        Returns:
+            dict: Generación y versión publicadas y segundos de la recarga
+
+        Raises:
+            ModelReloadError: Si el conjunto nuevo se descartó (sigue vigente el anterior)
+        """
+        with self._lock:
+            started = time.perf_counter()
+            fingerprint = artifacts_fingerprint()
+            print(f"🔄 Recargando modelos ({reason})...")
+            try:
+                with self.app.app_context():
+                    model_set = predictor.reload(
+                        warmup=self.warm_up if self.warmup else None,
+                        parallel=True, max_workers=self.max_workers
+                    )
+            except ModelReloadError as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"❌ Recarga de modelos descartada, se mantiene el conjunto anterior: {e}")
+                raise
+            finally:
+                # Un intento fallido no se repite hasta que los archivos vuelvan a cambiar
+                self._watched = fingerprint
+
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload_at = time.time()
+            self.last_reload_seconds = time.perf_counter() - started
+            print(f"✅ Modelos recargados: generación {model_set.generation} ({self.last_reload_seconds:.2f}s)")
+            return {
+                'generation': model_set.generation,
+                'model_version': model_set.version,
+                'seconds': round(self.last_reload_seconds, 3)
+            }
+
+    def reload_if_changed(self, reason='archivos modificados'):
+        """Recarga si los archivos cambiaron desde que se creó el conjunto vigente"""
+        if artifacts_fingerprint() == predictor.model_set().version:
+            return None
+        try:
+            return self.reload(reason)
+        except ModelReloadError:
+            return None
+
+    def ensure_watching(self):
+        """Inicia el hilo de vigilancia en este proceso (uno por worker después del fork)"""
+        if not self.watch_seconds or self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher = threading.Thread(target=self._watch, name='model-reloader', daemon=True)
+            self._watcher_pid = os.getpid()
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_seconds)
+            try:
+                if artifacts_fingerprint() != self._watched:
+                    self.reload('cambio de archivos')
+            except ModelReloadError:
+                pass
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Error recargando modelos: {e}")
+
+    def stats(self):
+        model_set = predictor.model_set()
+        return {
+            'generation': model_set.generation,
+            'model_version': model_set.version,
+            'loaded_at': model_set.created_at,
+            'watch_seconds': self.watch_seconds,
+            'watching': self._watcher_pid == os.getpid(),
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_reload_at': self.last_reload_at,
+            'last_reload_seconds': round(self.last_reload_seconds, 3) if self.last_reload_seconds is not None else None
+        }
+
+# Instancia global de la recarga de modelos
+model_reloader = ModelReloader()
@@ -3,6 +3,24 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+def get_pool_stats(engine=None):
+    """Retorna el estado del pool de conexiones del engine compartido (o del engine indicado)"""
+    pool = (engine or db.engine).pool
+    stats = {'pool_class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    stats['status'] = pool.status()
+    return stats
+
+def partidos_watermark():
+    """
+    Marca de agua de la tabla partidos: (id máximo, cantidad de filas). Cambia cuando
+    cualquier proceso registra o borra partidos.
+    """
+    return tuple(db.session.query(db.func.max(Partido.id), db.func.count(Partido.id)).one())
+
 class Equipo(db.Model):
     __tablename__ = 'equipos'
     
@@ -23,6 +41,10 @@ class Equipo(db.Model):
 
 class Partido(db.Model):
     __tablename__ = 'partidos'
+    __table_args__ = (
+        # Paginación por cursor de /api/partidos
+        db.Index('ix_partidos_fecha_id', 'fecha', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     equipo_local_id = db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=False)
@@ -62,6 +84,10 @@ class Partido(db.Model):
 
 class Prediccion(db.Model):
     __tablename__ = 'predicciones'
+    __table_args__ = (
+        # Paginación por cursor de /api/predicciones
+        db.Index('ix_predicciones_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     equipo_local_id = db.Column(db.Integer, db.ForeignKey('equipos.id'), nullable=False)
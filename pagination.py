@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Paginación por cursor (keyset) de las listas de partidos y predicciones
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload
+from models import db
+
+class InvalidCursor(ValueError):
+    """Cursor de paginación mal formado"""
+
+def encode_cursor(value, row_id):
+    """Cursor opaco con la clave (fecha, id) de la última fila de la página"""
+    payload = json.dumps([value.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Clave (fecha, id) de un cursor generado por encode_cursor"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(payload)
+        return datetime.fromisoformat(value), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Cursor inválido: {cursor}") from e
+
+def keyset_query(model, order_column, cursor=None, limit=50):
+    """
+    Consulta de una página en orden descendente por (order_column, id) con los equipos
+    local y visitante cargados en la misma consulta (JOIN). Con un índice sobre
+    (order_column, id) cada página cuesta una consulta sin importar cuántas filas haya antes.
+    Pide una fila de más para saber si hay página siguiente (ver keyset_split).
+    """
+    query = (
+        db.select(model)
+        .options(joinedload(model.equipo_local), joinedload(model.equipo_visita))
+        .order_by(order_column.desc(), model.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(order_column, model.id) < tuple_(value, row_id))
+    return query
+
+def keyset_split(rows, order_column, limit):
+    """Filas de la página y cursor de la siguiente (None si es la última)"""
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, order_column.key), last.id)
+
+def keyset_page(model, order_column, cursor=None, limit=50):
+    """
+    Lee una página con la sesión de la aplicación
+
+    Args:
+        model: Partido o Prediccion
+        order_column: Columna de orden (Partido.fecha, Prediccion.created_at)
+        cursor (str): Cursor de la página anterior (None = primera página)
+        limit (int): Filas por página
+
+    Returns:
+        tuple: (filas, cursor de la página siguiente o None si es la última)
+    """
+    rows = db.session.execute(keyset_query(model, order_column, cursor, limit)).scalars().all()
+    return keyset_split(rows, order_column, limit)
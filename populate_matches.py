@@ -89,16 +89,16 @@ def populate_matches():
             }
         ]
         
-        # Agregar partidos
-        for partido_data in partidos_data:
-            partido = Partido(**partido_data)
-            db.session.add(partido)
-            # Obtener nombres de equipos
-            local = Equipo.query.get(partido_data['equipo_local_id'])
-            visita = Equipo.query.get(partido_data['equipo_visita_id'])
-            print(f"✅ Agregado: {local.nombre} vs {visita.nombre}")
-        
+        # Agregar partidos con un solo insert masivo
+        db.session.execute(db.insert(Partido), partidos_data)
         db.session.commit()
+        
+        # Nombres de equipos desde la lista ya consultada
+        nombres = {equipo.id: equipo.nombre for equipo in equipos}
+        for partido_data in partidos_data:
+            local = nombres.get(partido_data['equipo_local_id'], partido_data['equipo_local_id'])
+            visita = nombres.get(partido_data['equipo_visita_id'], partido_data['equipo_visita_id'])
+            print(f"✅ Agregado: {local} vs {visita}")
         print(f"\n🎉 Se agregaron {len(partidos_data)} partidos históricos")
 
 if __name__ == '__main__':
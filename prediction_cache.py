@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Caché de respuestas de /api/predict con política TTL + LRU
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from ml_models import predictor
+from feature_index import feature_index
+
+class PredictionCache:
+    """
+    Guarda la respuesta de cada enfrentamiento (home_code, away_code) junto con la
+    versión de los modelos y de las tablas de features. Las entradas caducan después
+    de ttl_seconds y, al superar max_size, se descarta la usada hace más tiempo.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.max_size = 1024
+        self.ttl_seconds = 300
+        self.record_hits = True
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def configure(self, enabled=True, max_size=1024, ttl_seconds=300, record_hits=True):
+        """
+        Args:
+            enabled (bool): Activa la caché
+            max_size (int): Máximo de enfrentamientos guardados
+            ttl_seconds (float): Vida de cada entrada en segundos (0 = sin caducidad)
+            record_hits (bool): Si los aciertos también guardan un registro en Prediccion
+        """
+        self.enabled = enabled
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.record_hits = record_hits
+
+    def current_version(self):
+        """Versión de modelos + tablas de features + invalidaciones explícitas"""
+        feature_index.ready(feature_index.corners)
+        feature_index.ready(feature_index.ganador)
+        return (predictor.model_version(), feature_index.revision, self._generation)
+
+    def key(self, home_code, away_code):
+        """Clave de caché del enfrentamiento con la versión actual"""
+        return (home_code, away_code) + self.current_version()
+
+    def get(self, key):
+        """Retorna una copia de la respuesta guardada o None si no existe o caducó"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        """Guarda una copia de la respuesta descartando las entradas menos usadas"""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Descarta todas las entradas (por ejemplo al registrar resultados nuevos)"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Contadores de la caché para diagnóstico"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'record_hits': self.record_hits,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+# Instancia global de la caché de predicciones
+prediction_cache = PredictionCache()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Matriz precalculada de predicciones para todos los enfrentamientos de la liga
+"""
+
+import copy
+import threading
+import time
+from team_registry import team_registry
+from ml_models import predictor
+from feature_index import feature_index
+from models import partidos_watermark
+
+class PredictionMatrix:
+    """
+    Precalcula la predicción completa de cada par ordenado (local, visita) y la guarda
+    en una tabla densa indexada por código de equipo. La tabla se reconstruye cuando
+    cambia la versión: archivos de modelos (mtime), revisión de las tablas de features,
+    marca de agua de partidos (partidos registrados por cualquier worker, revisada cada
+    refresh_seconds) o una invalidación explícita (al registrar un partido en este worker).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.compute = None
+        self.refresh_seconds = 60
+        self._state = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._watermark = None
+        self._last_check = None
+
+    def configure(self, enabled=False, compute=None, refresh_seconds=60):
+        """
+        Args:
+            enabled (bool): Activa el modo precalculado
+            compute (callable): compute(home_teams, away_teams, home_codes, away_codes) -> lista de predicciones
+            refresh_seconds (int): Segundos entre lecturas de la marca de agua de partidos (0 = sin revisión)
+        """
+        self.enabled = enabled
+        self.compute = compute
+        self.refresh_seconds = refresh_seconds
+
+    def partidos_version(self):
+        """Marca de agua de partidos, leída en el primer uso y luego cada refresh_seconds"""
+        now = time.monotonic()
+        if self._last_check is None or (self.refresh_seconds and now - self._last_check >= self.refresh_seconds):
+            self._last_check = now
+            try:
+                self._watermark = partidos_watermark()
+            except Exception as e:
+                print(f"Error revisando partidos para la matriz de predicciones: {e}")
+        return self._watermark
+
+    def current_version(self):
+        """Versión actual de modelos + tablas de features + partidos + invalidaciones"""
+        # Refresca los índices de features si corresponde para detectar filas nuevas
+        feature_index.ready(feature_index.corners)
+        feature_index.ready(feature_index.ganador)
+        return (predictor.model_version(), feature_index.revision, self.partidos_version(), self._generation)
+
+    def invalidate(self):
+        """Marca la matriz como desactualizada; se reconstruye en la siguiente consulta"""
+        self._generation += 1
+        # La reconstrucción registra la marca de agua que incluye el partido nuevo
+        self._last_check = None
+
+    def build(self, force=False):
+        """Calcula las predicciones de todos los pares ordenados de equipos"""
+        with self._lock:
+            version = self.current_version()
+            if not force and self._state is not None and self._state['version'] == version:
+                # Otro hilo ya la reconstruyó mientras se esperaba el lock
+                return
+            started = time.perf_counter()
+
+            teams = sorted((team for team in team_registry.all() if team.codigo is not None), key=lambda team: team.codigo)
+            index = {team.codigo: i for i, team in enumerate(teams)}
+
+            home_teams, away_teams = [], []
+            for home in teams:
+                for away in teams:
+                    if home.id != away.id:
+                        home_teams.append(home)
+                        away_teams.append(away)
+
+            results = self.compute(
+                home_teams, away_teams,
+                [team.codigo for team in home_teams],
+                [team.codigo for team in away_teams]
+            ) if home_teams else []
+
+            table = [[None] * len(teams) for _ in teams]
+            for home, away, result in zip(home_teams, away_teams, results):
+                table[index[home.codigo]][index[away.codigo]] = result
+
+            self._state = {
+                'version': version,
+                'index': index,
+                'table': table,
+                'pairs': len(results),
+                'built_at': time.time(),
+                'build_seconds': time.perf_counter() - started
+            }
+            print(f"✅ Matriz de predicciones precalculada: {len(results)} enfrentamientos en {self._state['build_seconds']:.2f}s")
+
+    def get(self, home_code, away_code):
+        """
+        Retorna una copia de la predicción precalculada del par, reconstruyendo la
+        matriz si su versión quedó desactualizada. None si el par no está en la matriz.
+        """
+        state = self._state
+        if state is None or state['version'] != self.current_version():
+            self.build()
+            state = self._state
+
+        i = state['index'].get(home_code)
+        j = state['index'].get(away_code)
+        if i is None or j is None or state['table'][i][j] is None:
+            return None
+        return copy.deepcopy(state['table'][i][j])
+
+    def stats(self):
+        """Información de la matriz para diagnóstico"""
+        state = self._state
+        return {
+            'enabled': self.enabled,
+            'built': state is not None,
+            'teams': len(state['index']) if state else 0,
+            'pairs': state['pairs'] if state else 0,
+            'version': list(map(str, state['version'])) if state else None,
+            'built_at': state['built_at'] if state else None,
+            'build_seconds': round(state['build_seconds'], 4) if state else None
+        }
+
+# Instancia global de la matriz precalculada
+prediction_matrix = PredictionMatrix()
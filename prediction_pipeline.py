@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Pipeline de predicción: features -> escalado -> inferencia por modelo -> post-proceso
+"""
+
+import numpy as np
+from sqlalchemy import text
+from models import db
+from ml_models import predictor
+from feature_index import feature_index, GANADOR_FEATURE_COLUMNS
+from rolling_features import rolling_features
+from tracing import tracer, lazy
+from metrics import metrics
+
+# Valores por defecto cuando no hay datos históricos en corners_tabla
+DEFAULT_CORNERS_DATA = {
+    'corners_vs_rival_hist': 8.0,
+    'last3_vs_media_liga': 1.0,
+    'local_avg_last3': 5.0,
+    'local_avg_last5': 5.0,
+    'visitante_avg_last3': 4.0,
+    'local_corner_category': 1,
+    'diff_last3_vs_last5_local': 0.0,
+    'visitante_avg_last5': 4.0,
+    'visitante_corner_category': 1,
+    'diff_last3_vs_last5_visitante': 0.0,
+    'consistencia_corners_local': 0.8,
+    'tiros_bloqueados_local': 2.0,
+    'corners_por_ataque_peligroso': 0.1,
+    'diff_corners_equipo': 1.0,
+    'diff_corners_local': 0.5,
+    'diff_corners_visitante': 0.5
+}
+
+# Valores por defecto cuando no hay datos históricos en ganador_resultado_tabla
+DEFAULT_GANADOR_DATA = {
+    'goles_local_avg_last3': 1.5,
+    'goles_local_avg_last5': 1.4,
+    'goles_visitante_avg_last3': 1.2,
+    'goles_visitante_avg_last5': 1.3,
+    'goles_vs_rival_hist': 1.8,
+    'goles_por_ataque_peligroso_local': 0.15,
+    'goles_por_ataque_peligroso_visitante': 0.12,
+    'eficiencia_ataque_local': 0.25,
+    'eficiencia_ataque_visitante': 0.22,
+    'defensa_local_avg_last3': 0.8,
+    'defensa_local_avg_last5': 0.9,
+    'defensa_visitante_avg_last3': 1.1,
+    'defensa_visitante_avg_last5': 1.0,
+    'form_local': 0.6,
+    'form_visitante': 0.5,
+    'momentum_local': 0.7,
+    'momentum_visitante': 0.6
+}
+
+def fetch_latest_row(table, order_column, equipo_local_id, equipo_visitante_id):
+    """
+    Obtiene el último registro de una tabla de features usando el pool de conexiones
+    compartido con SQLAlchemy. Si no existe el enfrentamiento directo, busca con
+    los equipos invertidos.
+    
+    Returns:
+        tuple: (dict con la fila o None, bool indicando si se usó el par invertido)
+    """
+    query = text(f"""
+    SELECT * FROM {table} 
+    WHERE equipo_local_id = :local_id AND equipo_visitante_id = :visitante_id
+    ORDER BY {order_column} DESC 
+    LIMIT 1
+    """)
+    
+    with db.engine.connect() as conn:
+        row = conn.execute(query, {'local_id': equipo_local_id, 'visitante_id': equipo_visitante_id}).mappings().first()
+        if row is not None:
+            return dict(row), False
+        
+        # Si no hay datos, buscar con equipos invertidos
+        row = conn.execute(query, {'local_id': equipo_visitante_id, 'visitante_id': equipo_local_id}).mappings().first()
+        if row is not None:
+            return dict(row), True
+    
+    return None, False
+
+def get_corners_data(equipo_local_id, equipo_visitante_id):
+    """Obtiene el último registro de corners_tabla para los equipos especificados"""
+    try:
+        if feature_index.ready(feature_index.corners):
+            corners_data, _ = feature_index.corners.get(equipo_local_id, equipo_visitante_id)
+        else:
+            corners_data, _ = fetch_latest_row('corners_tabla', 'fecha', equipo_local_id, equipo_visitante_id)
+        
+        if corners_data is None and rolling_features.ready():
+            # Sin fila precalculada: calcular las features desde las ventanas móviles
+            corners_data = rolling_features.features(equipo_local_id, equipo_visitante_id)
+            if corners_data is not None:
+                metrics.fallback('corners_tabla_rolling')
+        
+        if corners_data is None:
+            # Si no hay datos históricos, usar valores por defecto
+            metrics.fallback('corners_tabla_default')
+            corners_data = dict(DEFAULT_CORNERS_DATA)
+        
+        return corners_data
+        
+    except Exception as e:
+        print(f"Error obteniendo datos de corners_tabla: {e}")
+        # Retornar valores por defecto en caso de error
+        metrics.fallback('corners_tabla_default')
+        return dict(DEFAULT_CORNERS_DATA)
+
+def corners_feature_row(corners_data):
+    """Arma la fila de 16 features del escalador de córners en el orden de entrenamiento"""
+    return [
+        corners_data['corners_vs_rival_hist'],
+        corners_data['last3_vs_media_liga'],
+        corners_data['local_avg_last3'],
+        corners_data['local_avg_last5'],
+        corners_data['visitante_avg_last3'],
+        corners_data['local_corner_category'],
+        corners_data['diff_last3_vs_last5_local'],
+        corners_data['visitante_avg_last5'],
+        corners_data['visitante_corner_category'],
+        corners_data['diff_last3_vs_last5_visitante'],
+        corners_data['consistencia_corners_local'],
+        corners_data['tiros_bloqueados_local'],
+        corners_data['corners_por_ataque_peligroso'],
+        corners_data['diff_corners_equipo'],
+        corners_data['diff_corners_local'],
+        corners_data['diff_corners_visitante']
+    ]
+
+def score_feature_row(ganador_data, home_code, away_code):
+    """Arma la fila de 19 features del modelo de marcador (valores por defecto para columnas faltantes)"""
+    return [
+        ganador_data.get('goles_local_avg_last3', 1.5),
+        ganador_data.get('goles_local_avg_last5', 1.4),
+        ganador_data.get('goles_visitante_avg_last3', 1.2),
+        ganador_data.get('goles_visitante_avg_last5', 1.3),
+        ganador_data.get('goles_vs_rival_hist', 1.8),
+        ganador_data.get('goles_por_ataque_peligroso_local', 0.15),
+        ganador_data.get('goles_por_ataque_peligroso_visitante', 0.12),
+        ganador_data.get('eficiencia_ataque_local', 0.25),
+        ganador_data.get('eficiencia_ataque_visitante', 0.22),
+        ganador_data.get('defensa_local_avg_last3', 0.8),
+        ganador_data.get('defensa_local_avg_last5', 0.9),
+        ganador_data.get('defensa_visitante_avg_last3', 1.1),
+        ganador_data.get('defensa_visitante_avg_last5', 1.0),
+        ganador_data.get('form_local', 0.6),
+        ganador_data.get('form_visitante', 0.5),
+        ganador_data.get('momentum_local', 0.7),
+        ganador_data.get('momentum_visitante', 0.6),
+        home_code,
+        away_code
+    ]
+
+def get_ganador_resultado_data(equipo_local_id, equipo_visitante_id):
+    """Obtiene el último registro de ganador_resultado_tabla para los equipos especificados"""
+    try:
+        if feature_index.ready(feature_index.ganador):
+            ganador_data, invertido = feature_index.ganador.get(equipo_local_id, equipo_visitante_id)
+        else:
+            ganador_data, invertido = fetch_latest_row('ganador_resultado_tabla', 'anio', equipo_local_id, equipo_visitante_id)
+        
+        if ganador_data is None:
+            # Si no hay datos históricos, usar valores por defecto
+            metrics.fallback('ganador_tabla_default')
+            ganador_data = dict(DEFAULT_GANADOR_DATA)
+        else:
+            tracer.debug("Columnas disponibles en ganador_resultado_tabla{}: {}...",
+                         " (invertido)" if invertido else "", lazy(lambda: list(ganador_data.keys())[:10]))
+        
+        return ganador_data
+        
+    except Exception as e:
+        print(f"Error obteniendo datos de ganador_resultado_tabla: {e}")
+        # Retornar valores por defecto en caso de error
+        metrics.fallback('ganador_tabla_default')
+        return dict(DEFAULT_GANADOR_DATA)
+
+def stage(name, *dependencies):
+    """Registra un método de PredictionRun como etapa del pipeline con sus dependencias"""
+    def decorator(func):
+        func.stage_name = name
+        func.stage_dependencies = dependencies
+        return func
+    return decorator
+
+class PredictionRun:
+    """
+    Una ejecución del pipeline de predicción para un conjunto de partidos.
+
+    Las etapas se declaran con @stage y forman un grafo:
+    features (tablas e historia) -> escalado -> inferencia por modelo -> post-proceso.
+    Cada etapa se calcula una sola vez por ejecución y su salida queda memorizada,
+    así cada modelo se evalúa una vez sobre la matriz de todos los partidos y la
+    respuesta usa un único marcador y un único total de córners.
+    """
+
+    STAGES = {}
+
+    def __init__(self, home_teams, away_teams, home_codes, away_codes, inputs=None):
+        """
+        Args:
+            home_teams, away_teams (list): Equipos (Equipo) de cada partido
+            home_codes, away_codes (list): Códigos de los equipos para los modelos
+            inputs (dict): Salidas de etapas ya obtenidas (por ejemplo features precargadas)
+        """
+        self.home_teams = list(home_teams)
+        self.away_teams = list(away_teams)
+        self.home_codes = list(home_codes)
+        self.away_codes = list(away_codes)
+        self.size = len(self.home_codes)
+        self._results = dict(inputs or {})
+        self.executed = []
+        # Segundos por etapa (histogramas de /metrics y cabecera Server-Timing)
+        self.timings = {}
+
+    def value(self, name):
+        """Retorna la salida de una etapa calculándola (junto a sus dependencias) si hace falta"""
+        if name not in self._results:
+            func = self.STAGES[name]
+            for dependency in func.stage_dependencies:
+                self.value(dependency)
+            with metrics.timed(name, self.timings):
+                self._results[name] = func(self)
+            self.executed.append(name)
+        return self._results[name]
+
+    def compute(self, name):
+        """
+        Calcula una etapa cuyas dependencias ya están calculadas sin modificar la ejecución
+        (para los hilos del pool de sub-modelos: un hilo que superó el timeout puede
+        terminar después de la respuesta, así que solo el hilo de la petición escribe)
+
+        Returns:
+            tuple: (salida de la etapa, segundos)
+        """
+        func = self.STAGES[name]
+        timings = {}
+        with metrics.timed(name, timings):
+            result = func(self)
+        return result, timings.get(name, 0.0)
+
+    # Etapa 1: features
+
+    @stage('corners_rows')
+    def fetch_corners_rows(self):
+        """Filas de corners_tabla de cada partido"""
+        return [get_corners_data(home.id, away.id) for home, away in zip(self.home_teams, self.away_teams)]
+
+    @stage('ganador_rows')
+    def fetch_ganador_rows(self):
+        """Filas de ganador_resultado_tabla de cada partido"""
+        return [get_ganador_resultado_data(home.id, away.id) for home, away in zip(self.home_teams, self.away_teams)]
+
+    @stage('history')
+    def fetch_history(self):
+        """Último enfrentamiento de cada partido en la tabla partidos (una sola consulta)"""
+        try:
+            return predictor.get_historical_data_batch(list(zip(self.home_codes, self.away_codes)))
+        except Exception as e:
+            print(f"Error obteniendo datos históricos: {e}")
+            return [None] * self.size
+
+    # Etapa 2: escalado
+
+    @stage('corners_scaled', 'corners_rows')
+    def scale_corners(self):
+        """Features de córners escaladas (None si el escalador falla o no está disponible)"""
+        if predictor.corners_scaler is None:
+            return None
+        try:
+            features = np.array([corners_feature_row(row) for row in self.value('corners_rows')], dtype=float)
+            tracer.debug("Features para escalador: {}", features.shape)
+            tracer.debug("Primeras 5 features: {}", lazy(lambda: features[0][:5]))
+            metrics.model_call('corners_scaler', len(features))
+            return predictor.corners_scaler.transform(features)
+        except Exception as e:
+            print(f"Error escalando features de córners: {e}")
+            return None
+
+    # Etapa 3: inferencia (una llamada por modelo)
+
+    @stage('corners_raw', 'corners_scaled')
+    def infer_corners(self):
+        """Córners totales del modelo XGBoost (18 features: códigos + 16 escaladas)"""
+        features_scaled = self.value('corners_scaled')
+        if features_scaled is None or predictor.corners_model is None:
+            return None
+        try:
+            features = np.concatenate([
+                np.column_stack([self.home_codes, self.away_codes]),
+                features_scaled
+            ], axis=1)
+            tracer.debug("Features para modelo: {}", features.shape)
+            tracer.debug("IDs de equipos: [{}, {}]", self.home_codes[0], self.away_codes[0])
+            
+            metrics.model_call('corners_model', len(features))
+            prediction = predictor.corners_model.predict(features)
+            tracer.debug("Predicción raw del modelo: {}", lazy(lambda: prediction[0]))
+            return prediction
+        except Exception as e:
+            print(f"Error calculando corners totales: {e}")
+            return None
+
+    @stage('score_raw', 'ganador_rows')
+    def infer_score(self):
+        """Goles (local, visita) del modelo de marcador (None si no está disponible)"""
+        if predictor.score_model is None:
+            # El motivo (archivo faltante o rechazado por el esquema) se informa al cargarlo
+            tracer.debug("Modelo de marcador no disponible: {}", lazy(lambda: predictor.model_set().load_status.get('score_model')))
+            return None
+        try:
+            ganador_rows = self.value('ganador_rows')
+            if tracer.enabled():
+                tracer.debug("Claves disponibles en ganador_data: {}", list(ganador_rows[0].keys()))
+                missing_columns = [col for col in GANADOR_FEATURE_COLUMNS if col not in ganador_rows[0]]
+                if missing_columns:
+                    tracer.debug("Columnas faltantes: {}", missing_columns)
+                    tracer.debug("Usando valores por defecto para columnas faltantes")
+
+            features = np.array([
+                score_feature_row(ganador_data, home_code, away_code)
+                for ganador_data, home_code, away_code in zip(ganador_rows, self.home_codes, self.away_codes)
+            ], dtype=float)
+            tracer.debug("Features para modelo de marcador: {}", features.shape)
+            tracer.debug("Primeras 5 features: {}", lazy(lambda: features[0][:5]))
+            tracer.debug("Tipo de predictor.score_model: {}", lazy(type, predictor.score_model))
+            tracer.debug("predictor.score_model: {}", lazy(repr, predictor.score_model))
+            
+            metrics.model_call('score_model', len(features))
+            prediction = predictor.score_model.predict(features)
+            tracer.debug("Predicción raw del modelo de marcador: {}", lazy(lambda: prediction[0]))
+            return prediction
+        except Exception as e:
+            print(f"Error calculando marcador: {e}")
+            return None
+
+    def with_history(self):
+        """Índices de los partidos con datos históricos"""
+        return [i for i, data in enumerate(self.value('history')) if data]
+
+    @stage('yellow_cards', 'history')
+    def infer_yellow_cards(self):
+        """Tarjetas amarillas de los partidos con datos históricos"""
+        history = self.value('history')
+        rows = self.with_history()
+        predictions = predictor.predict_yellow_cards_batch([history[i] for i in rows]) if rows else []
+        return dict(zip(rows, predictions))
+
+    @stage('red_cards', 'history')
+    def infer_red_cards(self):
+        """Tarjetas rojas de los partidos con datos históricos"""
+        history = self.value('history')
+        rows = self.with_history()
+        predictions = predictor.predict_red_cards_batch([history[i] for i in rows]) if rows else []
+        return dict(zip(rows, predictions))
+
+    # Etapa 4: post-proceso
+
+    @stage('predictions', 'history', 'corners_rows', 'ganador_rows', 'corners_raw', 'score_raw', 'yellow_cards', 'red_cards')
+    def assemble(self):
+        """Arma la respuesta de cada partido a partir de las salidas de los modelos"""
+        history = self.value('history')
+        corners_rows = self.value('corners_rows')
+        ganador_rows = self.value('ganador_rows')
+        corners_raw = self.value('corners_raw')
+        score_raw = self.value('score_raw')
+        yellow_cards = self.value('yellow_cards')
+        red_cards = self.value('red_cards')
+
+        if corners_raw is None:
+            metrics.fallback('corners_model', self.size)
+        if score_raw is None:
+            metrics.fallback('score_model', self.size)
+        metrics.fallback('no_history', sum(1 for data in history if not data))
+        
+        results = []
+        for i in range(self.size):
+            has_history = bool(history[i])
+
+            # Córners: un solo valor del modelo para el total y la distribución local/visita
+            if corners_raw is not None:
+                prediction = float(corners_raw[i])
+                corners_total = max(1, int(round(prediction)))
+                corners = {'home': max(2, int(prediction * 0.6)), 'away': max(2, int(prediction * 0.4))}
+            else:
+                corners_total = max(1, int(corners_rows[i].get('corners_vs_rival_hist', 8)))
+                corners = predictor.corners_from_history(history[i]) if has_history else {'home': 5, 'away': 4}
+
+            # Marcador y probabilidades de resultado coherentes con él
+            if score_raw is not None:
+                score = {'home': max(0, int(round(score_raw[i][0]))), 'away': max(0, int(round(score_raw[i][1])))}
+                home_win, draw, away_win = predictor.result_probabilities(score['home'], score['away'])
+            else:
+                score = {
+                    'home': max(0, int(ganador_rows[i].get('goles_local_avg_last3', 1.5))),
+                    'away': max(0, int(ganador_rows[i].get('goles_visitante_avg_last3', 1.2)))
+                }
+                if has_history:
+                    default_result = predictor.get_default_result()
+                    home_win, draw, away_win = default_result['home_win'], default_result['draw'], default_result['away_win']
+                else:
+                    home_win, draw, away_win = predictor.code_probabilities(self.home_codes[i], self.away_codes[i])
+
+            tracer.debug("Corners totales finales: {}", corners_total)
+            tracer.debug("Marcador final: {}-{}", score['home'], score['away'])
+            
+            results.append({
+                'home_win': float(home_win),
+                'draw': float(draw),
+                'away_win': float(away_win),
+                'score': score,
+                'corners': corners,
+                'corners_total': corners_total,
+                'yellow_cards': yellow_cards.get(i) or {
+                    'home': np.random.randint(1, 4),
+                    'away': np.random.randint(1, 4)
+                },
+                'red_cards': red_cards.get(i) or {
+                    'home': np.random.randint(0, 2),
+                    'away': np.random.randint(0, 2)
+                }
+            })
+
+        return results
+
+    # Etapas de inferencia independientes entre sí, con su valor por defecto si fallan o se demoran
+    INFERENCE_STAGES = {
+        'corners_raw': lambda run: None,
+        'score_raw': lambda run: None,
+        'yellow_cards': lambda run: {i: {'home': 2, 'away': 2} for i in run.with_history()},
+        'red_cards': lambda run: {i: {'home': 0, 'away': 0} for i in run.with_history()}
+    }
+
+    def run(self):
+        """Ejecuta el pipeline completo y retorna las predicciones en el orden de entrada"""
+        if predictor.execution == 'threaded':
+            # Features en este hilo, luego los modelos en paralelo en el pool compartido
+            for name in ('corners_scaled', 'ganador_rows', 'history'):
+                self.value(name)
+            pending = [name for name in self.INFERENCE_STAGES if name not in self._results]
+            results = predictor.run_submodels({
+                name: (lambda name=name: self.compute(name), lambda name=name: (self.INFERENCE_STAGES[name](self), None))
+                for name in pending
+            })
+            for name, (result, seconds) in results.items():
+                self._results[name] = result
+                if seconds is not None:
+                    self.timings[name] = seconds
+                    self.executed.append(name)
+        return self.value('predictions')
+
+# Registro de etapas por nombre
+PredictionRun.STAGES = {
+    func.stage_name: func
+    for func in vars(PredictionRun).values()
+    if callable(func) and hasattr(func, 'stage_name')
+}
+
+def predict_fixtures(home_teams, away_teams, home_codes, away_codes, inputs=None):
+    """
+    Predicción completa (resultado, marcador, córners y tarjetas) de varios partidos,
+    con una matriz de features y una llamada por modelo
+    """
+    run = PredictionRun(home_teams, away_teams, home_codes, away_codes, inputs)
+    # Todas las etapas usan el mismo conjunto de modelos aunque se recargue a la mitad
+    with predictor.pinned():
+        results = run.run()
+    
+    # Las etapas pueden ejecutarse en otros hilos: se agregan a la petición al terminar
+    for name, seconds in run.timings.items():
+        metrics.add_server_timing(name, seconds)
+    return results
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Motor incremental de features móviles de córners calculadas a partir de partidos
+"""
+
+import threading
+import time
+from collections import deque
+import numpy as np
+from sqlalchemy import text
+from models import db, Partido, partidos_watermark
+from feature_index import CORNERS_FEATURE_COLUMNS
+
+# Tamaño máximo de ventana (last5); last3 se toma de la misma ventana
+WINDOW_SIZE = 5
+
+# Umbrales de categoría sobre el promedio de las últimas 5 (0 = bajo, 1 = medio, 2 = alto)
+CATEGORY_LOW = 3.5
+CATEGORY_HIGH = 7.0
+
+# Columnas que no se pueden derivar de la tabla partidos (valores por defecto)
+TIROS_BLOQUEADOS_DEFAULT = 2.1
+CORNERS_POR_ATAQUE_PELIGROSO_DEFAULT = 0.3
+
+class TeamWindow:
+    """Ventanas circulares de córners a favor y en contra de un equipo"""
+
+    __slots__ = ('corners_for', 'corners_against', 'last_fecha')
+
+    def __init__(self):
+        self.corners_for = deque(maxlen=WINDOW_SIZE)
+        self.corners_against = deque(maxlen=WINDOW_SIZE)
+        # Fecha del partido más reciente de la ventana
+        self.last_fecha = None
+
+    def avg_last(self, n):
+        """Promedio de córners a favor en los últimos n partidos"""
+        values = list(self.corners_for)[-n:]
+        return sum(values) / len(values) if values else None
+
+    def last_diff(self):
+        """Diferencia de córners (a favor - en contra) del último partido"""
+        if not self.corners_for:
+            return 0.0
+        return float(self.corners_for[-1] - self.corners_against[-1])
+
+    def last_change(self):
+        """Variación de córners a favor entre los dos últimos partidos"""
+        if len(self.corners_for) < 2:
+            return 0.0
+        return float(self.corners_for[-1] - self.corners_for[-2])
+
+class RollingFeatureEngine:
+    """
+    Mantiene por equipo las últimas WINDOW_SIZE cifras de córners y calcula las
+    columnas de corners_tabla para cualquier enfrentamiento. Se inicializa una vez
+    recorriendo la historia de partidos; luego cada partido nuevo solo actualiza
+    las ventanas de los dos equipos involucrados (O(ventana)).
+
+    Cada worker tiene su propia copia: cada refresh_seconds compara una marca de agua
+    de la tabla partidos (id máximo y cantidad de filas) con la de su estado y se
+    reinicializa si otro proceso registró o borró partidos.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.persist = False
+        self.refresh_seconds = 60
+        self._lock = threading.Lock()
+        self._teams = {}
+        self._head_to_head = {}
+        self._league_corners = 0
+        self._league_entries = 0
+        self._bootstrapped = False
+        self._watermark = None
+        self._last_attempt = None
+        self.matches = 0
+        self.bootstraps = 0
+        self.last_error = None
+
+    def configure(self, enabled=True, persist=False, refresh_seconds=60):
+        """
+        Args:
+            enabled (bool): Activa el motor
+            persist (bool): Escribe en corners_tabla las features de cada partido nuevo
+            refresh_seconds (int): Segundos entre revisiones de la marca de agua de partidos
+                (y entre reintentos si la inicialización falló; 0 = sin revisión)
+        """
+        self.enabled = enabled
+        self.persist = persist
+        self.refresh_seconds = refresh_seconds
+
+    def _apply(self, local_id, visita_id, corners_local, corners_visita, fecha=None):
+        """Agrega un partido a las ventanas (el lock debe estar tomado)"""
+        if corners_local is None or corners_visita is None:
+            return False
+
+        local = self._teams.setdefault(local_id, TeamWindow())
+        visita = self._teams.setdefault(visita_id, TeamWindow())
+        local.corners_for.append(corners_local)
+        local.corners_against.append(corners_visita)
+        visita.corners_for.append(corners_visita)
+        visita.corners_against.append(corners_local)
+        local.last_fecha = visita.last_fecha = fecha
+
+        self._head_to_head[frozenset((local_id, visita_id))] = corners_local + corners_visita
+        self._league_corners += corners_local + corners_visita
+        self._league_entries += 2
+        self.matches += 1
+        return True
+
+    def bootstrap(self, partido_id=None):
+        """
+        Recorre la historia de partidos en orden cronológico
+
+        Args:
+            partido_id (int): Partido cuyas features previas se quieren obtener
+
+        Returns:
+            dict: Features del enfrentamiento de partido_id justo antes de aplicarlo
+                (None si no se indicó, no está o algún equipo no tenía historia)
+        """
+        previous = None
+        with self._lock:
+            self._last_attempt = time.monotonic()
+            try:
+                watermark = partidos_watermark()
+                rows = db.session.query(
+                    Partido.id, Partido.equipo_local_id, Partido.equipo_visita_id,
+                    Partido.corners_local, Partido.corners_visita, Partido.fecha
+                ).order_by(Partido.fecha.asc(), Partido.id.asc()).yield_per(1000)
+
+                self._teams = {}
+                self._head_to_head = {}
+                self._league_corners = 0
+                self._league_entries = 0
+                self.matches = 0
+                for row in rows:
+                    if row.id == partido_id:
+                        previous = self._features(row.equipo_local_id, row.equipo_visita_id)
+                    self._apply(row.equipo_local_id, row.equipo_visita_id,
+                                row.corners_local, row.corners_visita, row.fecha)
+
+                self._watermark = watermark
+                self._bootstrapped = True
+                self.bootstraps += 1
+                self.last_error = None
+                print(f"✅ Features móviles inicializadas: {self.matches} partidos, {len(self._teams)} equipos")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error inicializando features móviles: {e}")
+        return previous
+
+    def refresh(self):
+        """Se reinicializa si la tabla partidos cambió desde la última lectura"""
+        self._last_attempt = time.monotonic()
+        try:
+            changed = partidos_watermark() != self._watermark
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error revisando partidos para las features móviles: {e}")
+            return
+        if changed:
+            print("🔄 Partidos registrados por otro proceso: reinicializando features móviles")
+            self.bootstrap()
+
+    def ready(self):
+        """
+        Indica si el motor puede usarse: lo inicializa en el primer uso, revisa la marca
+        de agua cada refresh_seconds y, si la inicialización falló, la reintenta con el
+        mismo intervalo
+        """
+        if not self.enabled:
+            return False
+        if self._last_attempt is None:
+            self.bootstrap()
+        elif self.refresh_seconds and time.monotonic() - self._last_attempt >= self.refresh_seconds:
+            if self._bootstrapped:
+                self.refresh()
+            else:
+                self.bootstrap()
+        return self._bootstrapped
+
+    def league_mean(self):
+        """Promedio de córners por equipo y partido en toda la liga"""
+        if not self._league_entries:
+            return None
+        return self._league_corners / self._league_entries
+
+    def knows(self, equipo_id):
+        """Indica si el equipo tiene al menos un partido en su ventana"""
+        team = self._teams.get(equipo_id)
+        return team is not None and len(team.corners_for) > 0
+
+    def features(self, local_id, visita_id):
+        """
+        Calcula las columnas de corners_tabla del enfrentamiento con el estado actual
+
+        Returns:
+            dict: columna -> valor, o None si alguno de los equipos no tiene partidos
+        """
+        with self._lock:
+            return self._features(local_id, visita_id)
+
+    def _features(self, local_id, visita_id):
+        """features sin tomar el lock (quien llama debe tenerlo)"""
+        local = self._teams.get(local_id)
+        visita = self._teams.get(visita_id)
+        if local is None or visita is None or not local.corners_for or not visita.corners_for:
+            return None
+
+        league_mean = self.league_mean()
+        local_avg_last3 = local.avg_last(3)
+        local_avg_last5 = local.avg_last(5)
+        visitante_avg_last3 = visita.avg_last(3)
+        visitante_avg_last5 = visita.avg_last(5)
+        corners_vs_rival_hist = self._head_to_head.get(frozenset((local_id, visita_id)), 2 * league_mean)
+
+        return {
+            'corners_vs_rival_hist': float(corners_vs_rival_hist),
+            'last3_vs_media_liga': local_avg_last3 / league_mean if league_mean else 1.0,
+            'local_avg_last3': local_avg_last3,
+            'local_avg_last5': local_avg_last5,
+            'visitante_avg_last3': visitante_avg_last3,
+            'local_corner_category': corner_category(local_avg_last5),
+            'diff_last3_vs_last5_local': local_avg_last3 - local_avg_last5,
+            'visitante_avg_last5': visitante_avg_last5,
+            'visitante_corner_category': corner_category(visitante_avg_last5),
+            'diff_last3_vs_last5_visitante': visitante_avg_last3 - visitante_avg_last5,
+            'consistencia_corners_local': local_avg_last3 / (local_avg_last5 + 1e-6),
+            'tiros_bloqueados_local': TIROS_BLOQUEADOS_DEFAULT,
+            'corners_por_ataque_peligroso': CORNERS_POR_ATAQUE_PELIGROSO_DEFAULT,
+            'diff_corners_equipo': local.last_diff(),
+            'diff_corners_local': local.last_change(),
+            'diff_corners_visitante': visita.last_change()
+        }
+
+    def vector(self, local_id, visita_id):
+        """Igual que features pero como vector en el orden de CORNERS_FEATURE_COLUMNS"""
+        features = self.features(local_id, visita_id)
+        if features is None:
+            return None
+        return np.array([features[col] for col in CORNERS_FEATURE_COLUMNS], dtype=np.float64)
+
+    def _is_backfill(self, partido):
+        """Indica si el partido es anterior al último de alguno de sus equipos (el lock debe estar tomado)"""
+        for equipo_id in (partido.equipo_local_id, partido.equipo_visita_id):
+            team = self._teams.get(equipo_id)
+            if team is not None and team.last_fecha is not None and partido.fecha < team.last_fecha:
+                return True
+        return False
+
+    def update(self, partido):
+        """
+        Registra un partido nuevo actualizando solo las ventanas de sus dos equipos.
+        Si el motor no estaba inicializado o el partido es anterior al último de alguno
+        de sus equipos (carga atrasada), se reinicializa desde partidos en orden
+        cronológico. Si persist está activo, guarda en corners_tabla las features
+        previas al partido.
+
+        Returns:
+            dict: Features previas al partido (None si algún equipo no tenía historia)
+        """
+        with self._lock:
+            incremental = self._bootstrapped and not self._is_backfill(partido)
+            if incremental:
+                previous = self._features(partido.equipo_local_id, partido.equipo_visita_id)
+                self._apply(partido.equipo_local_id, partido.equipo_visita_id,
+                            partido.corners_local, partido.corners_visita, partido.fecha)
+                max_id, count = self._watermark
+                self._watermark = (max(max_id or 0, partido.id), count + 1)
+
+        if not incremental:
+            # El partido ya está guardado: la inicialización toma sus features al llegar a él
+            previous = self.bootstrap(partido_id=partido.id)
+
+        if self.persist and previous is not None:
+            self.write_row(partido, previous)
+        return previous
+
+    def write_row(self, partido, features):
+        """Inserta la fila de corners_tabla del partido"""
+        try:
+            row = dict(features)
+            row['equipo_local_id'] = partido.equipo_local_id
+            row['equipo_visitante_id'] = partido.equipo_visita_id
+            row['fecha'] = partido.fecha
+            columns = ', '.join(row)
+            values = ', '.join(f':{col}' for col in row)
+            with db.engine.begin() as conn:
+                conn.execute(text(f"INSERT INTO corners_tabla ({columns}) VALUES ({values})"), row)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error guardando features móviles en corners_tabla: {e}")
+
+    def stats(self):
+        """Información del motor para diagnóstico"""
+        league_mean = self.league_mean()
+        return {
+            'enabled': self.enabled,
+            'persist': self.persist,
+            'bootstrapped': self._bootstrapped,
+            'bootstraps': self.bootstraps,
+            'refresh_seconds': self.refresh_seconds,
+            'watermark': list(self._watermark) if self._watermark else None,
+            'matches': self.matches,
+            'teams': len(self._teams),
+            'window_size': WINDOW_SIZE,
+            'league_mean': round(league_mean, 4) if league_mean is not None else None,
+            'last_error': self.last_error
+        }
+
+def corner_category(avg_last5):
+    """Categoría de córners del equipo según su promedio de las últimas 5"""
+    if avg_last5 <= CATEGORY_LOW:
+        return 0
+    if avg_last5 >= CATEGORY_HIGH:
+        return 2
+    return 1
+
+# Instancia global del motor de features móviles
+rolling_features = RollingFeatureEngine()
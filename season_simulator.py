@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Simulación Monte Carlo del resto de la temporada
+
+Parte de la tabla actual (partidos con resultado de la temporada) y de la predicción de
+cada partido pendiente (probabilidades local/empate/visita y goles esperados del
+pipeline) y simula la temporada completa muchas veces con operaciones de NumPy sobre
+matrices (simulaciones x partidos). Resultado: probabilidad de título, de descenso y de
+terminar en cada posición para cada equipo.
+
+Uso:
+    python season_simulator.py --season 2024 --simulations 100000 --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+
+# Puntos por resultado (0 = gana el local, 1 = empate, 2 = gana la visita)
+HOME_POINTS = np.array([3, 1, 0], dtype=np.int16)
+AWAY_POINTS = np.array([0, 1, 3], dtype=np.int16)
+
+# Goles esperados mínimos (la predicción de marcador puede ser 0)
+MIN_GOAL_RATE = 0.2
+
+# Goles máximos por equipo en un partido simulado (la Poisson se muestrea con su CDF hasta aquí)
+MAX_GOALS = 12
+
+# Simulaciones por bloque: limita la memoria de las matrices (simulaciones x partidos)
+CHUNK_SIZE = 10000
+
+class SeasonInput:
+    """Tabla actual y partidos pendientes con sus probabilidades, en arreglos de NumPy"""
+
+    def __init__(self, teams, points, goal_difference, goals_for, home, away, probabilities, goal_rates):
+        """
+        Args:
+            teams (list): Equipos (cualquier objeto; el índice es su posición en la lista)
+            points, goal_difference, goals_for: Tabla actual por equipo
+            home, away: Índice del equipo local y visitante de cada partido pendiente
+            probabilities: (partidos, 3) probabilidades local / empate / visita
+            goal_rates: (partidos, 2) goles esperados local / visita
+        """
+        self.teams = list(teams)
+        self.points = np.asarray(points, dtype=np.int32)
+        self.goal_difference = np.asarray(goal_difference, dtype=np.int32)
+        self.goals_for = np.asarray(goals_for, dtype=np.int32)
+        self.home = np.asarray(home, dtype=np.intp)
+        self.away = np.asarray(away, dtype=np.intp)
+
+        probabilities = np.asarray(probabilities, dtype=np.float64).reshape(-1, 3)
+        self.probabilities = probabilities / probabilities.sum(axis=1, keepdims=True)
+        self.goal_rates = np.maximum(np.asarray(goal_rates, dtype=np.float64).reshape(-1, 2), MIN_GOAL_RATE)
+
+    def arrays(self):
+        """Arreglos que necesita simulate_chunk (se envían a los procesos del pool)"""
+        return (
+            len(self.teams), self.points, self.goal_difference, self.goals_for,
+            self.home, self.away, self.probabilities, self.goal_rates
+        )
+
+def poisson_cdf(rates):
+    """CDF de Poisson de 0 a MAX_GOALS - 1 goles para cada tasa: (partidos, MAX_GOALS)"""
+    k = np.arange(MAX_GOALS)
+    log_pmf = k * np.log(rates)[:, None] - rates[:, None] - np.cumsum(np.log(np.maximum(k, 1)))
+    return np.cumsum(np.exp(log_pmf), axis=1)
+
+def sample_goals(rng, cdf, n_sims):
+    """
+    Goles de cada partido por inversión de la CDF: cuenta los escalones que supera un
+    uniforme. Es varias veces más rápido que rng.poisson con una tasa por columna.
+    """
+    u = rng.random((n_sims, cdf.shape[0]))
+    goals = np.zeros(u.shape, dtype=np.int16)
+    for step in cdf.T:
+        goals += u >= step
+    return goals
+
+def simulate_chunk(arrays, n_sims, seed):
+    """
+    Simula n_sims temporadas y cuenta en qué posición termina cada equipo
+
+    Cada partido toma su resultado de las probabilidades del pipeline y sus goles de una
+    Poisson con los goles esperados, ajustados para coincidir con el resultado (el
+    ganador suma un gol si la Poisson no lo daba ganador; en el empate la visita iguala
+    al local). La tabla se ordena por puntos, diferencia de gol, goles a favor y sorteo.
+
+    Returns:
+        tuple: (conteos equipo x posición, suma de puntos finales por equipo)
+    """
+    n_teams, points, goal_difference, goals_for, home, away, probabilities, goal_rates = arrays
+    rng = np.random.default_rng(seed)
+    n_fixtures = len(home)
+
+    # Matrices de incidencia partido -> equipo para sumar por equipo con un producto
+    home_matrix = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    away_matrix = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    home_matrix[np.arange(n_fixtures), home] = 1
+    away_matrix[np.arange(n_fixtures), away] = 1
+    cumulative = np.cumsum(probabilities, axis=1)
+
+    # Resultado: 0 local, 1 empate, 2 visita
+    u = rng.random((n_sims, n_fixtures))
+    outcome = (u >= cumulative[:, 0]).astype(np.int8) + (u >= cumulative[:, 1])
+
+    home_goals = sample_goals(rng, poisson_cdf(goal_rates[:, 0]), n_sims)
+    away_goals = sample_goals(rng, poisson_cdf(goal_rates[:, 1]), n_sims)
+    home_goals = np.where((outcome == 0) & (home_goals <= away_goals), away_goals + 1, home_goals)
+    away_goals = np.where(outcome == 1, home_goals, away_goals)
+    away_goals = np.where((outcome == 2) & (away_goals <= home_goals), home_goals + 1, away_goals)
+
+    final_points = points + (HOME_POINTS[outcome] @ home_matrix + AWAY_POINTS[outcome] @ away_matrix)
+    margin = (home_goals - away_goals).astype(np.float32)
+    final_difference = goal_difference + (margin @ home_matrix - margin @ away_matrix)
+    final_goals = goals_for + (home_goals.astype(np.float32) @ home_matrix + away_goals.astype(np.float32) @ away_matrix)
+
+    # Clave de orden: puntos, diferencia de gol, goles a favor y un sorteo en la parte decimal
+    key = (
+        (final_points.astype(np.float64) * 4096 + np.clip(final_difference, -2047, 2047) + 2048) * 1024
+        + np.clip(final_goals, 0, 1023)
+        + rng.random((n_sims, n_teams))
+    )
+    order = np.argsort(-key, axis=1)
+
+    # order[s, posición] = equipo; se cuenta cada par (equipo, posición)
+    cells = order * n_teams + np.arange(n_teams)
+    counts = np.bincount(cells.ravel(), minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+    return counts, final_points.sum(axis=0, dtype=np.float64)
+
+def simulate(season, n_sims=100000, seed=0, workers=0, chunk_size=CHUNK_SIZE):
+    """
+    Simula la temporada n_sims veces en bloques de chunk_size. Cada bloque tiene su propia
+    semilla derivada de seed (SeedSequence.spawn), así el resultado es el mismo con
+    cualquier número de procesos.
+
+    Args:
+        season (SeasonInput): Tabla y partidos pendientes
+        n_sims (int): Número de temporadas simuladas
+        seed (int): Semilla
+        workers (int): Procesos del pool (0 = en este proceso)
+        chunk_size (int): Simulaciones por bloque
+
+    Returns:
+        tuple: (conteos equipo x posición, puntos esperados por equipo)
+    """
+    sizes = [min(chunk_size, n_sims - start) for start in range(0, n_sims, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arrays = season.arrays()
+    n_teams = len(season.teams)
+
+    if workers and len(sizes) > 1:
+        # 'spawn': los procesos nuevos no heredan hilos ni conexiones de la aplicación
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+            results = list(executor.map(simulate_chunk, [arrays] * len(sizes), sizes, seeds))
+    else:
+        results = [simulate_chunk(arrays, size, child) for size, child in zip(sizes, seeds)]
+
+    counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    points = np.zeros(n_teams, dtype=np.float64)
+    for chunk_counts, chunk_points in results:
+        counts += chunk_counts
+        points += chunk_points
+    return counts, points / n_sims
+
+def summarize(season, counts, expected_points, relegation_spots=2):
+    """Probabilidades por equipo ordenadas por posición esperada"""
+    n_sims = counts[0].sum()
+    n_teams = len(season.teams)
+    distribution = counts / n_sims
+    positions = np.arange(1, n_teams + 1)
+    relegation = distribution[:, n_teams - relegation_spots:].sum(axis=1) if relegation_spots else np.zeros(n_teams)
+    remaining = np.bincount(season.home, minlength=n_teams) + np.bincount(season.away, minlength=n_teams)
+
+    rows = []
+    for i, team in enumerate(season.teams):
+        rows.append({
+            'equipo': team.nombre,
+            'codigo': team.codigo,
+            'puntos_actuales': int(season.points[i]),
+            'partidos_restantes': int(remaining[i]),
+            'puntos_esperados': round(float(expected_points[i]), 2),
+            'posicion_esperada': round(float(distribution[i] @ positions), 2),
+            'prob_titulo': round(float(distribution[i, 0]), 4),
+            'prob_descenso': round(float(relegation[i]), 4),
+            'posiciones': [round(float(value), 4) for value in distribution[i]]
+        })
+    return sorted(rows, key=lambda row: row['posicion_esperada'])
+
+def current_table(teams, partidos):
+    """Puntos, diferencia de gol y goles a favor de los partidos con resultado"""
+    index = {team.id: i for i, team in enumerate(teams)}
+    points = np.zeros(len(teams), dtype=np.int32)
+    goal_difference = np.zeros(len(teams), dtype=np.int32)
+    goals_for = np.zeros(len(teams), dtype=np.int32)
+    for home_id, away_id, home_goals, away_goals in partidos:
+        if home_id not in index or away_id not in index:
+            continue
+        home, away = index[home_id], index[away_id]
+        points[home] += 3 if home_goals > away_goals else 1 if home_goals == away_goals else 0
+        points[away] += 3 if away_goals > home_goals else 1 if home_goals == away_goals else 0
+        goal_difference[home] += home_goals - away_goals
+        goal_difference[away] += away_goals - home_goals
+        goals_for[home] += home_goals
+        goals_for[away] += away_goals
+    return points, goal_difference, goals_for
+
+def load_season(year, fixtures=None):
+    """
+    Arma la entrada de la simulación desde la base de datos (requiere contexto de la app)
+
+    Args:
+        year (int): Temporada (año de la fecha de los partidos)
+        fixtures (list): Pares (equipo local, equipo visitante) pendientes. Por defecto, los
+            partidos de la temporada sin resultado o, si no hay, los cruces de ida y vuelta
+            entre los equipos que todavía no se jugaron.
+
+    Returns:
+        SeasonInput
+    """
+    from sqlalchemy import extract
+    from models import db, Partido
+    from team_registry import team_registry
+    from prediction_pipeline import predict_fixtures
+
+    rows = db.session.execute(
+        db.select(Partido.equipo_local_id, Partido.equipo_visita_id, Partido.goles_local, Partido.goles_visita)
+        .where(extract('year', Partido.fecha) == year)
+    ).all()
+    played = [row for row in rows if row.goles_local is not None and row.goles_visita is not None]
+
+    teams = sorted((team for team in team_registry.all() if team.codigo is not None), key=lambda team: team.codigo)
+    if fixtures is None:
+        pending = [
+            (team_registry.by_id(row.equipo_local_id), team_registry.by_id(row.equipo_visita_id))
+            for row in rows if row.goles_local is None or row.goles_visita is None
+        ]
+        if not pending:
+            done = {(row.equipo_local_id, row.equipo_visita_id) for row in played}
+            pending = [(home, away) for home in teams for away in teams if home.id != away.id and (home.id, away.id) not in done]
+        fixtures = pending
+
+    fixtures = [(home, away) for home, away in fixtures if home is not None and away is not None]
+    index = {team.id: i for i, team in enumerate(teams)}
+    fixtures = [(home, away) for home, away in fixtures if home.id in index and away.id in index]
+
+    predictions = predict_fixtures(
+        [home for home, _ in fixtures], [away for _, away in fixtures],
+        [home.codigo for home, _ in fixtures], [away.codigo for _, away in fixtures]
+    ) if fixtures else []
+
+    points, goal_difference, goals_for = current_table(teams, played)
+    return SeasonInput(
+        teams, points, goal_difference, goals_for,
+        home=[index[home.id] for home, _ in fixtures],
+        away=[index[away.id] for _, away in fixtures],
+        probabilities=[[p['home_win'], p['draw'], p['away_win']] for p in predictions],
+        goal_rates=[[p['score']['home'], p['score']['away']] for p in predictions]
+    )
+
+def run_simulation(year, n_sims=100000, seed=0, workers=0, relegation_spots=2, fixtures=None):
+    """Carga la temporada, la simula y retorna la respuesta de /api/season/simulate"""
+    started = time.perf_counter()
+    season = load_season(year, fixtures)
+    loaded = time.perf_counter()
+    counts, expected_points = simulate(season, n_sims, seed, workers)
+    finished = time.perf_counter()
+
+    return {
+        'temporada': year,
+        'simulaciones': n_sims,
+        'semilla': seed,
+        'partidos_restantes': len(season.home),
+        'descensos': relegation_spots,
+        'segundos_prediccion': round(loaded - started, 3),
+        'segundos_simulacion': round(finished - loaded, 3),
+        'equipos': summarize(season, counts, expected_points, relegation_spots)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulación Monte Carlo del resto de la temporada')
+    parser.add_argument('--season', type=int, required=True, help='Temporada (año)')
+    parser.add_argument('--simulations', type=int, default=100000, help='Temporadas simuladas')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Procesos (0 = sin pool)')
+    parser.add_argument('--relegation', type=int, default=2, help='Puestos de descenso')
+    parser.add_argument('--json', action='store_true', help='Imprimir el resultado completo en JSON')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        result = run_simulation(args.season, args.simulations, args.seed, args.workers, args.relegation)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+    print(
+        f"⏱️ {result['simulaciones']:,} temporadas, {result['partidos_restantes']} partidos pendientes: "
+        f"predicción {result['segundos_prediccion']:.2f}s, simulación {result['segundos_simulacion']:.2f}s"
+    )
+    print(f"{'Equipo':<26}{'Pts':>5}{'Esp.':>8}{'Pos.':>7}{'Título':>9}{'Descenso':>10}")
+    for row in result['equipos']:
+        print(
+            f"{row['equipo']:<26}{row['puntos_actuales']:>5}{row['puntos_esperados']:>8.1f}"
+            f"{row['posicion_esperada']:>7.2f}{row['prob_titulo']:>9.1%}{row['prob_descenso']:>10.1%}"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
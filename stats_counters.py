@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Estadísticas generales (/api/stats): una sola consulta agregada y contadores en memoria
+"""
+
+import threading
+import time
+from sqlalchemy import case, func, select
+from models import db, Equipo, Partido, Prediccion
+
+# Resultado de un partido -> contador que incrementa
+RESULT_COUNTERS = {
+    'L': 'victorias_local',
+    'E': 'empates',
+    'V': 'victorias_visita'
+}
+
+def aggregate_query():
+    """
+    Estadísticas en una sola consulta: un recorrido agrupado de partidos más los totales
+    de equipos y predicciones como subconsultas escalares
+    """
+    return select(
+        select(func.count()).select_from(Equipo).scalar_subquery(),
+        select(func.count()).select_from(Prediccion).scalar_subquery(),
+        func.count(Partido.id),
+        func.count(Partido.resultado),
+        func.count(case((Partido.resultado == 'L', 1))),
+        func.count(case((Partido.resultado == 'E', 1))),
+        func.count(case((Partido.resultado == 'V', 1)))
+    ).select_from(Partido)
+
+def stats_from_row(row):
+    """Respuesta de /api/stats a partir de la fila de aggregate_query()"""
+    return {
+        'total_equipos': row[0] or 0,
+        'total_partidos': row[2] or 0,
+        'total_predicciones': row[1] or 0,
+        'partidos_con_resultado': row[3] or 0,
+        'victorias_local': row[4] or 0,
+        'empates': row[5] or 0,
+        'victorias_visita': row[6] or 0
+    }
+
+def aggregate_stats():
+    """Calcula las estadísticas con la sesión de la aplicación"""
+    return stats_from_row(db.session.execute(aggregate_query()).one())
+
+class StatsCounters:
+    """
+    Contadores de /api/stats que se incrementan cuando la aplicación guarda partidos y
+    predicciones, así cada consulta del panel cuesta O(1). Se recalculan con
+    aggregate_stats() cada refresh_seconds para incorporar lo escrito por otros workers
+    o fuera de la API; entre recargas pueden ir por detrás de la base de datos.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.refresh_seconds = 60
+        self._counters = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+        self.reloads = 0
+        self.last_error = None
+
+    def configure(self, enabled=False, refresh_seconds=60):
+        """
+        Args:
+            enabled (bool): Sirve /api/stats desde los contadores en memoria
+            refresh_seconds (int): Segundos entre recálculos con la consulta agregada
+        """
+        self.enabled = enabled
+        self.refresh_seconds = refresh_seconds
+        self.invalidate()
+
+    def snapshot(self):
+        """Estadísticas actuales (consulta agregada si los contadores están desactivados)"""
+        if not self.enabled:
+            return aggregate_stats()
+
+        with self._lock:
+            stale = self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+            if stale:
+                self._reload()
+            return dict(self._counters)
+
+    def _reload(self):
+        """Recalcula los contadores desde la base de datos (con el lock tomado)"""
+        try:
+            self._counters = aggregate_stats()
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            if self._counters is None:
+                raise
+
+    def record_partido(self, resultado):
+        """Cuenta un partido guardado por la API"""
+        with self._lock:
+            if self._counters is None:
+                return
+            self._counters['total_partidos'] += 1
+            if resultado is not None:
+                self._counters['partidos_con_resultado'] += 1
+                if resultado in RESULT_COUNTERS:
+                    self._counters[RESULT_COUNTERS[resultado]] += 1
+
+    def record_predicciones(self, count):
+        """Cuenta predicciones guardadas (o encoladas para guardar) por la API"""
+        with self._lock:
+            if self._counters is not None:
+                self._counters['total_predicciones'] += count
+
+    def invalidate(self):
+        """Fuerza el recálculo en la próxima consulta"""
+        with self._lock:
+            self._counters = None
+            self._loaded_at = None
+
+# Instancia global de las estadísticas
+stats_counters = StatsCounters()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Registro en memoria de los equipos (nombre, código, id y escudo)
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import NamedTuple, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, Equipo
+
+STATIC_URL = '/static/'
+
+# Escudo de cada equipo en app/static/ cuando la tabla equipos no tiene logo_url
+TEAM_LOGOS = {
+    'Barcelona SC': 'img/Barcelona_Sporting_Club_Logo.png',
+    'El Nacional': 'img/Nacional.png',
+    'Emelec': 'img/EscudoCSEmelec.png',
+    'LDU de Quito': 'img/Liga_Deportiva_Universitaria_de_Quito.png',
+    'Mushuc Runa SC': 'img/MushucRuna.png',
+    'Independiente del Valle': 'img/Independiente_del_Valle_Logo_2022.png',
+    'CD Tecnico Universitario': 'img/Técnico_Universitario.png',
+    'Delfin': 'img/Delfín_SC_logo.png',
+    'Deportivo Cuenca': 'img/Depcuenca.png',
+    'Aucas': 'img/SD_Aucas_logo.png',
+    'Universidad Catolica': 'img/Ucatólica.png',
+    'CSD Macara': 'img/Macara_6.png',
+    'Orense SC': 'img/Orense_SC_logo.png',
+    'Manta FC': 'img/Manta_F.C.png',
+    'Libertad': 'img/Libertad_FC_Ecuador.png',
+    'Vinotinto': 'img/Vinotinto.png'
+}
+
+class Team(NamedTuple):
+    """Copia inmutable de una fila de equipos (mismos atributos que Equipo)"""
+    id: int
+    nombre: str
+    codigo: Optional[int]
+    logo_url: Optional[str]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nombre': self.nombre,
+            'codigo': self.codigo,
+            'logo_url': self.logo_url
+        }
+
+class TeamRegistry:
+    """
+    Carga la tabla equipos una sola vez y responde las búsquedas por nombre, código o id
+    sin consultar la base de datos. Se invalida cuando la aplicación modifica un Equipo
+    y se recarga cada refresh_seconds para ver cambios hechos por otros procesos.
+    """
+
+    def __init__(self):
+        self.refresh_seconds = 300
+        self._state = None
+        self._lock = threading.Lock()
+
+        self.reloads = 0
+        self.last_error = None
+
+    def configure(self, refresh_seconds=300):
+        """
+        Args:
+            refresh_seconds (int): Segundos máximos antes de volver a leer la tabla (0 = sin recarga)
+        """
+        self.refresh_seconds = refresh_seconds
+        self.invalidate()
+
+    def _current(self):
+        """Estado publicado (lo carga o recarga si corresponde)"""
+        state = self._state
+        if state is not None and not self._stale(state):
+            return state
+
+        with self._lock:
+            state = self._state
+            if state is None or self._stale(state):
+                state = self._load(state)
+            return state
+
+    def _stale(self, state):
+        return bool(self.refresh_seconds) and time.monotonic() - state['loaded_at'] >= self.refresh_seconds
+
+    def _load(self, previous):
+        """Lee la tabla equipos y publica los mapas (con el lock tomado)"""
+        try:
+            equipos = db.session.query(Equipo).order_by(Equipo.id).all()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error cargando equipos: {e}")
+            if previous is None:
+                raise
+            return previous
+
+        teams = tuple(
+            Team(
+                equipo.id, equipo.nombre, equipo.codigo,
+                equipo.logo_url or (STATIC_URL + TEAM_LOGOS[equipo.nombre] if equipo.nombre in TEAM_LOGOS else None)
+            )
+            for equipo in equipos
+        )
+        payload = [team.to_dict() for team in teams]
+        body = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+
+        self._state = {
+            'teams': teams,
+            'by_name': {team.nombre: team for team in teams},
+            'by_code': {team.codigo: team for team in teams if team.codigo is not None},
+            'by_id': {team.id: team for team in teams},
+            'ids_by_code': {team.codigo: team.id for team in teams if team.codigo is not None},
+            'payload': payload,
+            'etag': hashlib.sha1(body.encode()).hexdigest()[:16],
+            'loaded_at': time.monotonic()
+        }
+        self.reloads += 1
+        self.last_error = None
+        return self._state
+
+    def all(self):
+        return self._current()['teams']
+
+    def payload(self):
+        """Lista de equipos para /api/equipos"""
+        return self._current()['payload']
+
+    def etag(self):
+        """Huella del contenido de /api/equipos"""
+        return self._current()['etag']
+
+    def by_name(self, nombre):
+        return self._current()['by_name'].get(nombre)
+
+    def by_code(self, codigo):
+        return self._current()['by_code'].get(codigo)
+
+    def by_id(self, equipo_id):
+        return self._current()['by_id'].get(equipo_id)
+
+    def ids_by_code(self):
+        """Mapa código -> id de equipo"""
+        return self._current()['ids_by_code']
+
+    def invalidate(self):
+        """Fuerza la recarga en la próxima búsqueda"""
+        self._state = None
+
+    def stats(self):
+        state = self._state
+        return {
+            'loaded': state is not None,
+            'teams': len(state['teams']) if state else 0,
+            'etag': state['etag'] if state else None,
+            'refresh_seconds': self.refresh_seconds,
+            'reloads': self.reloads,
+            'last_error': self.last_error
+        }
+
+# Instancia global del registro de equipos
+team_registry = TeamRegistry()
+
+# Un cambio de Equipo hecho desde este proceso invalida el registro cuando se confirma: el
+# flush solo marca la sesión, así una recarga concurrente no ve filas sin commit
+@event.listens_for(Session, 'after_flush')
+def _mark_equipos_changed(session, flush_context):
+    if any(isinstance(obj, Equipo) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['equipos_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('equipos_changed', False):
+        team_registry.invalidate()
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    # Al deshacer la transacción externa los cambios no llegaron a la base: se olvida la
+    # marca. Un savepoint deshecho la conserva (a lo sumo se recarga sin necesidad)
+    if previous_transaction.parent is None:
+        session.info.pop('equipos_changed', None)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+MLPredictor.predict_match y predict_fixtures (el pipeline de /api/predict) dan la misma
+predicción en una base SQLite en memoria con tres equipos y un partido
+"""
+
+from datetime import datetime
+import numpy as np
+from flask import Flask
+from config import Config
+from models import db, Equipo, Partido
+from ml_models import predictor
+from prediction_pipeline import predict_fixtures
+from team_registry import team_registry
+from app import valid_team_code
+
+def make_app():
+    """App mínima sobre SQLite en memoria (sin PostgreSQL ni el resto de create_app)"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Equipo(nombre='Emelec', codigo=4), Equipo(nombre='Barcelona SC', codigo=0),
+                            Equipo(nombre='Aucas', codigo=9)])
+        db.session.commit()
+        db.session.add(Partido(
+            equipo_local_id=1, equipo_visita_id=2, fecha=datetime(2024, 5, 1), goles_local=2, goles_visita=1,
+            corners_local=6, corners_visita=3, tarjetas_amarillas_local=3, tarjetas_amarillas_visita=2,
+            tarjetas_rojas_local=0, tarjetas_rojas_visita=1, resultado='L'
+        ))
+        db.session.commit()
+    team_registry.invalidate()
+    return app
+
+def pipeline_prediction(home_name, away_name, home_code, away_code):
+    """predict_fixtures de un partido buscando los equipos por nombre"""
+    home, away = team_registry.by_name(home_name), team_registry.by_name(away_name)
+    return predict_fixtures([home], [away], [home_code], [away_code])[0]
+
+def test_predict_match_uses_the_pipeline():
+    app = make_app()
+    with app.app_context():
+        # Con historia: misma respuesta (los fallbacks aleatorios con la misma semilla)
+        np.random.seed(7)
+        legacy = predictor.predict_match(4, 0)
+        np.random.seed(7)
+        pipeline = pipeline_prediction('Emelec', 'Barcelona SC', 4, 0)
+        assert legacy == pipeline
+        assert {'home_win', 'draw', 'away_win', 'score', 'corners', 'corners_total', 'yellow_cards', 'red_cards'} <= set(pipeline)
+        assert abs(pipeline['home_win'] + pipeline['draw'] + pipeline['away_win'] - 1) < 1e-9
+
+        # Sin historia ni modelo de marcador: probabilidades por código de equipo, como antes del pipeline
+        np.random.seed(7)
+        legacy = predictor.predict_match(9, 4)
+        np.random.seed(7)
+        pipeline = pipeline_prediction('Aucas', 'Emelec', 9, 4)
+        assert legacy == pipeline
+        if predictor.score_model is None:
+            expected = predictor.code_probabilities(9, 4)
+            for key, value in zip(('home_win', 'draw', 'away_win'), expected):
+                assert abs(pipeline[key] - value) < 1e-9
+
+def test_team_codes_must_be_integers():
+    assert valid_team_code(0) and valid_team_code(15)
+    for code in ('0', 1.0, [1], None, True):
+        assert not valid_team_code(code)
+
+if __name__ == "__main__":
+    test_predict_match_uses_the_pipeline()
+    test_team_codes_must_be_integers()
+    print("✅ predict_match usa el pipeline de predicción")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Simulación Monte Carlo de la temporada (season_simulator.py) con una liga sintética
+"""
+
+import time
+import numpy as np
+from season_simulator import SeasonInput, simulate, summarize
+from team_registry import Team
+
+N_TEAMS = 16
+
+# Tiempo máximo de 100.000 temporadas en un proceso
+TARGET_SECONDS = 10
+
+def synthetic_season(seed=0, played_rounds=20):
+    """Liga de 16 equipos con la tabla de played_rounds jornadas y el resto de cruces pendiente"""
+    rng = np.random.default_rng(seed)
+    teams = [Team(i + 1, f"Equipo {i}", i, None) for i in range(N_TEAMS)]
+    pairs = [(home, away) for home in range(N_TEAMS) for away in range(N_TEAMS) if home != away]
+    pending = [pairs[i] for i in rng.choice(len(pairs), len(pairs) - played_rounds * N_TEAMS // 2, replace=False)]
+
+    probabilities = rng.dirichlet([4, 2, 3], len(pending))
+    goal_rates = rng.uniform(0.5, 2.5, (len(pending), 2))
+    return SeasonInput(
+        teams,
+        points=rng.integers(10, 45, N_TEAMS),
+        goal_difference=rng.integers(-15, 15, N_TEAMS),
+        goals_for=rng.integers(15, 40, N_TEAMS),
+        home=[home for home, _ in pending],
+        away=[away for _, away in pending],
+        probabilities=probabilities,
+        goal_rates=goal_rates
+    )
+
+def test_distribution_is_consistent():
+    season = synthetic_season()
+    counts, expected_points = simulate(season, n_sims=20000, seed=3, chunk_size=5000)
+
+    # Cada equipo termina en una posición y cada posición tiene un equipo por simulación
+    np.testing.assert_array_equal(counts.sum(axis=1), 20000)
+    np.testing.assert_array_equal(counts.sum(axis=0), 20000)
+    assert np.all(expected_points >= season.points)
+
+    rows = summarize(season, counts, expected_points, relegation_spots=2)
+    assert abs(sum(row['prob_titulo'] for row in rows) - 1) < 1e-3
+    assert abs(sum(row['prob_descenso'] for row in rows) - 2) < 1e-3
+
+def test_same_result_with_any_number_of_workers():
+    season = synthetic_season(seed=1)
+    serial = simulate(season, n_sims=8000, seed=7, chunk_size=2000)
+    pooled = simulate(season, n_sims=8000, seed=7, workers=2, chunk_size=2000)
+    np.testing.assert_array_equal(serial[0], pooled[0])
+    np.testing.assert_allclose(serial[1], pooled[1])
+
+def test_certain_outcomes():
+    # Tres equipos; el local gana siempre: cada equipo suma 3 puntos por partido de local
+    teams = [Team(i + 1, f"Equipo {i}", i, None) for i in range(3)]
+    season = SeasonInput(
+        teams, points=[0, 10, 0], goal_difference=[0, 0, 0], goals_for=[0, 0, 0],
+        home=[0, 0, 2], away=[1, 2, 1],
+        probabilities=[[1, 0, 0]] * 3, goal_rates=[[1.5, 1.0]] * 3
+    )
+    counts, expected_points = simulate(season, n_sims=1000, seed=0)
+    np.testing.assert_allclose(expected_points, [6, 10, 3])
+    np.testing.assert_array_equal(counts[1], [1000, 0, 0])
+    np.testing.assert_array_equal(counts[2], [0, 0, 1000])
+
+def test_simulation_time():
+    season = synthetic_season()
+    started = time.perf_counter()
+    simulate(season, n_sims=100000, seed=0)
+    seconds = time.perf_counter() - started
+    print(f"⏱️ 100.000 temporadas con {len(season.home)} partidos pendientes: {seconds:.2f}s")
+    assert seconds < TARGET_SECONDS
+
+if __name__ == "__main__":
+    test_distribution_is_consistent()
+    test_same_result_with_any_number_of_workers()
+    test_certain_outcomes()
+    test_simulation_time()
+    print("✅ Simulación de temporada correcta")
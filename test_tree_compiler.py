@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Paridad y latencia de los ensambles compilados (tree_compiler.py) frente a los modelos originales
+"""
+
+import os
+import time
+import numpy as np
+from custom_models import safe_load_model
+from tree_compiler import compile_model, compact_model, model_nbytes, probe_rows
+
+MODELS_DIR = 'app/models'
+
+# Ensambles de árboles a comparar (archivo, método de predicción)
+TREE_MODELS = [
+    ('prediccion_corners_totales.pkl', 'predict'),
+    ('modelo_rojas_cls_local.pkl', 'predict_proba'),
+    ('modelo_rojas_cls_visitante.pkl', 'predict_proba'),
+    ('modelo_rojas_reg_local.pkl', 'predict'),
+    ('modelo_rojas_reg_visitante.pkl', 'predict'),
+    ('modelo_marcador.pkl', 'predict')
+]
+
+# Latencia objetivo de una fila (un partido) con el modelo compilado
+SINGLE_ROW_TARGET_MS = 1.0
+
+# Diferencia máxima de la versión compacta (float32) frente al original
+COMPACT_TOLERANCE = 1e-4
+
+def load_tree_model(filename):
+    model = safe_load_model(os.path.join(MODELS_DIR, filename))
+    # modelo_marcador.pkl guarda el estimador dentro de un diccionario
+    if isinstance(model, dict):
+        model = model['model']
+    return model
+
+def sample_rows(n_features, n_rows=300, seed=0):
+    """Filas de prueba con valores en varias escalas y algunos faltantes"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 1, (n_rows, n_features)) * rng.choice([1, 5, 20], size=(1, n_features))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+def median_ms(func, X, repeat=50):
+    func(X)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(X)
+        times.append((time.perf_counter() - started) * 1000)
+    return float(np.median(times))
+
+def test_compiled_parity():
+    for filename, method in TREE_MODELS:
+        model = load_tree_model(filename)
+        compiled = compile_model(model)
+        X = sample_rows(compiled.n_features_in_)
+
+        expected = getattr(model, method)(X)
+        batch = getattr(compiled, method)(X)
+        single = np.concatenate([getattr(compiled, method)(X[i:i + 1]) for i in range(10)])
+
+        # XGBoost evalúa en float32
+        tolerance = 1e-5 if filename == 'prediccion_corners_totales.pkl' else 1e-9
+        print(f"🔍 {filename}: diferencia máxima {np.max(np.abs(expected - batch)):.2e}")
+        np.testing.assert_allclose(batch, expected, rtol=tolerance, atol=tolerance)
+        np.testing.assert_allclose(single, expected[:10], rtol=tolerance, atol=tolerance)
+
+        if method == 'predict_proba':
+            np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+def test_compiled_rejects_wrong_feature_count():
+    compiled = compile_model(load_tree_model('modelo_rojas_reg_local.pkl'))
+    try:
+        compiled.predict(np.zeros((1, 4)))
+    except ValueError:
+        return
+    raise AssertionError("Se esperaba ValueError con un número de features incorrecto")
+
+def test_compact_parity_and_memory():
+    for filename, method in TREE_MODELS:
+        model = load_tree_model(filename)
+        compiled = compile_model(model)
+        compact, difference = compact_model(model, COMPACT_TOLERANCE, compiled)
+
+        for X in (sample_rows(compiled.n_features_in_), probe_rows(compiled, seed=1)):
+            np.testing.assert_allclose(
+                getattr(compact, method)(X), getattr(model, method)(X), rtol=0, atol=COMPACT_TOLERANCE
+            )
+        if method == 'predict_proba':
+            X = sample_rows(compiled.n_features_in_)
+            np.testing.assert_array_equal(compact.predict(X), model.predict(X))
+
+        print(
+            f"📊 {filename}: original {model_nbytes(model) / 1024:.0f} KB, "
+            f"compacto {compact.nbytes() / 1024:.0f} KB (diferencia máxima {difference:.1e})"
+        )
+        assert compact.nbytes() < compiled.nbytes() < model_nbytes(model)
+
+def test_single_row_latency():
+    for filename, method in TREE_MODELS:
+        model = load_tree_model(filename)
+        compiled = compile_model(model)
+        X = sample_rows(compiled.n_features_in_, n_rows=1)
+
+        original_ms = median_ms(getattr(model, method), X)
+        compiled_ms = median_ms(getattr(compiled, method), X)
+        print(f"⏱️ {filename}: original {original_ms:.3f} ms, compilado {compiled_ms:.3f} ms")
+        assert compiled_ms < SINGLE_ROW_TARGET_MS, f"{filename}: {compiled_ms:.3f} ms > {SINGLE_ROW_TARGET_MS} ms"
+
+if __name__ == "__main__":
+    test_compiled_parity()
+    test_compiled_rejects_wrong_feature_count()
+    test_compact_parity_and_memory()
+    test_single_row_latency()
+    print("✅ Modelos compilados equivalentes a los originales")
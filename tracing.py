@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Trazas de depuración con niveles, muestreo por petición y formateo diferido
+"""
+
+import random
+from contextvars import ContextVar
+
+# Niveles de traza (de menos a más detalle)
+LEVELS = {
+    'off': 0,
+    'info': 1,
+    'debug': 2
+}
+
+INFO = LEVELS['info']
+DEBUG = LEVELS['debug']
+
+# Decisión de muestreo de la petición actual (True fuera de una petición)
+_sampled = ContextVar('trace_sampled', default=True)
+
+class Lazy:
+    """Valor de traza que solo se calcula si la traza se va a imprimir"""
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __call__(self):
+        return self.func(*self.args)
+
+def lazy(func, *args):
+    """Difiere func(*args) hasta que la traza se imprima (por ejemplo lazy(repr, modelo))"""
+    return Lazy(func, *args)
+
+class Tracer:
+    """
+    Reemplaza los print de depuración del camino de predicción. Con el nivel 'off' cada
+    llamada cuesta una comparación; los mensajes usan str.format con argumentos que solo
+    se formatean (y los Lazy solo se evalúan) cuando la traza está activa y la petición
+    fue muestreada.
+    """
+
+    def __init__(self):
+        self.level = LEVELS['off']
+        self.sample_rate = 1.0
+
+    def configure(self, level='off', sample_rate=1.0):
+        """
+        Args:
+            level (str): 'off', 'info' (resumen por petición) o 'debug' (detalle por etapa)
+            sample_rate (float): Fracción de peticiones con trazas (0 a 1)
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Nivel de traza desconocido: {level}")
+        self.level = LEVELS[level]
+        self.sample_rate = sample_rate
+
+    def begin(self):
+        """Decide al inicio de cada petición si sus trazas se imprimen"""
+        if self.level:
+            _sampled.set(self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def enabled(self, level=DEBUG):
+        """Indica si las trazas del nivel se imprimen en la petición actual"""
+        return self.level >= level and _sampled.get()
+
+    def info(self, message, *args):
+        if self.level >= INFO and _sampled.get():
+            self._emit(message, args)
+
+    def debug(self, message, *args):
+        if self.level >= DEBUG and _sampled.get():
+            self._emit(message, args)
+
+    def rule(self):
+        """Separador entre peticiones"""
+        if self.level >= INFO and _sampled.get():
+            print("=" * 50)
+
+    def _emit(self, message, args):
+        values = [arg() if isinstance(arg, Lazy) else arg for arg in args]
+        print(f"🔍 DEBUG - {message.format(*values) if values else message}")
+
+# Instancia global de trazas
+tracer = Tracer()
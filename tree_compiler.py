@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Compilación de ensambles de árboles a arreglos NumPy contiguos para inferencia rápida
+"""
+
+import json
+import numpy as np
+
+def _sigmoid(raw):
+    """Inversa del link logit"""
+    return 1.0 / (1.0 + np.exp(-raw))
+
+# Funciones de enlace (de puntaje crudo a predicción)
+LINKS = {
+    'identity': lambda raw: raw,
+    'exp': np.exp,
+    'sigmoid': _sigmoid
+}
+
+# Link inverso según la pérdida de HistGradientBoosting
+HGB_LOSS_LINKS = {
+    'HalfSquaredError': 'identity',
+    'AbsoluteError': 'identity',
+    'PinballLoss': 'identity',
+    'HuberLoss': 'identity',
+    'HalfPoissonLoss': 'exp',
+    'HalfGammaLoss': 'exp',
+    'HalfTweedieLoss': 'exp',
+    'HalfTweedieLossIdentity': 'identity',
+    'HalfBinomialLoss': 'sigmoid'
+}
+
+# Link inverso según el objetivo de XGBoost
+XGB_OBJECTIVE_LINKS = {
+    'reg:squarederror': 'identity',
+    'reg:absoluteerror': 'identity',
+    'reg:pseudohubererror': 'identity',
+    'binary:logistic': 'sigmoid',
+    'reg:logistic': 'sigmoid',
+    'count:poisson': 'exp',
+    'reg:gamma': 'exp',
+    'reg:tweedie': 'exp'
+}
+
+class CompiledForest:
+    """
+    Ensamble de árboles aplanado en arreglos contiguos. Todos los nodos de todos los
+    árboles viven en los mismos arreglos (feature, threshold, left, right, ...); los
+    hijos usan índices globales y roots indica el nodo raíz de cada árbol.
+
+    La evaluación recorre todos los árboles a la vez: en cada nivel se avanza el nodo
+    actual de cada (fila, árbol) con operaciones vectorizadas, así una fila o un lote
+    cuestan una pasada de max_depth pasos sin bucles de Python por árbol.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, is_leaf, value, roots,
+                 baseline, link, n_features, strict_less=False, dtype=np.float64, compact=False):
+        self.dtype = dtype
+        self.compact = compact
+        # Compacto: índices con el entero sin signo más angosto que alcance, umbrales y
+        # hojas en float32
+        node_dtype = np.min_scalar_type(max(len(feature) - 1, 0)) if compact else np.int32
+        feature_dtype = np.min_scalar_type(max(int(n_features) - 1, 0)) if compact else np.int32
+        self.feature = np.ascontiguousarray(feature, dtype=feature_dtype)
+        self.threshold = np.ascontiguousarray(
+            float32_thresholds(threshold, strict_less) if compact else threshold, dtype=np.float32 if compact else dtype
+        )
+        self.left = np.ascontiguousarray(left, dtype=node_dtype)
+        self.right = np.ascontiguousarray(right, dtype=node_dtype)
+        self.missing_left = np.ascontiguousarray(missing_left, dtype=bool)
+        self.is_leaf = np.ascontiguousarray(is_leaf, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float32 if compact else np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=node_dtype if compact else np.int32)
+        self.baseline = float(baseline)
+        self.link = link
+        self.n_features = int(n_features)
+        # XGBoost va a la izquierda con x < umbral; scikit-learn con x <= umbral
+        self.strict_less = strict_less
+
+        # Las hojas apuntan a sí mismas para que el recorrido pueda seguir sin ramas
+        nodes = np.arange(len(self.feature), dtype=self.left.dtype)
+        self.left[self.is_leaf] = nodes[self.is_leaf]
+        self.right[self.is_leaf] = nodes[self.is_leaf]
+        self.feature[self.is_leaf] = 0
+        self.max_depth = self._max_depth()
+
+    def _max_depth(self):
+        """Profundidad máxima del ensamble (número de pasos del recorrido), por niveles"""
+        frontier = self.roots.copy()
+        depth = 0
+        while True:
+            internal = frontier[~self.is_leaf[frontier]]
+            if len(internal) == 0:
+                return depth
+            frontier = np.concatenate([self.left[internal], self.right[internal]])
+            depth += 1
+
+    def check_input(self, X):
+        """Convierte X a una matriz 2D contigua y valida el número de features"""
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but the compiled model is expecting {self.n_features} features as input."
+            )
+        return np.ascontiguousarray(X)
+
+    def leaves(self, X):
+        """Índice de la hoja alcanzada por cada (fila, árbol)"""
+        X = self.check_input(X)
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        flat_X = X.ravel()
+
+        # Pares (fila, árbol) aplanados; solo se siguen recorriendo los que no llegaron a una hoja
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.int64) * self.n_features, n_trees)
+        active = np.flatnonzero(~self.is_leaf[node])
+        for _ in range(self.max_depth):
+            if len(active) == 0:
+                break
+            current = node[active]
+            x = flat_X[row_offset[active] + self.feature[current]]
+            if self.strict_less:
+                go_left = x < self.threshold[current]
+            else:
+                go_left = x <= self.threshold[current]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.missing_left[current], go_left)
+            current = np.where(go_left, self.left[current], self.right[current])
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+        return node.reshape(n_rows, n_trees)
+
+    def raw_predict(self, X):
+        """Puntaje crudo: baseline + suma de las hojas de todos los árboles"""
+        return self.baseline + self.value[self.leaves(X)].sum(axis=1, dtype=np.float64)
+
+    def predict(self, X):
+        """Predicción con el link inverso aplicado"""
+        return LINKS[self.link](self.raw_predict(X))
+
+    def nbytes(self):
+        """Memoria ocupada por los arreglos del ensamble"""
+        return sum(
+            array.nbytes for array in (
+                self.feature, self.threshold, self.left, self.right,
+                self.missing_left, self.is_leaf, self.value, self.roots
+            )
+        )
+
+    def compacted(self):
+        """Copia compacta del ensamble (float32 y enteros angostos)"""
+        if self.compact:
+            return self
+        return CompiledForest(
+            self.feature, self.threshold, self.left, self.right, self.missing_left, self.is_leaf,
+            self.value, self.roots, self.baseline, self.link, self.n_features,
+            strict_less=self.strict_less, dtype=self.dtype, compact=True
+        )
+
+def float32_thresholds(threshold, strict_less=False):
+    """
+    Umbrales en float32 redondeados hacia abajo para x <= umbral: el mayor float32 que no
+    supera el umbral original. Así toda entrada representable en float32 (conteos, promedios
+    guardados en float32) toma la misma rama que con el umbral en float64; solo cambia la
+    decisión para valores dentro del último ulp bajo el umbral. Con x < umbral (XGBoost)
+    los umbrales ya son float32.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    compact = threshold.astype(np.float32)
+    if not strict_less:
+        above = compact.astype(np.float64) > threshold
+        compact[above] = np.nextafter(compact[above], np.float32(-np.inf))
+    return compact
+
+class CompiledClassifier:
+    """Clasificador binario compilado con la interfaz predict / predict_proba de scikit-learn"""
+
+    def __init__(self, forest, classes):
+        self.forest = forest
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = forest.n_features
+
+    def predict_proba(self, X):
+        proba = self.forest.predict(X)
+        return np.column_stack([1.0 - proba, proba])
+
+    def predict(self, X):
+        return self.classes_[(self.forest.raw_predict(X) > 0).astype(int)]
+
+    def nbytes(self):
+        return self.forest.nbytes()
+
+    def compacted(self):
+        return CompiledClassifier(self.forest.compacted(), self.classes_)
+
+class CompiledRegressor:
+    """Regresor compilado con la interfaz predict de scikit-learn"""
+
+    def __init__(self, forest):
+        self.forest = forest
+        self.n_features_in_ = forest.n_features
+
+    def predict(self, X):
+        return self.forest.predict(X)
+
+    def nbytes(self):
+        return self.forest.nbytes()
+
+    def compacted(self):
+        return CompiledRegressor(self.forest.compacted())
+
+class CompiledMultiOutput:
+    """Varios regresores compilados (MultiOutputRegressor): una columna por salida"""
+
+    def __init__(self, estimators):
+        self.estimators_ = estimators
+        self.n_features_in_ = estimators[0].n_features_in_
+
+    def predict(self, X):
+        return np.column_stack([estimator.predict(X) for estimator in self.estimators_])
+
+    def nbytes(self):
+        return sum(estimator.nbytes() for estimator in self.estimators_)
+
+    def compacted(self):
+        return CompiledMultiOutput([estimator.compacted() for estimator in self.estimators_])
+
+class HybridModel:
+    """
+    Usa la versión compilada para lotes pequeños (donde domina el costo fijo de
+    scikit-learn/XGBoost) y el modelo original para lotes de más de max_rows filas
+    """
+
+    def __init__(self, original, compiled, max_rows=16):
+        self.original = original
+        self.compiled = compiled
+        self.max_rows = max_rows
+        self.n_features_in_ = compiled.n_features_in_
+        if hasattr(compiled, 'classes_'):
+            self.classes_ = compiled.classes_
+
+    def _select(self, X):
+        return self.compiled if len(X) <= self.max_rows else self.original
+
+    def predict(self, X):
+        return self._select(X).predict(X)
+
+    def predict_proba(self, X):
+        return self._select(X).predict_proba(X)
+
+    def nbytes(self):
+        return self.compiled.nbytes()
+
+def compile_hist_gradient_boosting(model):
+    """Aplana los predictores de un HistGradientBoostingRegressor/Classifier"""
+    if getattr(model, 'n_trees_per_iteration_', 1) != 1:
+        raise NotImplementedError("Solo se soportan modelos de una salida (regresión o clasificación binaria)")
+
+    loss_name = type(model._loss).__name__
+    if loss_name not in HGB_LOSS_LINKS:
+        raise NotImplementedError(f"Pérdida no soportada: {loss_name}")
+
+    arrays = {key: [] for key in ('feature', 'threshold', 'left', 'right', 'missing_left', 'is_leaf', 'value')}
+    roots = []
+    offset = 0
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        if nodes['is_categorical'].any():
+            raise NotImplementedError("Los splits categóricos no están soportados")
+        roots.append(offset)
+        arrays['feature'].append(nodes['feature_idx'])
+        arrays['threshold'].append(nodes['num_threshold'])
+        arrays['left'].append(nodes['left'].astype(np.int64) + offset)
+        arrays['right'].append(nodes['right'].astype(np.int64) + offset)
+        arrays['missing_left'].append(nodes['missing_go_to_left'].astype(bool))
+        arrays['is_leaf'].append(nodes['is_leaf'].astype(bool))
+        arrays['value'].append(nodes['value'])
+        offset += len(nodes)
+
+    forest = CompiledForest(
+        roots=roots,
+        baseline=np.ravel(model._baseline_prediction)[0],
+        link=HGB_LOSS_LINKS[loss_name],
+        n_features=model.n_features_in_,
+        **{key: np.concatenate(values) for key, values in arrays.items()}
+    )
+
+    if hasattr(model, 'classes_'):
+        return CompiledClassifier(forest, model.classes_)
+    return CompiledRegressor(forest)
+
+def compile_xgboost(model):
+    """Aplana los árboles de un XGBRegressor/XGBClassifier (o Booster) a partir de su volcado JSON"""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    dump = json.loads(booster.save_raw('json'))
+    learner = dump['learner']
+    gbtree = learner['gradient_booster']
+
+    if gbtree.get('name', 'gbtree') != 'gbtree':
+        raise NotImplementedError(f"Booster no soportado: {gbtree.get('name')}")
+    objective = learner['objective']['name']
+    if objective not in XGB_OBJECTIVE_LINKS:
+        raise NotImplementedError(f"Objetivo no soportado: {objective}")
+    params = learner['learner_model_param']
+    if int(params.get('num_class', 0)) > 1 or int(params.get('num_target', 1)) > 1:
+        raise NotImplementedError("Solo se soportan modelos de una salida")
+
+    # base_score se guarda en el espacio de la predicción; el puntaje crudo usa su link
+    base_score = float(params['base_score'].strip('[]'))
+    link = XGB_OBJECTIVE_LINKS[objective]
+    if link == 'sigmoid':
+        baseline = np.log(base_score / (1.0 - base_score))
+    elif link == 'exp':
+        baseline = np.log(base_score)
+    else:
+        baseline = base_score
+
+    trees = gbtree['model']['trees']
+    best_iteration = getattr(model, 'best_iteration', None) if hasattr(model, 'get_booster') else None
+    if best_iteration is not None:
+        trees = trees[:best_iteration + 1]
+
+    arrays = {key: [] for key in ('feature', 'threshold', 'left', 'right', 'missing_left', 'is_leaf', 'value')}
+    roots = []
+    offset = 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise NotImplementedError("Los splits categóricos no están soportados")
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        right = np.asarray(tree['right_children'], dtype=np.int64)
+        is_leaf = left == -1
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float64)
+
+        roots.append(offset)
+        arrays['feature'].append(np.asarray(tree['split_indices'], dtype=np.int64))
+        arrays['threshold'].append(conditions)
+        arrays['left'].append(np.where(is_leaf, 0, left) + offset)
+        arrays['right'].append(np.where(is_leaf, 0, right) + offset)
+        arrays['missing_left'].append(np.asarray(tree['default_left'], dtype=bool))
+        arrays['is_leaf'].append(is_leaf)
+        # En las hojas split_conditions guarda el valor de la hoja
+        arrays['value'].append(np.where(is_leaf, conditions, 0.0))
+        offset += len(left)
+
+    # XGBoost compara en float32
+    forest = CompiledForest(
+        roots=roots,
+        baseline=baseline,
+        link=link,
+        n_features=int(params['num_feature']),
+        strict_less=True,
+        dtype=np.float32,
+        **{key: np.concatenate(values) for key, values in arrays.items()}
+    )
+
+    if objective in ('binary:logistic',) and hasattr(model, 'classes_'):
+        return CompiledClassifier(forest, model.classes_)
+    return CompiledRegressor(forest)
+
+def compile_model(model):
+    """
+    Compila un modelo de árboles ya cargado
+
+    Args:
+        model: HistGradientBoosting*, XGB* / Booster o MultiOutputRegressor de ellos
+
+    Returns:
+        Modelo compilado con predict (y predict_proba en clasificadores)
+
+    Raises:
+        TypeError: Si el tipo de modelo no se puede compilar
+        NotImplementedError: Si el modelo usa una característica no soportada
+    """
+    type_name = type(model).__name__
+    module = type(model).__module__
+
+    if type_name in ('HistGradientBoostingRegressor', 'HistGradientBoostingClassifier'):
+        return compile_hist_gradient_boosting(model)
+    if module.startswith('xgboost'):
+        return compile_xgboost(model)
+    if type_name == 'MultiOutputRegressor':
+        return CompiledMultiOutput([compile_model(estimator) for estimator in model.estimators_])
+
+    raise TypeError(f"No se puede compilar un modelo de tipo {type_name}")
+
+def forests(compiled):
+    """Ensambles (CompiledForest) de un modelo compilado"""
+    if isinstance(compiled, CompiledForest):
+        return [compiled]
+    if isinstance(compiled, HybridModel):
+        return forests(compiled.compiled)
+    if isinstance(compiled, CompiledMultiOutput):
+        return [forest for estimator in compiled.estimators_ for forest in forests(estimator)]
+    return [compiled.forest]
+
+def model_nbytes(model):
+    """
+    Memoria aproximada de un modelo cargado: los arreglos de los compilados; en
+    HistGradientBoosting los registros de nodos y los bordes de los bins (float64); en
+    XGBoost el tamaño del booster serializado. None si no se puede estimar.
+    """
+    if hasattr(model, 'nbytes') and callable(model.nbytes):
+        if isinstance(model, HybridModel):
+            original = model_nbytes(model.original)
+            return model.nbytes() + (original or 0)
+        return model.nbytes()
+    type_name = type(model).__name__
+    if type_name in ('HistGradientBoostingRegressor', 'HistGradientBoostingClassifier'):
+        nodes = sum(predictor.nodes.nbytes for predictors in model._predictors for predictor in predictors)
+        bins = sum(np.asarray(edges).nbytes for edges in getattr(model._bin_mapper, 'bin_thresholds_', []))
+        return nodes + bins
+    if type(model).__module__.startswith('xgboost'):
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        return len(booster.save_raw())
+    if type_name == 'MultiOutputRegressor':
+        sizes = [model_nbytes(estimator) for estimator in model.estimators_]
+        return None if None in sizes else sum(sizes)
+    return None
+
+def probe_rows(compiled, n_rows=512, seed=0):
+    """
+    Filas de prueba alrededor de los umbrales de los árboles: cada feature toma valores
+    a un lado y otro de sus umbrales (nunca el umbral exacto) y algunos faltantes
+    """
+    rng = np.random.default_rng(seed)
+    n_features = compiled.n_features_in_
+    X = rng.normal(0, 1, (n_rows, n_features))
+    by_feature = {}
+    for forest in forests(compiled):
+        internal = ~forest.is_leaf
+        thresholds = forest.threshold[internal].astype(np.float64)
+        features = forest.feature[internal]
+        finite = np.isfinite(thresholds)
+        for feature in np.unique(features[finite]):
+            by_feature.setdefault(int(feature), []).append(thresholds[finite & (features == feature)])
+    for feature, values in by_feature.items():
+        values = np.concatenate(values)
+        chosen = rng.choice(values, n_rows)
+        offset = rng.uniform(0.001, 0.5, n_rows) * np.maximum(np.abs(chosen), 1.0)
+        X[:, feature] = chosen + np.where(rng.random(n_rows) < 0.5, -offset, offset)
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+def prediction(model, X):
+    """Salida que se compara: probabilidades en clasificadores, predict en el resto"""
+    return model.predict_proba(X) if hasattr(model, 'predict_proba') else model.predict(X)
+
+def compact_model(model, tolerance=1e-4, compiled=None):
+    """
+    Compila el modelo en su forma compacta (float32 y enteros angostos) y compara sus
+    predicciones con las del original sobre filas de prueba
+
+    Args:
+        model: Modelo original (HistGradientBoosting*, XGB* o MultiOutputRegressor)
+        tolerance (float): Diferencia absoluta máxima aceptada
+        compiled: Versión ya compilada del modelo (se compila si es None)
+
+    Returns:
+        tuple: (modelo compacto, diferencia máxima)
+
+    Raises:
+        TypeError, NotImplementedError: Si el modelo no se puede compilar
+        ValueError: Si la diferencia supera la tolerancia
+    """
+    compiled = compiled if compiled is not None else compile_model(model)
+    compact = compiled.compacted()
+    X = probe_rows(compiled)
+    difference = float(np.max(np.abs(prediction(compact, X) - prediction(model, X))))
+    if not difference <= tolerance:
+        raise ValueError(f"La versión compacta difiere {difference:.2e} del original (tolerancia {tolerance:.0e})")
+    return compact, difference
+
+def memory_report(tolerance=1e-4):
+    """
+    Memoria de cada ensamble de app/models/ en su forma original, compilada y compacta,
+    con los archivos idénticos (misma suma SHA-256) contados una sola vez
+
+    Returns:
+        list: Un dict por artefacto compilable
+    """
+    import os
+    from ml_models import MODELS_DIR, MODEL_FILES, COMPILABLE_MODELS
+    from model_registry import file_sha256, unwrap
+    from custom_models import safe_load_model
+
+    report = []
+    seen = {}
+    for name in COMPILABLE_MODELS & set(MODEL_FILES):
+        path = os.path.join(MODELS_DIR, MODEL_FILES[name])
+        if not os.path.exists(path):
+            continue
+        sha256 = file_sha256(path)
+        if sha256 in seen:
+            report.append({'name': name, 'shared_with': seen[sha256]})
+            continue
+        seen[sha256] = name
+
+        model = unwrap(safe_load_model(path))
+        entry = {'name': name, 'original_bytes': model_nbytes(model)}
+        try:
+            compiled = compile_model(model)
+            compact, difference = compact_model(model, tolerance, compiled)
+            entry.update(compiled_bytes=compiled.nbytes(), compact_bytes=compact.nbytes(), max_difference=difference)
+        except (TypeError, NotImplementedError, ValueError) as e:
+            entry['error'] = str(e)
+        report.append(entry)
+    return sorted(report, key=lambda entry: entry['name'])
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Memoria de los ensambles originales, compilados y compactos')
+    parser.add_argument('--tolerance', type=float, default=1e-4, help='Diferencia máxima aceptada de la versión compacta')
+    args = parser.parse_args()
+
+    kb = lambda value: f"{value / 1024:,.0f} KB" if value is not None else '-'
+    totals = {'original_bytes': 0, 'compact_bytes': 0}
+    failures = 0
+    for entry in memory_report(args.tolerance):
+        if 'shared_with' in entry:
+            print(f"🔄 {entry['name']}: idéntico a {entry['shared_with']}, se carga una sola vez")
+        elif 'error' in entry:
+            failures += 'difiere' in entry['error']
+            print(f"⚠️ {entry['name']}: original {kb(entry['original_bytes'])}, sin versión compacta: {entry['error']}")
+        else:
+            totals['original_bytes'] += entry['original_bytes'] or 0
+            totals['compact_bytes'] += entry['compact_bytes']
+            print(
+                f"✅ {entry['name']}: original {kb(entry['original_bytes'])}, compilado {kb(entry['compiled_bytes'])}, "
+                f"compacto {kb(entry['compact_bytes'])} (diferencia máxima {entry['max_difference']:.1e})"
+            )
+    print(f"📊 Total: original {kb(totals['original_bytes'])} -> compacto {kb(totals['compact_bytes'])}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Escritura diferida (write-behind) de registros de Prediccion en lotes
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from models import db, Prediccion
+
+# Marca de fin para el hilo escritor
+_STOP = object()
+
+class PrediccionWriter:
+    """
+    Encola los registros de Prediccion y los guarda desde un hilo en segundo plano con
+    un insert masivo cada batch_size filas o cada flush_ms milisegundos. La cola es
+    acotada: si está llena durante put_timeout_ms, el registro se guarda de forma
+    síncrona en la petición (contrapresión). Al terminar el proceso se vacía la cola.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.batch_size = 200
+        self.flush_ms = 250
+        self.max_queue = 10000
+        self.put_timeout_ms = 50
+        self.app = None
+
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.sync_fallbacks = 0
+        self.last_error = None
+
+    def configure(self, app, enabled=False, batch_size=200, flush_ms=250, max_queue=10000, put_timeout_ms=50):
+        """
+        Args:
+            app (Flask): Aplicación cuyo contexto usa el hilo escritor
+            enabled (bool): Activa la escritura diferida
+            batch_size (int): Filas por insert masivo
+            flush_ms (int): Tiempo máximo que una fila espera en la cola
+            max_queue (int): Capacidad de la cola (memoria acotada)
+            put_timeout_ms (int): Espera máxima para encolar antes de escribir en línea
+        """
+        self.app = app
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.max_queue = max_queue
+        self.put_timeout_ms = put_timeout_ms
+
+    def _ensure_started(self):
+        """Arranca el hilo escritor en este proceso (los hilos no sobreviven a un fork)"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._stopping = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='prediccion-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, rows):
+        """
+        Encola registros de Prediccion (diccionarios de columnas)
+
+        Returns:
+            bool: False si la escritura diferida está desactivada y el llamador debe guardar
+        """
+        if not self.enabled:
+            return False
+
+        self._ensure_started()
+        created_at = datetime.utcnow()
+        pending = []
+        for row in rows:
+            row.setdefault('created_at', created_at)
+            if pending:
+                pending.append(row)
+                continue
+            try:
+                self._queue.put(row, timeout=self.put_timeout_ms / 1000)
+            except queue.Full:
+                pending.append(row)
+
+        if pending:
+            # Cola llena: escribir en la petición en lugar de crecer sin límite
+            self.sync_fallbacks += 1
+            self._write(pending)
+        return True
+
+    def _run(self):
+        """Bucle del hilo escritor: agrupa filas hasta batch_size o flush_ms"""
+        stopping = False
+        # _stopping se revisa entre lotes: drain() lo activa aunque la cola esté llena
+        # y no haya lugar para la marca _STOP
+        while not stopping and not self._stopping.is_set():
+            batch = []
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch.append(item)
+
+            deadline = time.monotonic() + self.flush_ms / 1000
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+
+        # Vaciar lo que quede en la cola antes de salir
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        if batch:
+            self._write(batch)
+
+    def _write(self, rows):
+        """Guarda las filas con un solo insert masivo"""
+        with self.app.app_context():
+            try:
+                db.session.execute(db.insert(Prediccion), rows)
+                db.session.commit()
+                self.written += len(rows)
+                self.batches += 1
+            except Exception as e:
+                db.session.rollback()
+                self.failed += len(rows)
+                self.last_error = str(e)
+                print(f"Error guardando {len(rows)} predicciones en segundo plano: {e}")
+
+    def drain(self, timeout=10):
+        """
+        Detiene el hilo escritor después de guardar todas las filas encoladas, esperando
+        como máximo timeout segundos (también si la cola está llena)
+        """
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self._stopping.set()
+        try:
+            # Despierta al hilo si espera en una cola vacía; con la cola llena el hilo no
+            # está esperando y ve _stopping al terminar el lote en curso
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        if thread.is_alive():
+            print(f"⚠️ Quedaron {self._queue.qsize()} predicciones en cola sin guardar al cerrar (más el lote en curso)")
+        else:
+            print(f"✅ Escritura diferida finalizada: {self.written} predicciones guardadas")
+
+    def stats(self):
+        """Contadores de la escritura diferida para diagnóstico"""
+        running = self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+        return {
+            'enabled': self.enabled,
+            'running': running,
+            'queued': self._queue.qsize() if running else 0,
+            'max_queue': self.max_queue,
+            'batch_size': self.batch_size,
+            'flush_ms': self.flush_ms,
+            'written': self.written,
+            'batches': self.batches,
+            'failed': self.failed,
+            'sync_fallbacks': self.sync_fallbacks,
+            'last_error': self.last_error
+        }
+
+# Instancia global del escritor de predicciones
+prediction_writer = PrediccionWriter()
+
+# Guardar lo pendiente al terminar el proceso
+atexit.register(prediction_writer.drain)
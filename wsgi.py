@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Punto de entrada WSGI para gunicorn (ver gunicorn.conf.py)
+"""
+
+import gc
+import os
+from app import create_app
+
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))
+
+# Con preload_app los modelos ya están cargados en el proceso maestro. Congelar los
+# objetos vivos evita que el recolector de basura de cada worker escriba en sus
+# cabeceras y fuerce la copia de esas páginas (copy-on-write).
+gc.collect()
+gc.freeze()